@@ -0,0 +1,95 @@
+"""
+Call Log CLI - Look up what happened on past calls
+Run from the backend folder:
+
+    python calls.py list [--since 24h] [--limit 20]
+    python calls.py show CA123...
+    python calls.py stats [--since 7d]
+
+Reads the call log database (CALL_LOG_DB_PATH) read-only, so it is safe to
+run next to a live server.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from config import CALL_LOG_DB_PATH
+from services.call_log import open_readonly, read_events, list_calls, call_stats
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_since(value: str) -> float:
+    """'90m', '24h' or '7d' ago as a Unix time"""
+    try:
+        amount, unit = float(value[:-1]), UNITS[value[-1]]
+    except (ValueError, KeyError, IndexError):
+        raise argparse.ArgumentTypeError(f"expected a duration like 30m, 24h or 7d, got {value!r}")
+    return time.time() - amount * unit
+
+def clock(at: float) -> str:
+    return datetime.fromtimestamp(at).strftime("%Y-%m-%d %H:%M:%S")
+
+def describe(event: dict) -> str:
+    """One line for an event in a call's timeline"""
+    kind = event.pop("kind")
+    event.pop("at")
+    if kind == "turn":
+        return f"[{event['source']}] caller: {event['user']}\n{' ' * 30}nova: {event['reply']}"
+    if kind == "upstream":
+        return f"{event['upstream']} {event['ms']}ms {event['result']}"
+    return " ".join(f"{key}={json.dumps(value, ensure_ascii=False)}" for key, value in event.items() if value is not None)
+
+def show_list(db, args):
+    calls = list_calls(db, args.since, args.limit)
+    if not calls:
+        print("No calls logged in that window")
+    for call in calls:
+        print(f"{clock(call['started'])}  {call['call_sid']:<36} {call['turns']:>3} turns "
+              f"{call['seconds']:>7.1f}s  {call['outcome']}")
+
+def show_call(db, args):
+    events = read_events(db, args.call_sid)
+    if not events:
+        print(f"No events for {args.call_sid}")
+        return 1
+    started = events[0]["at"]
+    print(f"Call {args.call_sid} started {clock(started)}")
+    for event in events:
+        offset = event["at"] - started
+        print(f"  +{offset:7.2f}s  {event['kind']:<14} {describe(dict(event))}")
+
+def show_stats(db, args):
+    stats = call_stats(db, args.since)
+    print(f"Calls: {stats['calls']}  Turns: {stats['turns']}")
+    print("Outcomes: " + ", ".join(f"{name} {count}" for name, count in sorted(stats["outcomes"].items())))
+    print("Replies:  " + ", ".join(f"{name} {count}" for name, count in sorted(stats["reply_sources"].items())))
+    print("Upstreams:")
+    for upstream, numbers in stats["upstreams"].items():
+        print(f"  {upstream:<10} {numbers['requests']:>6} requests {numbers['failures']:>4} failed "
+              f"p50 {numbers['p50_ms']:>7.1f}ms  p95 {numbers['p95_ms']:>7.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the Nova call log")
+    parser.add_argument("--db", default=CALL_LOG_DB_PATH, help="Call log database (default CALL_LOG_DB_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="Recent calls with turns, duration and outcome")
+    list_parser.add_argument("--since", type=parse_since, default=parse_since("24h"), help="How far back, e.g. 30m, 24h, 7d")
+    list_parser.add_argument("--limit", type=int, default=20)
+    list_parser.set_defaults(run=show_list)
+
+    show_parser = commands.add_parser("show", help="Replay one call's timeline")
+    show_parser.add_argument("call_sid")
+    show_parser.set_defaults(run=show_call)
+
+    stats_parser = commands.add_parser("stats", help="Outcomes, reply sources and upstream latency")
+    stats_parser.add_argument("--since", type=parse_since, default=parse_since("24h"), help="How far back, e.g. 30m, 24h, 7d")
+    stats_parser.set_defaults(run=show_stats)
+
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"No call log at {args.db}")
+    sys.exit(args.run(open_readonly(args.db), args) or 0)
@@ -1,37 +1,182 @@
 """
 Configuration file - loads all API keys and settings from .env file
+
+Settings are typed fields on Settings, read from the environment (and a
+.env file, if there is one) the first time one is used and kept for the
+life of the process. Modules import them by name as before -
+`from config import OPENAI_MODEL` resolves through get_settings().
 """
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from dataclasses import dataclass, fields, replace
+from functools import lru_cache
 
-# Twilio Configuration
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# OpenAI Configuration
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Where a .env file is looked for; the first one found is loaded
+ENV_FILES = (os.path.join(BACKEND_DIR, ".env"), os.path.join(os.path.dirname(BACKEND_DIR), ".env"))
 
-# Cal.com Configuration
-CAL_API_KEY = os.getenv("CAL_API_KEY")
-CAL_EVENT_TYPE = os.getenv("CAL_EVENT_TYPE")
+# Cal.com v1 API (fixed, not read from the environment)
 CAL_API_URL = "https://api.cal.com/v1"
 
-# Notion Configuration
-NOTION_TOKEN = os.getenv("NOTION_TOKEN")
-NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
-NOTION_API_URL = "https://api.notion.com/v1"
-
-# CRM Backend Configuration
-CRM_BACKEND_URL = os.getenv("CRM_BACKEND_URL", "https://crm-backend-8b97.onrender.com")
-CRM_TENANT_CODE = os.getenv("CRM_TENANT_CODE", "walmart")
-
-# Server Configuration
-HOST = os.getenv("HOST", "0.0.0.0")
-PORT = int(os.getenv("PORT", 8000))
+# Spellings accepted for boolean settings (compared case-insensitively)
+BOOL_VALUES = {"1": True, "true": True, "yes": True, "on": True, "0": False, "false": False, "no": False, "off": False}
+
+class ConfigError(ValueError):
+    """A setting in the environment can't be read as its type"""
+
+@dataclass(frozen=True)
+class Settings:
+    """Every setting that can be set from the environment, with its type and default"""
+
+    # Twilio Configuration
+    TWILIO_ACCOUNT_SID: str | None = None
+    TWILIO_AUTH_TOKEN: str | None = None
+    TWILIO_PHONE_NUMBER: str | None = None
+    TWILIO_API_URL: str = "https://api.twilio.com"
+    SMS_RATE_PER_SECOND: float = 1.0  # Long code throughput; raise for toll-free/short codes
+    SMS_QUEUE_SIZE: int = 1000
+    PUBLIC_BASE_URL: str | None = None  # e.g. your ngrok URL - enables SMS delivery status callbacks
+
+    # OpenAI Configuration
+    OPENAI_API_KEY: str | None = None
+    OPENAI_BASE_URL: str | None = None  # Override only for proxies or the local load-test fakes
+    OPENAI_MODEL: str = "gpt-4"  # Large tier - booking negotiation and dictated details
+    OPENAI_FAST_MODEL: str = "gpt-4o-mini"  # Fast tier - chit-chat and short acknowledgements
+    MODEL_ROUTING: bool = True  # False sends every completion to OPENAI_MODEL
+    ROUTER_COMPLEX_WORDS: int = 20  # Utterances longer than this go to the large model
+    OPENAI_TIMEOUT: float = 8.0  # Seconds per completion - the caller is waiting
+    OPENAI_MAX_RETRIES: int = 1
+    OPENAI_MAX_CONCURRENCY: int = 20  # Completions in flight per worker
+    OPENAI_MAX_CONNECTIONS: int = 50
+    REPLY_MAX_TOKENS: int = 80  # Spoken reply only - keeps it brief and punchy
+    EXTRACTION_MODEL: str | None = None  # Defaults to OPENAI_MODEL
+    EXTRACTION_MAX_TOKENS: int = 150
+    # Prompt budget: older turns fold into a summary once history exceeds this (estimated tokens)
+    CONTEXT_TOKEN_BUDGET: int = 600
+    CONTEXT_KEEP_RECENT: int = 6  # Messages always kept word for word
+    CONTEXT_SUMMARY_MAX_CHARS: int = 800
+    # Speak the first sentence while the rest of the reply is still streaming
+    STREAM_RESPONSES: bool = False
+    # Draft the reply from Twilio's partial transcripts while the caller is still talking
+    SPECULATIVE_REPLIES: bool = False
+    SPECULATION_MIN_WORDS: int = 3  # Don't draft from fragments
+    SPECULATION_MATCH_RATIO: float = 0.9  # How close the final transcript must be
+    # Reuse replies to short, identical opening turns ("hello", "hola") instead of calling OpenAI
+    REPLY_CACHE_ENABLED: bool = True
+    REPLY_CACHE_MAX_ENTRIES: int = 500  # Per worker
+    REPLY_CACHE_TTL_SECONDS: int = 3600  # Cached replies are regenerated after this
+    REPLY_CACHE_MAX_WORDS: int = 8  # Longer utterances are never cached
+    # Language detection: a call switches language after this many confident turns in a row
+    LANGUAGE_SWITCH_TURNS: int = 2
+    LANGUAGE_MIN_CONFIDENCE: float = 0.5
+    LANGUAGE_STRONG_CONFIDENCE: float = 0.85  # Switches in one turn (6+ unopposed words)
+
+    # Cal.com Configuration
+    CAL_API_KEY: str | None = None
+    CAL_EVENT_TYPE: str | None = None
+    CAL_API_V2_URL: str = "https://api.cal.com/v2"  # Slots and bookings
+    SLOT_CACHE_TTL_SECONDS: int = 60  # Serve cached availability this long
+    SLOT_CACHE_MAX_STALE_SECONDS: int = 600  # Then serve stale while refreshing
+    SLOT_HOLD_SECONDS: int = 120  # How long slots read out to one caller are kept from others
+    SLOT_MAX_REOFFERS: int = 2  # Re-offers when the caller's pick doesn't match, before a callback
+
+    # Notion Configuration
+    NOTION_TOKEN: str | None = None
+    NOTION_DATABASE_ID: str | None = None
+    NOTION_API_URL: str = "https://api.notion.com/v1"
+    NOTION_RATE_PER_SECOND: float = 3.0  # Notion's average limit per integration
+    NOTION_QUEUE_SIZE: int = 500
+    NOTION_MAX_RATE_LIMIT_RETRIES: int = 5  # 429s honoured per write before the job retries it later
+
+    # CRM Backend Configuration
+    CRM_BACKEND_URL: str = "https://crm-backend-8b97.onrender.com"
+    CRM_TENANT_CODE: str = "walmart"
+
+    # Shared HTTP connection pools (Cal.com, Notion, CRM backend)
+    HTTP_MAX_CONNECTIONS: int = 20  # Per upstream
+    HTTP_MAX_KEEPALIVE: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP2_ENABLED: bool = True  # Used when the h2 package is installed
+    CAL_TIMEOUT: float = 5.0
+    CAL_BOOKING_TIMEOUT: float = 30.0
+    NOTION_TIMEOUT: float = 5.0
+    CRM_TIMEOUT: float = 10.0
+    TWILIO_TIMEOUT: float = 10.0
+    # Fail fast instead of holding the caller: breakers, webhook deadlines and hedged reads
+    BREAKER_FAILURE_THRESHOLD: int = 5  # Failures in a row before an upstream is skipped
+    BREAKER_RESET_SECONDS: float = 30.0  # Then one trial call decides whether it's back
+    TWILIO_WEBHOOK_TIMEOUT: float = 15.0  # Twilio gives up on a webhook after this
+    DEADLINE_MARGIN_SECONDS: float = 2.0  # Kept back from upstream calls to build and send TwiML
+    CAL_HEDGE_AFTER_SECONDS: float = 1.0  # Send a second availability request after this; 0 disables
+
+    # Background job queue (post-call SMS, Notion and CRM writes)
+    JOBS_DB_PATH: str = "nova_jobs.db"
+    JOB_WORKERS: int = 4
+    JOB_MAX_ATTEMPTS: int = 6
+    JOB_RETRY_BASE_SECONDS: float = 2.0  # Doubles after each failed attempt
+
+    # Call log (turns, extracted fields, upstream timings and outcomes - query with calls.py)
+    CALL_LOG_ENABLED: bool = True
+    CALL_LOG_DB_PATH: str = "nova_calls.db"
+    CALL_LOG_FLUSH_SECONDS: float = 1.0  # Buffered events are written in one batch this often
+    CALL_LOG_MAX_BUFFERED: int = 10000  # Events dropped beyond this if the disk can't keep up
+
+    # Conversation Store Configuration
+    CONVERSATION_STORE: str = "memory"  # 'memory', 'sqlite' (workers on one host) or 'redis'
+    CONVERSATION_TTL_SECONDS: int = 3600
+    CONVERSATION_MAX_ACTIVE: int = 1000  # Per worker, memory store only
+    REDIS_URL: str = "redis://localhost:6379/0"
+    CONVERSATION_DB_PATH: str = "nova_conversations.db"  # sqlite store only
+
+    # Server Configuration
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    SERVER_MODE: str = "development"  # 'development' (auto-reload) or 'production' (pre-forked workers)
+    SERVER_WORKERS: int = 0  # Production worker processes; 0 = one per CPU core
+    SHUTDOWN_DRAIN_SECONDS: float = 20.0  # On shutdown, uvicorn waits this long for in-flight webhooks, then jobs get as long
+
+
+def parse_value(name: str, raw: str, kind):
+    """Convert an environment variable to a setting's type, or raise ConfigError"""
+    if kind is bool:
+        value = BOOL_VALUES.get(raw.strip().lower())
+        if value is None:
+            raise ConfigError(f"{name}={raw!r} is not a boolean (use true/false, yes/no, on/off or 1/0)")
+        return value
+    if kind in (int, float):
+        try:
+            return kind(raw.strip())
+        except ValueError:
+            raise ConfigError(f"{name}={raw!r} is not a{'n' if kind is int else ''} {kind.__name__}") from None
+    return raw
+
+def load_env_file():
+    """Load variables from the first .env file found (python-dotenv is only imported if there is one)"""
+    for path in ENV_FILES:
+        if os.path.exists(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The process's settings, loaded once on first use"""
+    load_env_file()
+    values = {
+        field.name: parse_value(field.name, os.environ[field.name], field.type)
+        for field in fields(Settings)
+        if field.name in os.environ
+    }
+    settings = Settings(**values)
+    if settings.EXTRACTION_MODEL is None:
+        settings = replace(settings, EXTRACTION_MODEL=settings.OPENAI_MODEL)
+    return settings
+
+def __getattr__(name: str):
+    # Lets `from config import SETTING` work for every Settings field
+    if name in Settings.__dataclass_fields__:
+        return getattr(get_settings(), name)
+    raise AttributeError(f"module 'config' has no attribute '{name}'")
 
 # Nova's personality and instructions
 NOVA_SYSTEM_PROMPT_EN = """You are Nova, a warm and personable AI assistant for Orbyn.ai. You're having a natural phone conversation.
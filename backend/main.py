@@ -1,13 +1,32 @@
 """
 Main Application Entry Point
 Run this file to start the server: python main.py
+
+Development (default): one process with auto-reload.
+Production: python main.py --production [--workers N] runs pre-forked
+workers on uvloop/httptools when they're installed.
 """
+import argparse
+import asyncio
+import importlib.util
+import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import webhooks, health
-from config import HOST, PORT
-import uvicorn
+from routes import webhooks, health, metrics
+from config import (
+    HOST, PORT, SERVER_MODE, SERVER_WORKERS, SHUTDOWN_DRAIN_SECONDS, CONVERSATION_STORE, NOTION_RATE_PER_SECOND,
+    STREAM_RESPONSES, SPECULATIVE_REPLIES
+)
+from services.http_clients import open_clients, close_clients, connection_stats
+from services.jobs import queue
+from services.sms import sender
+from services.notion import writer as notion_writer
+from services.metrics import MetricsMiddleware
+from services.conversation import store as conversation_store
+from services.llm import warm_client
+from services.resilience import DeadlineMiddleware
+from services.call_log import call_log
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,10 +36,31 @@ async def lifespan(app: FastAPI):
     print("=" * 60)
     print(f"Twilio webhook: /webhooks/voice/incoming")
     print(f"Health check: /health")
+    print(f"Metrics: /metrics")
     print("=" * 60)
+    open_clients()
+    # Answer webhooks right away; the OpenAI client finishes loading in the background
+    warm_up = asyncio.create_task(warm_client())
+    await queue.start()
+    await call_log.start()
     yield
     # Shutdown
     print("Nova shutting down...")
+    warm_up.cancel()
+    # uvicorn has already let in-flight webhooks finish (timeout_graceful_shutdown) before we get here
+    if CONVERSATION_STORE == "memory":
+        # CALLS_IN_FLIGHT can't say which calls are this worker's - the store it keeps them in can
+        calls = len(conversation_store)
+        if calls:
+            print(f"{calls} calls still in progress; their state was only in this worker's memory")
+    else:
+        print(f"Calls still in progress keep their state in the {CONVERSATION_STORE} store")
+    await queue.stop(drain_seconds=SHUTDOWN_DRAIN_SECONDS)
+    await sender.stop()
+    await notion_writer.stop()
+    await call_log.stop()
+    print(f"HTTP connection reuse: {connection_stats()}")
+    await close_clients()
 
 # Create FastAPI app
 app = FastAPI(
@@ -42,12 +82,59 @@ app.add_middleware(
 # Register routes
 app.include_router(health.router, tags=["Health"])
 app.include_router(webhooks.router, prefix="/webhooks", tags=["Webhooks"])
+app.include_router(metrics.router, tags=["Metrics"])
+
+# Upstream calls made while answering a voice webhook finish before Twilio gives up on it
+app.add_middleware(DeadlineMiddleware)
+
+# Time every request by route (added last so it wraps the whole stack)
+app.add_middleware(MetricsMiddleware, routes={route.path for route in app.routes})
+
+def server_options(production: bool, workers: int = None) -> dict:
+    """uvicorn settings for development (auto-reload) or production (pre-forked workers)"""
+    if not production:
+        return {"reload": True}
+
+    workers = workers or SERVER_WORKERS or os.cpu_count() or 1
+    if workers > 1 and CONVERSATION_STORE == "memory":
+        # Each call's webhooks can land on any worker, so they must share conversation state.
+        # Workers are fresh processes that read config from the environment.
+        os.environ["CONVERSATION_STORE"] = "sqlite"
+        print("CONVERSATION_STORE=memory can't be shared between workers, using sqlite")
+    if workers > 1 and (STREAM_RESPONSES or SPECULATIVE_REPLIES):
+        # The rest of a streamed reply and speculative drafts live in the worker that started them,
+        # and the next webhook for the call can land on any worker
+        os.environ["STREAM_RESPONSES"] = "false"
+        os.environ["SPECULATIVE_REPLIES"] = "false"
+        print("STREAM_RESPONSES and SPECULATIVE_REPLIES keep per-worker state, turning them off for multiple workers")
+    if workers > 1:
+        # Every worker runs its own job queue and Notion writer, and Notion's limit is per integration
+        os.environ["NOTION_RATE_PER_SECOND"] = str(NOTION_RATE_PER_SECOND / workers)
+        print(f"Pacing Notion writes at {NOTION_RATE_PER_SECOND / workers:.2f}/s per worker")
+
+    return {
+        "workers": workers,
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "timeout_graceful_shutdown": SHUTDOWN_DRAIN_SECONDS,
+        "access_log": False,
+        "backlog": 4096,
+    }
 
 if __name__ == "__main__":
-    print(f"Starting server on {HOST}:{PORT}")
-    uvicorn.run(
-        "main:app",
-        host=HOST,
-        port=PORT,
-        reload=True
-    )
+    parser = argparse.ArgumentParser(description="Run the Nova server")
+    parser.add_argument("--production", action="store_true", default=SERVER_MODE == "production",
+                        help="Pre-forked workers without auto-reload (default from SERVER_MODE)")
+    parser.add_argument("--workers", type=int, help="Worker processes in production (default SERVER_WORKERS, or one per CPU core)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    options = server_options(args.production, args.workers)
+    if args.production:
+        print(f"Starting server on {args.host}:{args.port} "
+              f"({options['workers']} workers, {options['loop']} loop, {options['http']} HTTP)")
+    else:
+        print(f"Starting server on {args.host}:{args.port}")
+    import uvicorn
+    uvicorn.run("main:app", host=args.host, port=args.port, **options)
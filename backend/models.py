@@ -1,7 +1,7 @@
 """
 Data models - defines the structure of data we work with
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 class CallData(BaseModel):
@@ -14,6 +14,14 @@ class CallData(BaseModel):
     status: str = "new"
     notes: str = ""
     
+class ExtractedFields(BaseModel):
+    """Caller details returned by the extraction function call"""
+    name: Optional[str] = Field(None, description="Caller's name")
+    phone: Optional[str] = Field(None, description="Caller's phone number, digits only with country code if given")
+    email: Optional[str] = Field(None, description="Caller's email address")
+    service: Optional[str] = Field(None, description="What the caller needs help with, in a few words")
+    ready_to_book: bool = Field(False, description="True once the caller agreed to book a consultation")
+
 class Message(BaseModel):
     """Represents a single message in the conversation"""
     role: str  # 'user' or 'assistant'
@@ -26,3 +34,8 @@ class ConversationState(BaseModel):
     call_data: CallData = CallData()
     stage: str = "greeting"
     language: str = "en"  # 'en' or 'es'
+    language_streak: int = 0  # Consecutive turns that pointed to the other language
+    summary: str = ""  # Rolling summary of turns folded out of messages
+    offered_slots: list[dict] = []  # Slots last read out to the caller, in the order we said them
+    booking_attempts: int = 0  # Times we re-offered slots because the pick didn't match
+    caller_id: Optional[str] = None  # Number the caller is calling from (Twilio's From), if usable
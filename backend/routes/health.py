@@ -3,6 +3,8 @@ Health Check Routes
 """
 from fastapi import APIRouter
 
+from services.http_clients import connection_stats
+
 router = APIRouter()
 
 @router.get("/health")
@@ -11,7 +13,8 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "Nova Voice Agent",
-        "message": "🚀 Server is running!"
+        "message": "🚀 Server is running!",
+        "http_pools": connection_stats()
     }
 
 @router.get("/")
@@ -21,6 +24,7 @@ async def root():
         "message": "Nova Voice Agent API",
         "endpoints": {
             "health": "/health",
+            "metrics": "/metrics",
             "webhooks": "/webhooks/voice/*"
         }
     }
@@ -0,0 +1,14 @@
+"""
+Metrics Routes - Prometheus scrape endpoint
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from services.metrics import render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Latency histograms, error and fallback counters in Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
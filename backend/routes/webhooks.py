@@ -2,52 +2,107 @@
 Webhook Routes - Twilio calls these endpoints
 """
 from fastapi import APIRouter, Form, Response
-from twilio.twiml.voice_response import VoiceResponse, Gather
-import sys
-import os
 import traceback
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.conversation import generate_response, get_conversation, end_conversation, detect_language
-from services.calendar import get_available_slots, book_appointment, format_slots_for_speech
-from services.sms import send_confirmation_sms
-from services.crm import create_lead, push_to_crm_backend
+from services.conversation import (
+    generate_response, stream_response, hold_pending_turn, take_pending_turn,
+    speculate, take_speculation,
+    find_conversation, get_conversation, save_conversation, end_conversation
+)
+from services.calendar import (
+    get_available_slots, prefetch_available_slots, invalidate_slot_cache, book_appointment, format_slots_for_speech
+)
+from services.slots import resolve_slot
+from services.holds import holds, hold_slots, unheld_slots, release_slots
+from services.followups import enqueue_booking_followups, enqueue_lead
+from services.sms import record_delivery_status
+from services.metrics import STAGE_SECONDS, FALLBACKS, ERRORS, CALLS_IN_FLIGHT
+from services.call_log import call_log, bind_call
+from services import twiml
+from config import STREAM_RESPONSES, SLOT_MAX_REOFFERS
+from models import CallData
 
 router = APIRouter()
 
+# Twilio sends one of these when a call is over, however it ended (and may retry it)
+TERMINAL_STATUSES = ("completed", "busy", "failed", "no-answer", "canceled")
+
+def xml(content: str) -> Response:
+    return Response(content=content, media_type="application/xml")
+
+async def finish_call(call_sid: str):
+    """Drop the call's state and count it out - once, for calls /voice/incoming counted in"""
+    if await end_conversation(call_sid):
+        CALLS_IN_FLIGHT.dec()
+
+async def reoffer_slots(conversation, profile, intro: str, slots: list[dict]) -> Response:
+    """Hold and read out a new set of slots, then listen for the caller's pick again"""
+    offered = await hold_slots(conversation.call_sid, slots)
+    await release_slots(conversation.call_sid, [slot for slot in conversation.offered_slots if slot not in offered])
+    conversation.offered_slots = offered
+    conversation.booking_attempts += 1
+    call_log.record(conversation.call_sid, "slots_offered", slots=[slot["datetime"] for slot in offered])
+    await save_conversation(conversation)
+    slots_speech = format_slots_for_speech(offered, conversation.language)
+    return xml(twiml.offer_slots(f"{intro} {slots_speech}", profile))
+
 @router.post("/voice/incoming")
-async def handle_incoming_call(CallSid: str = Form(...)):
+async def handle_incoming_call(CallSid: str = Form(...), From: str = Form(None)):
     """Called when someone calls your Twilio number"""
     print(f"Incoming call: {CallSid}")
+    bind_call(CallSid)
 
     try:
-        response = VoiceResponse()
-        # Set language hints to support both English and Spanish
-        gather = Gather(
-            input='speech',
-            action='/webhooks/voice/process',
-            speechTimeout='auto',
-            language='en-US',
-            hints='hola, hello, buenos días, ayuda, help, español, spanish',
-            speech_model='experimental_conversations'
-        )
-
-        # Use Google's more natural neural voice
-        gather.say(
-            "Hey there! This is Nova from Orbyn AI. How can I help you today?",
-            voice='Google.en-US-Neural2-F'
-        )
-
-        response.append(gather)
-        response.say("I didn't hear anything. Please call back when you're ready. Goodbye!", voice='Google.en-US-Neural2-F')
-
-        return Response(content=str(response), media_type="application/xml")
+        # "Didn't catch that" redirects back here - only the first visit starts the call
+        if await find_conversation(CallSid) is None:
+            CALLS_IN_FLIGHT.inc()
+            call_log.record(CallSid, "call_started", from_number=From)
+            await get_conversation(CallSid)
+
+        # Same greeting for every caller, with speech hints for English and Spanish
+        return xml(twiml.GREETING)
     except Exception as e:
         print(f"Error in incoming call: {e}")
         traceback.print_exc()
-        response = VoiceResponse()
-        response.say("Sorry, there was an error. Please try again later.", voice='Google.en-US-Neural2-F')
-        return Response(content=str(response), media_type="application/xml")
+        ERRORS.inc("/voice/incoming")
+        return xml(twiml.INCOMING_ERROR)
+
+async def build_turn_response(call_sid: str, ai_response: str, extracted_data: dict) -> Response:
+    """Turn Nova's reply into TwiML - offer slots when ready to book, otherwise keep listening"""
+    conversation = await get_conversation(call_sid)
+    profile = twiml.get_profile(conversation.language)
+
+    # Warm the availability cache once the call looks headed for a booking, so the
+    # offer is served from cache instead of waiting on Cal.com. Not on the phone:
+    # caller ID fills that in on every call's first turn.
+    call_data = conversation.call_data
+    if call_data.name or call_data.service or extracted_data.get("ready_to_book"):
+        prefetch_available_slots()
+
+    # Check if ready to book
+    if (conversation.call_data.name and
+        conversation.call_data.phone and
+        extracted_data.get("ready_to_book")):
+
+        print("Ready to book, fetching slots...")
+        with STAGE_SECONDS.time("offer_slots"):
+            slots = await get_available_slots()
+            # Hold what we read out so a concurrent caller isn't offered the same slots
+            offered = await hold_slots(call_sid, slots)
+            await release_slots(call_sid, [slot for slot in conversation.offered_slots if slot not in offered])
+        print(f"Got {len(slots)} slots, holding {len(offered)}")
+        slots_speech = format_slots_for_speech(offered, conversation.language)
+
+        # Remember what we read out so "the second one" means the same thing at /voice/book
+        conversation.offered_slots = offered
+        conversation.booking_attempts = 0
+        call_log.record(call_sid, "slots_offered", slots=[slot["datetime"] for slot in offered])
+        await save_conversation(conversation)
+
+        return xml(twiml.offer_slots(f"{ai_response} {slots_speech}".strip(), profile))
+
+    # Continue conversation
+    return xml(twiml.listen(ai_response, profile))
 
 @router.post("/voice/process")
 async def process_speech(
@@ -57,93 +112,113 @@ async def process_speech(
 ):
     """Called after the user speaks"""
     print(f"User said: {SpeechResult}")
+    bind_call(CallSid)
 
     try:
         if not SpeechResult:
-            response = VoiceResponse()
-            response.say("Sorry, I didn't catch that. Could you say that again?", voice='Google.en-US-Neural2-F')
-            response.redirect('/webhooks/voice/incoming')
-            return Response(content=str(response), media_type="application/xml")
-
-        # Detect language from user's speech
-        detected_lang = detect_language(SpeechResult)
-        print(f"Detected language: {detected_lang}")
-
-        # Generate AI response with detected language
-        ai_response, extracted_data = generate_response(CallSid, SpeechResult, detected_lang)
+            return xml(twiml.DIDNT_CATCH)
+
+        speculation = take_speculation(CallSid, SpeechResult)
+        if speculation:
+            # Reply was already drafted from the partial transcript while the caller was talking
+            with STAGE_SECONDS.time("reply"):
+                ai_response, extracted_data = await generate_response(CallSid, SpeechResult, speculation=speculation, caller_id=From)
+        elif STREAM_RESPONSES:
+            # Speak the first sentence now and fetch the rest via /voice/continue
+            with STAGE_SECONDS.time("first_sentence"):
+                first_sentence, pending = await stream_response(CallSid, SpeechResult, caller_id=From)
+            print(f"Nova says (streamed): {first_sentence}")
+
+            if first_sentence:
+                hold_pending_turn(CallSid, pending)
+                conversation = await get_conversation(CallSid)
+                profile = twiml.get_profile(conversation.language)
+                return xml(twiml.speak_then_redirect(first_sentence, profile, '/webhooks/voice/continue'))
+
+            ai_response, extracted_data = await pending
+        else:
+            # Generate AI response (language is detected per turn and kept sticky per call)
+            with STAGE_SECONDS.time("reply"):
+                ai_response, extracted_data = await generate_response(CallSid, SpeechResult, caller_id=From)
 
         print(f"Nova says: {ai_response}")
         print(f"Extracted: {extracted_data}")
 
-        conversation = get_conversation(CallSid)
+        return await build_turn_response(CallSid, ai_response, extracted_data)
 
-        # Get language settings with more natural neural voices
-        lang_code = 'es-MX' if conversation.language == 'es' else 'en-US'
-        voice = 'Google.es-US-Neural2-A' if conversation.language == 'es' else 'Google.en-US-Neural2-F'
-        fallback_message = "¿Sigues ahí?" if conversation.language == 'es' else "Hello? You still there?"
-
-        # Check if ready to book
-        if (conversation.call_data.name and
-            conversation.call_data.phone and
-            extracted_data.get("ready_to_book")):
-
-            print("Ready to book, fetching slots...")
-            slots = await get_available_slots()
-            print(f"Got {len(slots)} slots")
-            slots_speech = format_slots_for_speech(slots)
-
-            response = VoiceResponse()
-            gather = Gather(
-                input='speech',
-                action='/webhooks/voice/book',
-                speechTimeout='auto',
-                language=lang_code,
-                speech_model='experimental_conversations'
-            )
-            gather.say(f"{ai_response} {slots_speech}", voice=voice)
-            response.append(gather)
-
-            return Response(content=str(response), media_type="application/xml")
-
-        # Continue conversation
-        response = VoiceResponse()
-        gather = Gather(
-            input='speech',
-            action='/webhooks/voice/process',
-            speechTimeout='auto',
-            language=lang_code,
-            speech_model='experimental_conversations'
-        )
-        gather.say(ai_response, voice=voice)
-        response.append(gather)
-
-        response.say(fallback_message, voice=voice)
-        response.redirect('/webhooks/voice/process')
+    except Exception as e:
+        print(f"Error in process_speech: {e}")
+        traceback.print_exc()
+        ERRORS.inc("/voice/process")
+        FALLBACKS.inc("tech_issue")
+        return xml(twiml.TECH_ISSUE)
+
+@router.post("/voice/partial")
+async def partial_speech(CallSid: str = Form(...), StableSpeechResult: str = Form(None)):
+    """Twilio's partialResultCallback - start drafting a reply while the caller is still talking"""
+    bind_call(CallSid)
+    try:
+        if StableSpeechResult:
+            await speculate(CallSid, StableSpeechResult)
+    except Exception as e:
+        print(f"Error in partial_speech: {e}")
+        ERRORS.inc("/voice/partial")
+    return {"status": "received"}
+
+@router.post("/voice/continue")
+async def continue_speech(CallSid: str = Form(...)):
+    """Called right after a streamed first sentence - speaks the rest of the reply"""
+    bind_call(CallSid)
+    try:
+        pending = take_pending_turn(CallSid)
+        if pending is None:
+            # Turn was streamed on another worker or already consumed - just keep listening
+            print(f"No pending reply for {CallSid}, resuming gather")
+            return await build_turn_response(CallSid, "", {})
+
+        with STAGE_SECONDS.time("rest_of_reply"):
+            rest, extracted_data = await pending
+        print(f"Nova continues: {rest}")
+        print(f"Extracted: {extracted_data}")
 
-        return Response(content=str(response), media_type="application/xml")
+        return await build_turn_response(CallSid, rest, extracted_data)
 
     except Exception as e:
-        print(f"Error in process_speech: {e}")
+        print(f"Error in continue_speech: {e}")
         traceback.print_exc()
-        response = VoiceResponse()
-        response.say("Oops, I'm having a little tech issue. Let me have someone call you back. Thanks!", voice='Google.en-US-Neural2-F')
-        return Response(content=str(response), media_type="application/xml")
+        ERRORS.inc("/voice/continue")
+        FALLBACKS.inc("tech_issue")
+        return xml(twiml.TECH_ISSUE)
 
 @router.post("/voice/book")
 async def book_slot(CallSid: str = Form(...), SpeechResult: str = Form(None)):
     """Handle booking confirmation"""
     print(f"Booking: {SpeechResult}")
+    bind_call(CallSid)
 
     try:
-        conversation = get_conversation(CallSid)
+        conversation = await get_conversation(CallSid)
+        profile = twiml.get_profile(conversation.language)
+
+        # Served from the availability cache warmed while we were offering slots,
+        # minus anything other live calls are holding
+        slots = await unheld_slots(CallSid, await get_available_slots())
+        match = resolve_slot(SpeechResult, slots, conversation.offered_slots)
+        can_reoffer = conversation.booking_attempts < SLOT_MAX_REOFFERS
 
-        # Get language settings with natural voices
-        voice = 'Google.es-US-Neural2-A' if conversation.language == 'es' else 'Google.en-US-Neural2-F'
+        if match.slot and not await holds.acquire(match.slot["datetime"], CallSid):
+            # Another call grabbed it since we looked
+            print(f"Slot {match.slot['datetime']} was just held by another call")
+            match.slot, match.alternatives = None, [slot for slot in slots if slot != match.slot]
 
-        slots = await get_available_slots()
+        if match.slot is None and match.alternatives and can_reoffer:
+            # Nothing open matches what they said - offer the closest slots and listen again
+            FALLBACKS.inc("slot_reoffer")
+            intro = profile.slot_unclear if match.unclear else profile.slot_unavailable
+            return await reoffer_slots(conversation, profile, intro, match.alternatives)
 
-        if slots:
-            selected_slot = slots[0]
+        if match.slot:
+            selected_slot = match.slot
 
             print(f"Booking appointment for {conversation.call_data.name} at {selected_slot['datetime']}")
 
@@ -155,112 +230,103 @@ async def book_slot(CallSid: str = Form(...), SpeechResult: str = Form(None)):
                 datetime_slot=selected_slot["datetime"]
             )
 
+            call_log.record(CallSid, "booking", slot=selected_slot["datetime"], success=booking_result["success"],
+                            error=booking_result.get("error"))
             if booking_result["success"]:
                 conversation.call_data.appointment_time = selected_slot["datetime"]
                 conversation.call_data.status = "booked"
+                call_log.record(CallSid, "outcome", status="booked", call_data=conversation.call_data.model_dump())
 
-                print("Booking successful, sending SMS...")
-                # Send SMS
+                print("Booking successful, queueing SMS, Notion and CRM follow-ups...")
+                # SMS, Notion and CRM run in the background so the caller hears the confirmation right away
                 try:
-                    send_confirmation_sms(
-                        to_phone=conversation.call_data.phone,
-                        name=conversation.call_data.name,
+                    await enqueue_booking_followups(
+                        conversation.call_data,
+                        CallSid,
                         appointment_time=f"{selected_slot['date']} at {selected_slot['time']}"
                     )
-                except Exception as sms_error:
-                    print(f"SMS error (non-fatal): {sms_error}")
+                except Exception as queue_error:
+                    print(f"Failed to queue follow-ups (non-fatal): {queue_error}")
 
-                print("Saving to Notion...")
-                # Save to Notion
-                try:
-                    await create_lead(conversation.call_data, CallSid)
-                except Exception as notion_error:
-                    print(f"Notion error (non-fatal): {notion_error}")
+                await finish_call(CallSid)
+                return xml(twiml.booking_confirmed(profile, selected_slot['date'], selected_slot['time']))
 
-                # Push to CRM backend
-                print("Pushing to CRM backend...")
-                try:
-                    await push_to_crm_backend(conversation.call_data, CallSid)
-                except Exception as crm_error:
-                    print(f"CRM backend error (non-fatal): {crm_error}")
-
-                response = VoiceResponse()
-                if conversation.language == 'es':
-                    response.say(
-                        f"¡Perfecto! Te reservé para el {selected_slot['date']} a las {selected_slot['time']}. "
-                        f"Te acabo de enviar un mensaje de confirmación. ¡Nos vemos pronto!",
-                        voice=voice
-                    )
-                else:
-                    response.say(
-                        f"Perfect! You're all set for {selected_slot['date']} at {selected_slot['time']}. "
-                        f"Just sent you a confirmation text. Talk to you soon!",
-                        voice=voice
-                    )
+            print(f"Booking failed: {booking_result.get('error')}")
+            if booking_result.get("unavailable"):
+                # Cal.com is down or too slow - re-offering would fail the same way, so go to a callback
+                FALLBACKS.inc("calcom_unavailable")
+                can_reoffer = False
 
-                end_conversation(CallSid)
-                return Response(content=str(response), media_type="application/xml")
-            else:
-                print(f"Booking failed: {booking_result.get('error')}")
+            # Most likely someone booked it outside Nova - let it go and refresh availability
+            await release_slots(CallSid, [selected_slot])
+            invalidate_slot_cache()
+            prefetch_available_slots()
 
-        # Fallback
-        response = VoiceResponse()
-        if conversation.language == 'es':
-            response.say(
-                "Hmm, tengo un problema técnico. Déjame que alguien del equipo te llame de vuelta. ¡Gracias!",
-                voice=voice
-            )
-        else:
-            response.say(
-                "Hmm, I'm having a little tech issue. Let me have someone from the team call you back. Thanks!",
-                voice=voice
-            )
+            remaining = [slot for slot in conversation.offered_slots if slot != selected_slot]
+            if remaining and can_reoffer:
+                # Offer the slots we're still holding instead of dropping to a callback
+                FALLBACKS.inc("slot_taken")
+                return await reoffer_slots(conversation, profile, profile.slot_taken, remaining)
 
+        # Fallback
+        FALLBACKS.inc("booking_callback")
         conversation.call_data.status = "needs_callback"
+        call_log.record(CallSid, "outcome", status="needs_callback", call_data=conversation.call_data.model_dump())
+        await save_conversation(conversation)
+
+        # Save to Notion and push to CRM backend in the background
         try:
-            await create_lead(conversation.call_data, CallSid)
-        except Exception as e:
-            print(f"Failed to save lead: {e}")
-        
-        # Push to CRM backend
-        try:
-            await push_to_crm_backend(conversation.call_data, CallSid)
+            await enqueue_lead(conversation.call_data, CallSid)
         except Exception as e:
-            print(f"Failed to push to CRM backend: {e}")
+            print(f"Failed to queue lead: {e}")
 
-        return Response(content=str(response), media_type="application/xml")
+        return xml(twiml.CALLBACK[profile.language])
 
     except Exception as e:
         print(f"Error in book_slot: {e}")
         traceback.print_exc()
-        response = VoiceResponse()
-        response.say("Oops, having a tech issue. Let me have someone call you back. Thanks!", voice='Google.en-US-Neural2-F')
-        return Response(content=str(response), media_type="application/xml")
+        ERRORS.inc("/voice/book")
+        FALLBACKS.inc("tech_issue")
+        return xml(twiml.BOOKING_ERROR)
 
 @router.post("/voice/status")
 async def call_status(CallSid: str = Form(...), CallStatus: str = Form(...)):
     """Receives call status updates"""
     print(f"Call {CallSid} status: {CallStatus}")
+    bind_call(CallSid)
 
     try:
+        if CallStatus in TERMINAL_STATUSES:
+            call_log.record(CallSid, "call_ended", call_status=CallStatus)
+
         if CallStatus == "completed":
-            conversation = get_conversation(CallSid)
-            if conversation.call_data.status == "new":
-                conversation.call_data.status = "no_booking"
+            # Looked up, not created: a call that booked, never reached /voice or was
+            # already ended by an earlier attempt of this callback has no state left here
+            conversation = await find_conversation(CallSid)
+            call_data = conversation.call_data if conversation else CallData()
+            if call_data.status == "new":
+                call_data.status = "no_booking"
+                if conversation and (conversation.messages or conversation.summary):
+                    call_log.record(CallSid, "outcome", status="no_booking", call_data=call_data.model_dump())
+
+                # Save to Notion and push to CRM backend in the background
                 try:
-                    await create_lead(conversation.call_data, CallSid)
+                    await enqueue_lead(call_data, CallSid)
                 except Exception as e:
-                    print(f"Failed to save lead on completion: {e}")
-                
-                # Push to CRM backend
-                try:
-                    await push_to_crm_backend(conversation.call_data, CallSid)
-                except Exception as e:
-                    print(f"Failed to push to CRM backend on completion: {e}")
+                    print(f"Failed to queue lead on completion: {e}")
 
-            end_conversation(CallSid)
+        if CallStatus in TERMINAL_STATUSES:
+            await finish_call(CallSid)
 
         return {"status": "received"}
     except Exception as e:
         print(f"Error in call_status: {e}")
+        ERRORS.inc("/voice/status")
         return {"status": "error", "message": str(e)}
+
+@router.post("/sms/status")
+async def sms_status(MessageSid: str = Form(...), MessageStatus: str = Form(...), ErrorCode: str = Form(None)):
+    """Receives SMS delivery status updates"""
+    print(f"SMS {MessageSid} status: {MessageStatus}")
+    record_delivery_status(MessageSid, MessageStatus, ErrorCode)
+    return {"status": "received"}
@@ -1,63 +1,163 @@
 """
 Calendar Service - Integrates with Cal.com
 """
-import httpx
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import time
 
-from config import CAL_API_KEY, CAL_EVENT_TYPE
+from config import (
+    CAL_API_KEY, CAL_API_V2_URL, CAL_TIMEOUT, CAL_BOOKING_TIMEOUT, CAL_HEDGE_AFTER_SECONDS,
+    SLOT_CACHE_TTL_SECONDS, SLOT_CACHE_MAX_STALE_SECONDS
+)
+from services.http_clients import get_client
+from services.resilience import call_upstream, detached, UpstreamUnavailable
+from services.metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS, FALLBACKS, CACHE_LOOKUPS
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 # Event Type ID for free-consultation
 EVENT_TYPE_ID = 3871645
 
-async def get_available_slots(days_ahead: int = 7) -> list[dict]:
-    """Get available time slots from Cal.com"""
+SPANISH_DAY_NAMES = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+
+# Availability cache: (event type, start date, end date) -> (fetched_at, slots)
+slot_cache: dict[tuple, tuple[float, list[dict]]] = {}
+
+# In-flight fetches per cache key, so concurrent callers share one round trip
+slot_refreshes: dict[tuple, asyncio.Task] = {}
+
+# Bumped on every invalidation - a fetch started before it must not refill the cache
+slot_cache_generation = 0
+
+def slot_window(days_ahead: int) -> tuple:
+    """Cache key for the next days_ahead days in Eastern Time"""
+    start_date = datetime.now(ZoneInfo("America/New_York")).date()
+    end_date = start_date + timedelta(days=days_ahead)
+    return (EVENT_TYPE_ID, start_date.isoformat(), end_date.isoformat())
+
+async def fetch_available_slots(window: tuple) -> list[dict]:
+    """Fetch available time slots for a cache window from Cal.com (raises on failure)"""
+    event_type_id, start_date, end_date = window
+    eastern = ZoneInfo("America/New_York")
+
+    url = f"{CAL_API_V2_URL}/slots/available"
+    params = {
+        "apiKey": CAL_API_KEY,
+        "eventTypeId": event_type_id,
+        "startTime": start_date,
+        "endTime": end_date,
+    }
+
+    async def request():
+        response = await get_client("calcom").get(url, params=params)
+        response.raise_for_status()
+        return response
+
     try:
-        # Get current time in Eastern timezone
-        eastern = ZoneInfo("America/New_York")
-        now_et = datetime.now(eastern)
-        start_date = now_et.date()
-        end_date = start_date + timedelta(days=days_ahead)
+        with UPSTREAM_SECONDS.time("calcom", "slots"):
+            # Reading availability is idempotent, so a slow request gets a hedge
+            response = await call_upstream("calcom", request, CAL_TIMEOUT, hedge_after=CAL_HEDGE_AFTER_SECONDS)
+    except Exception:
+        UPSTREAM_ERRORS.inc("calcom", "slots")
+        raise
+    data = response.json()
 
-        url = f"https://api.cal.com/v2/slots/available"
-        params = {
-            "apiKey": CAL_API_KEY,
-            "eventTypeId": EVENT_TYPE_ID,
-            "startTime": start_date.isoformat(),
-            "endTime": end_date.isoformat(),
-        }
+    slots = []
+    if "data" in data and "slots" in data["data"]:
+        for date, times in data["data"]["slots"].items():
+            for slot in times:
+                # Parse UTC time and convert to Eastern Time
+                time_obj_utc = datetime.fromisoformat(slot["time"].replace('Z', '+00:00'))
+                time_obj_et = time_obj_utc.astimezone(eastern)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+                # Format for display in ET
+                local_time = time_obj_et.strftime("%I:%M %p")
+                local_date = time_obj_et.strftime("%Y-%m-%d")
+
+                slots.append({
+                    "date": local_date,
+                    "time": local_time,
+                    "datetime": slot["time"]  # Keep original UTC for booking
+                })
+
+    print(f"Found {len(slots)} available slots")
+    # Keep the whole window - only the first few are read out, but the caller may ask for any of them
+    return slots
 
-            slots = []
-            if "data" in data and "slots" in data["data"]:
-                for date, times in data["data"]["slots"].items():
-                    for slot in times:
-                        # Parse UTC time and convert to Eastern Time
-                        time_obj_utc = datetime.fromisoformat(slot["time"].replace('Z', '+00:00'))
-                        time_obj_et = time_obj_utc.astimezone(eastern)
+async def refresh_slot_cache(window: tuple) -> list[dict]:
+    """Fetch a window into the cache, joining a fetch that is already running"""
+    task = slot_refreshes.get(window)
+    if task is None:
+        generation = slot_cache_generation
 
-                        # Format for display in ET
-                        local_time = time_obj_et.strftime("%I:%M %p")
-                        local_date = time_obj_et.strftime("%Y-%m-%d")
+        async def refresh() -> list[dict]:
+            try:
+                slots = await fetch_available_slots(window)
+                if generation == slot_cache_generation:
+                    slot_cache[window] = (time.monotonic(), slots)
+                return slots
+            finally:
+                if slot_refreshes.get(window) is task:
+                    del slot_refreshes[window]
 
-                        slots.append({
-                            "date": local_date,
-                            "time": local_time,
-                            "datetime": slot["time"]  # Keep original UTC for booking
-                        })
+        task = asyncio.create_task(refresh())
+        slot_refreshes[window] = task
 
-            print(f"Found {len(slots)} available slots")
-            return slots[:5]
+    # Shield so a caller hanging up doesn't cancel the fetch for everyone else
+    return await asyncio.shield(task)
+
+def prefetch_available_slots(days_ahead: int = 7):
+    """Warm the availability cache in the background (no-op if it's already fresh)"""
+    window = slot_window(days_ahead)
+    cached = slot_cache.get(window)
+    if cached and time.monotonic() - cached[0] < SLOT_CACHE_TTL_SECONDS:
+        return
+    if window in slot_refreshes:
+        return
+
+    async def prefetch():
+        try:
+            await refresh_slot_cache(window)
+        except Exception as e:
+            print(f"Slot prefetch failed: {e}")
+
+    # Not tied to the webhook that triggered it - the next caller may be the one who waits
+    detached(prefetch())
+
+def invalidate_slot_cache():
+    """Drop cached availability, e.g. after a booking took one of the slots"""
+    global slot_cache_generation
+    slot_cache_generation += 1
+    slot_cache.clear()
+    # Fetches already running may predate the booking - the next caller starts a fresh one
+    slot_refreshes.clear()
+
+async def get_available_slots(days_ahead: int = 7) -> list[dict]:
+    """
+    Get available time slots from Cal.com
+
+    Served from the availability cache when possible. Entries older than
+    SLOT_CACHE_TTL_SECONDS are still served (up to SLOT_CACHE_MAX_STALE_SECONDS)
+    while a background refresh runs, so the caller never waits on Cal.com twice.
+    """
+    window = slot_window(days_ahead)
+    cached = slot_cache.get(window)
+    if cached:
+        age = time.monotonic() - cached[0]
+        if age < SLOT_CACHE_TTL_SECONDS:
+            CACHE_LOOKUPS.inc("slots", "hit")
+            return list(cached[1])
+        if age < SLOT_CACHE_MAX_STALE_SECONDS:
+            CACHE_LOOKUPS.inc("slots", "stale")
+            prefetch_available_slots(days_ahead)
+            return list(cached[1])
+
+    CACHE_LOOKUPS.inc("slots", "miss")
+    try:
+        return list(await refresh_slot_cache(window))
 
     except Exception as e:
         print(f"Error getting slots: {e}")
+        FALLBACKS.inc("default_slots")
         # Return default slots for testing in Eastern Time
         eastern = ZoneInfo("America/New_York")
         tomorrow_et = datetime.now(eastern) + timedelta(days=1)
@@ -86,7 +186,7 @@ async def get_available_slots(days_ahead: int = 7) -> list[dict]:
 async def book_appointment(name: str, email: str, phone: str, datetime_slot: str) -> dict:
     """Book an appointment in Cal.com"""
     try:
-        url = f"https://api.cal.com/v2/bookings"
+        url = f"{CAL_API_V2_URL}/bookings"
 
         headers = {
             "Authorization": f"Bearer {CAL_API_KEY}",
@@ -106,27 +206,43 @@ async def book_appointment(name: str, email: str, phone: str, datetime_slot: str
             "metadata": {"source": "nova-voice-agent", "phone": phone}
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=booking_data, headers=headers)
+        async def request():
+            response = await get_client("calcom").post(url, json=booking_data, headers=headers, timeout=CAL_BOOKING_TIMEOUT)
             response.raise_for_status()
-            result = response.json()
+            return response
+
+        with UPSTREAM_SECONDS.time("calcom", "booking"):
+            # Never hedged - a second POST could book twice
+            response = await call_upstream("calcom", request, CAL_BOOKING_TIMEOUT)
+        result = response.json()
 
-            print(f"Booking successful: {result}")
-            return {
-                "success": True,
-                "booking_id": result.get("data", {}).get("id"),
-                "booking_url": result.get("data", {}).get("url"),
-                "start_time": datetime_slot
-            }
+        print(f"Booking successful: {result}")
+
+        # That slot is gone - drop cached availability and refetch in the background
+        invalidate_slot_cache()
+        prefetch_available_slots()
+        return {
+            "success": True,
+            "booking_id": result.get("data", {}).get("id"),
+            "booking_url": result.get("data", {}).get("url"),
+            "start_time": datetime_slot
+        }
 
+    except UpstreamUnavailable as e:
+        # Cal.com is down or too slow to answer before Twilio gives up - not a taken slot
+        print(f"Booking skipped: {e}")
+        UPSTREAM_ERRORS.inc("calcom", "booking")
+        return {"success": False, "error": str(e), "unavailable": True}
     except Exception as e:
         print(f"Error booking: {e}")
+        UPSTREAM_ERRORS.inc("calcom", "booking")
         return {"success": False, "error": str(e)}
 
-def format_slots_for_speech(slots: list[dict]) -> str:
+def format_slots_for_speech(slots: list[dict], language: str = "en") -> str:
     """Format slots for natural speech"""
+    spanish = language == "es"
     if not slots:
-        return "I don't have any available slots right now."
+        return "No tengo horarios disponibles ahora mismo." if spanish else "I don't have any available slots right now."
 
     by_date = {}
     for slot in slots[:3]:
@@ -139,12 +255,19 @@ def format_slots_for_speech(slots: list[dict]) -> str:
     parts = []
     for date, times in by_date.items():
         dt = datetime.fromisoformat(date)
-        day_name = dt.strftime("%A")
 
+        if spanish:
+            times_str = times[0] if len(times) == 1 else ", ".join(times[:-1]) + f" o {times[-1]}"
+            parts.append(f"el {SPANISH_DAY_NAMES[dt.weekday()]} a las {times_str}")
+            continue
+
+        day_name = dt.strftime("%A")
         if len(times) == 1:
             parts.append(f"{day_name} at {times[0]}")
         else:
             times_str = ", ".join(times[:-1]) + f", or {times[-1]}"
             parts.append(f"{day_name} at {times_str}")
 
+    if spanish:
+        return "Tengo disponible " + ", ".join(parts) + ". ¿Cuál te funciona mejor?"
     return "I have openings " + ", ".join(parts) + ". Which works best for you?"
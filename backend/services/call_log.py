@@ -0,0 +1,222 @@
+"""
+Call Log - Append-only record of what happened on every call
+
+end_conversation drops a call's state when it hangs up, and Notion only gets
+the lead summary. So each turn, extracted field, upstream call and outcome is
+appended here as an event.
+
+Recording an event only appends a tuple to an in-memory buffer, so webhooks
+never wait on disk. A background writer commits the buffer in one transaction
+per flush to a SQLite database in WAL mode with synchronous=NORMAL, so fsyncs
+happen per checkpoint rather than per event. Readers (backend/calls.py) open
+the database read-only and never block the writer.
+"""
+import asyncio
+import contextvars
+import json
+import sqlite3
+import threading
+import time
+
+from config import CALL_LOG_ENABLED, CALL_LOG_DB_PATH, CALL_LOG_FLUSH_SECONDS, CALL_LOG_MAX_BUFFERED
+from services.metrics import CALL_LOG_EVENTS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    call_sid TEXT NOT NULL,
+    at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_call ON events (call_sid, id);
+CREATE INDEX IF NOT EXISTS events_kind ON events (kind, at);
+"""
+
+# CallSid of the webhook being answered, so upstream timings land on the right call
+current_call: contextvars.ContextVar[str | None] = contextvars.ContextVar("nova_call_sid", default=None)
+
+def bind_call(call_sid: str):
+    """Attribute upstream calls made while handling this webhook to call_sid"""
+    current_call.set(call_sid)
+
+class CallLog:
+    """Buffered, append-only event log in a SQLite WAL database"""
+
+    def __init__(self, db_path: str, flush_seconds: float = 1.0, max_buffered: int = 10000, enabled: bool = True):
+        self.db_path = db_path
+        self.flush_seconds = flush_seconds
+        self.max_buffered = max_buffered
+        self.enabled = enabled
+        self._buffer: list[tuple] = []
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writer = None
+        self._wakeup = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            # Durable at each checkpoint rather than each commit - losing the last
+            # second of a log on power loss is fine, fsync per event is not
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def record(self, call_sid: str | None, kind: str, **data):
+        """Append an event (serialized and written later by the background writer)"""
+        if not self.enabled or not call_sid:
+            return
+        if len(self._buffer) >= self.max_buffered:
+            # The writer can't keep up - drop rather than grow without bound
+            CALL_LOG_EVENTS.inc("dropped")
+            return
+        self._buffer.append((call_sid, time.time(), kind, data))
+        if len(self._buffer) >= self.max_buffered // 2 and self._wakeup:
+            self._wakeup.set()
+
+    def record_upstream(self, upstream: str, seconds: float, result: str):
+        """Timing of an upstream call made for the current webhook's call, if there is one"""
+        self.record(current_call.get(), "upstream", upstream=upstream, ms=round(seconds * 1000, 1), result=result)
+
+    def _write(self, batch: list[tuple]):
+        rows = [
+            (call_sid, at, kind, json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str))
+            for call_sid, at, kind, data in batch
+        ]
+        with self._db_lock:
+            db = self._connect()
+            db.execute("BEGIN")
+            try:
+                db.executemany("INSERT INTO events (call_sid, at, kind, data) VALUES (?, ?, ?, ?)", rows)
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    async def flush(self):
+        """Write everything buffered so far in one transaction"""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self._write, batch)
+            CALL_LOG_EVENTS.inc("written", amount=len(batch))
+        except Exception as e:
+            print(f"Call log write failed, dropped {len(batch)} events: {e}")
+            CALL_LOG_EVENTS.inc("dropped", amount=len(batch))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self):
+        """Start the background writer (called from the app lifespan)"""
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self._connect)
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._run())
+        print(f"Call log writing to {self.db_path}")
+
+    async def stop(self):
+        """Stop the writer and flush what's left"""
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        await self.flush()
+
+# The app's call log
+call_log = CallLog(CALL_LOG_DB_PATH, CALL_LOG_FLUSH_SECONDS, CALL_LOG_MAX_BUFFERED, enabled=CALL_LOG_ENABLED)
+
+def open_readonly(db_path: str) -> sqlite3.Connection:
+    """Read-only connection for queries - never blocks the live writer"""
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+def read_events(db: sqlite3.Connection, call_sid: str) -> list[dict]:
+    """Every event for a call, oldest first"""
+    rows = db.execute("SELECT at, kind, data FROM events WHERE call_sid = ? ORDER BY id", (call_sid,))
+    return [{"at": at, "kind": kind, **json.loads(data)} for at, kind, data in rows]
+
+def call_outcome(outcome: str | None, ended: bool) -> str:
+    """A call's last outcome event (hanging up before one means no booking)"""
+    if outcome:
+        return json.loads(outcome)["status"]
+    return "no_booking" if ended else "in_progress"
+
+def list_calls(db: sqlite3.Connection, since: float = 0, limit: int = 20) -> list[dict]:
+    """Most recent calls with their turn count, duration and outcome"""
+    rows = db.execute(
+        """
+        SELECT call_sid, MIN(at), MAX(at),
+               SUM(kind = 'turn'),
+               SUM(kind = 'call_ended'),
+               (SELECT data FROM events AS outcome
+                WHERE outcome.call_sid = events.call_sid AND outcome.kind = 'outcome'
+                ORDER BY id DESC LIMIT 1)
+        FROM events
+        WHERE call_sid IN (SELECT DISTINCT call_sid FROM events WHERE at >= ?)
+        GROUP BY call_sid
+        ORDER BY MIN(at) DESC
+        LIMIT ?
+        """,
+        (since, limit)
+    )
+    calls = []
+    for call_sid, started, last, turns, ended, outcome in rows:
+        calls.append({
+            "call_sid": call_sid,
+            "started": started,
+            "seconds": round(last - started, 1),
+            "turns": turns or 0,
+            "outcome": call_outcome(outcome, ended),
+        })
+    return calls
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def call_stats(db: sqlite3.Connection, since: float = 0) -> dict:
+    """Outcomes, how replies were produced and upstream latency across calls since a time"""
+    outcomes: dict[str, int] = {}
+    reply_sources: dict[str, int] = {}
+    upstream_ms: dict[str, list[float]] = {}
+    upstream_failures: dict[str, int] = {}
+    calls = list_calls(db, since, limit=-1)
+    for call in calls:
+        outcomes[call["outcome"]] = outcomes.get(call["outcome"], 0) + 1
+
+    rows = db.execute("SELECT call_sid, kind, data FROM events WHERE at >= ? AND kind IN ('turn', 'upstream')", (since,))
+    for call_sid, kind, data in rows:
+        event = json.loads(data)
+        if kind == "turn":
+            reply_sources[event["source"]] = reply_sources.get(event["source"], 0) + 1
+        else:
+            upstream_ms.setdefault(event["upstream"], []).append(event["ms"])
+            if event["result"] != "ok":
+                upstream_failures[event["upstream"]] = upstream_failures.get(event["upstream"], 0) + 1
+
+    return {
+        "calls": len(calls),
+        "turns": sum(reply_sources.values()),
+        "outcomes": outcomes,
+        "reply_sources": reply_sources,
+        "upstreams": {
+            upstream: {
+                "requests": len(values),
+                "failures": upstream_failures.get(upstream, 0),
+                "p50_ms": percentile(values, 0.5),
+                "p95_ms": percentile(values, 0.95),
+            }
+            for upstream, values in sorted(upstream_ms.items())
+        },
+    }
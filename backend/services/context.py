@@ -0,0 +1,94 @@
+"""
+Context Service - Keeps the prompt sent to OpenAI within a token budget
+
+Older turns are folded into a short rolling summary and the call data we
+already extracted, so prompt size (and per-turn latency and cost) stays
+flat however long the call runs. The most recent turns are always kept
+word for word.
+"""
+import re
+
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_KEEP_RECENT, CONTEXT_SUMMARY_MAX_CHARS
+from models import CallData, ConversationState, Message
+
+# Trailing JSON block, in case the model echoes extraction output into its reply
+JSON_TAIL = re.compile(r"\s*\{[^{}]*\}\s*$")
+
+# Longest snippet of a single turn kept in the summary
+SUMMARY_SNIPPET_CHARS = 120
+
+def strip_json_tail(text: str) -> str:
+    """Drop a trailing JSON extraction block from an assistant message"""
+    return JSON_TAIL.sub("", text).strip()
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for budgeting
+
+    ~4 characters per token for English and Spanish, plus a few tokens of
+    per-message overhead. Close enough to keep the prompt bounded without
+    pulling a tokenizer into the request path.
+    """
+    return len(text) // 4 + 4
+
+def known_fields_note(call_data: CallData) -> str:
+    """One line listing the call data extracted so far"""
+    fields = [
+        f"{field}: {value}"
+        for field, value in (
+            ("name", call_data.name),
+            ("phone", call_data.phone),
+            ("email", call_data.email),
+            ("service", call_data.service),
+        )
+        if value
+    ]
+    return "Already collected - " + ", ".join(fields) if fields else ""
+
+def summarize_turn(message: Message) -> str:
+    """Compact one-line version of a turn for the rolling summary"""
+    speaker = "Caller" if message.role == "user" else "Nova"
+    content = " ".join(strip_json_tail(message.content).split())
+    if len(content) > SUMMARY_SNIPPET_CHARS:
+        content = content[:SUMMARY_SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+    return f"{speaker}: {content}"
+
+def compact_history(conversation: ConversationState, budget: int = CONTEXT_TOKEN_BUDGET,
+                    keep_recent: int = CONTEXT_KEEP_RECENT):
+    """
+    Fold the oldest turns into conversation.summary until the history fits the budget
+
+    Always keeps at least keep_recent messages verbatim. The summary itself is
+    capped at CONTEXT_SUMMARY_MAX_CHARS, dropping its oldest lines first.
+    """
+    history_tokens = sum(estimate_tokens(msg.content) for msg in conversation.messages)
+    folded = []
+    while history_tokens > budget and len(conversation.messages) > keep_recent:
+        oldest = conversation.messages.pop(0)
+        history_tokens -= estimate_tokens(oldest.content)
+        folded.append(summarize_turn(oldest))
+
+    if not folded:
+        return
+
+    lines = conversation.summary.splitlines() + folded
+    while lines and sum(len(line) + 1 for line in lines) > CONTEXT_SUMMARY_MAX_CHARS:
+        lines.pop(0)
+    conversation.summary = "\n".join(lines)
+
+def context_note(conversation: ConversationState) -> str:
+    """System note carrying the summary of earlier turns and known call data"""
+    parts = []
+    if conversation.summary:
+        parts.append("Earlier in this call:\n" + conversation.summary)
+    call_data = conversation.call_data
+    from_caller_id = call_data.phone is not None and call_data.phone == conversation.caller_id
+    if from_caller_id:
+        call_data = call_data.model_copy(update={"phone": None})
+    fields = known_fields_note(call_data)
+    if fields:
+        parts.append(fields + ". Don't ask for these again.")
+    if from_caller_id:
+        parts.append(f"The caller is calling from {conversation.caller_id}. "
+                     "Confirm that's the best number to reach them instead of asking for one.")
+    return "\n\n".join(parts)
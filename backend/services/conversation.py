@@ -1,117 +1,446 @@
 """
 Conversation Service - Handles AI conversation using OpenAI
 """
-from openai import OpenAI
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import time
 
-from config import OPENAI_API_KEY, NOVA_SYSTEM_PROMPT_EN, NOVA_SYSTEM_PROMPT_ES
-from models import ConversationState, Message
-import json
+from config import (
+    OPENAI_TIMEOUT, REPLY_MAX_TOKENS,
+    SPECULATION_MIN_WORDS, SPECULATION_MATCH_RATIO,
+    NOVA_SYSTEM_PROMPT_EN, NOVA_SYSTEM_PROMPT_ES
+)
+from models import ConversationState, ExtractedFields, Message
+from services.llm import create_completion, llm_slots, LLMTimeout
+from services.resilience import time_left
+from services.call_log import call_log
+from services.store import create_conversation_store
+from services.context import compact_history, context_note, strip_json_tail
+from services.extraction import extract_call_data, apply_extracted
+from services.extractors import extract_local, caller_id_phone
+from services.language import update_language
+from services.holds import release_slots
+from services.reply_cache import reply_cache, cache_key
+from services.model_router import reply_tier, reply_model, record_completion, usage_tokens, LARGE
+from services.metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS, FALLBACKS, SPECULATIONS, LOCAL_EXTRACTIONS
+from difflib import SequenceMatcher
+import re
 
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# What Nova says when the model doesn't answer within OPENAI_TIMEOUT
+TIMEOUT_REPLIES = {
+    "en": "Sorry, I missed that for a second. Could you say it again?",
+    "es": "Perdón, se me fue un segundo. ¿Me lo repites?"
+}
 
-# Store active conversations
-active_conversations = {}
+# Store active conversations (in-memory LRU+TTL, SQLite or Redis, see services/store.py)
+store = create_conversation_store()
 
-def get_conversation(call_sid: str) -> ConversationState:
-    """Get or create a conversation state for a call"""
-    if call_sid not in active_conversations:
-        active_conversations[call_sid] = ConversationState(call_sid=call_sid)
-    return active_conversations[call_sid]
-
-def detect_language(text: str) -> str:
-    """
-    Detect if the text is in Spanish or English
-    Returns: 'es' for Spanish, 'en' for English
-    """
-    # Common Spanish words and patterns
-    spanish_indicators = [
-        'hola', 'buenos', 'días', 'tardes', 'noches', 'gracias', 'por favor',
-        'sí', 'necesito', 'quiero', 'busco', 'ayuda', 'información',
-        'habla', 'español', 'puedo', 'estoy', 'tengo'
-    ]
+# Rest of streamed replies still being generated, keyed by CallSid.
+# These live in this worker only - /voice/continue degrades to a plain Gather elsewhere.
+pending_turns = {}
 
-    text_lower = text.lower()
-    spanish_word_count = sum(1 for word in spanish_indicators if word in text_lower)
+# Replies started from Twilio's partial transcripts while the caller is still talking,
+# keyed by CallSid: (transcript, task). Also per worker - a miss just means no head start.
+speculations = {}
 
-    # If we find 2 or more Spanish indicators, it's likely Spanish
-    return 'es' if spanish_word_count >= 2 else 'en'
+# End of the first speakable sentence: terminal punctuation followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"[.!?…](?=\s)")
 
-def generate_response(call_sid: str, user_message: str, detected_language: str = None) -> tuple[str, dict]:
-    """
-    Generate Nova's response to what the user said
+async def get_conversation(call_sid: str) -> ConversationState:
+    """Get or create a conversation state for a call"""
+    conversation = await store.get(call_sid)
+    if conversation is None:
+        conversation = ConversationState(call_sid=call_sid)
+        await store.save(conversation)
+    return conversation
 
-    Returns:
-        tuple: (Nova's response text, extracted data)
-    """
-    conversation = get_conversation(call_sid)
-    conversation.messages.append(Message(role="user", content=user_message))
+async def find_conversation(call_sid: str) -> ConversationState | None:
+    """The call's conversation state, or None if it hasn't started (or already ended)"""
+    return await store.get(call_sid)
 
-    # Detect language if provided
-    if detected_language:
-        conversation.language = detected_language
+async def save_conversation(conversation: ConversationState):
+    """Persist changes made to a conversation so other workers see them"""
+    await store.save(conversation)
 
+def build_messages(conversation: ConversationState) -> list[dict]:
+    """Build the OpenAI message list for the conversation so far"""
     # Select the appropriate system prompt
     system_prompt = NOVA_SYSTEM_PROMPT_ES if conversation.language == 'es' else NOVA_SYSTEM_PROMPT_EN
 
     # Build messages for OpenAI
     messages = [{"role": "system", "content": system_prompt}]
 
+    # Earlier turns that were folded out of the history, plus what we already know
+    note = context_note(conversation)
+    if note:
+        messages.append({"role": "system", "content": note})
+
     for msg in conversation.messages:
         messages.append({"role": msg.role, "content": msg.content})
-    
-    # Add extraction instructions - make it clearer this is AFTER the spoken response
-    messages.append({
-        "role": "system", 
-        "content": """IMPORTANT: First, provide your conversational response to the user. Then, on a new line, output ONLY a JSON object (no additional text) with any extracted information:
-{"name": "value or null", "phone": "value or null", "email": "value or null", "service": "value or null", "ready_to_book": true/false}
-
-The JSON must come AFTER your spoken response and must not be part of what you say to the user."""
-    })
-    
-    # Call OpenAI with settings optimized for natural conversation
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=messages,
-        temperature=0.9,  # Higher temperature for more natural, varied responses
-        max_tokens=80,    # Shorter max to keep responses brief and punchy
-        presence_penalty=0.6,  # Encourage variety in word choice
-        frequency_penalty=0.3  # Reduce repetition
+
+    return messages
+
+def current_stage(conversation: ConversationState) -> str:
+    """Where the call is: greeting, discovery, collecting, booking or booked"""
+    call_data = conversation.call_data
+    if call_data.status == "booked":
+        return "booked"
+    if conversation.offered_slots:
+        return "booking"
+    # A phone number we only have from caller ID wasn't shared in the conversation
+    phone = call_data.phone if call_data.phone != conversation.caller_id else None
+    if call_data.name or phone or call_data.email or call_data.service:
+        return "collecting"
+    if conversation.summary or any(msg.role == "assistant" for msg in conversation.messages):
+        return "discovery"
+    return "greeting"
+
+def add_user_message(conversation: ConversationState, user_message: str, detected_language: str = None):
+    """Record what the user said on a conversation"""
+    # Stage as of when the caller spoke - the reply cache keys on it
+    conversation.stage = current_stage(conversation)
+
+    # Use the caller's language if given, otherwise detect it (sticky per call)
+    if detected_language:
+        conversation.language = detected_language
+    else:
+        update_language(conversation, user_message)
+
+    conversation.messages.append(Message(role="user", content=user_message))
+
+    # Keep the prompt within budget however long the call runs
+    compact_history(conversation)
+
+def seed_caller_id(conversation: ConversationState, from_number: str | None):
+    """Pre-fill the phone number from caller ID on the first turn, so Nova only has to confirm it"""
+    if conversation.caller_id is not None or conversation.call_data.phone:
+        return
+    phone = caller_id_phone(from_number)
+    if phone:
+        conversation.caller_id = phone
+        conversation.call_data.phone = phone
+        LOCAL_EXTRACTIONS.inc("caller_id")
+        call_log.record(conversation.call_sid, "extracted", source="caller_id", phone=phone)
+
+def apply_local_extraction(conversation: ConversationState, user_message: str):
+    """Fill in the phone, email and name the caller just said, before the model is called"""
+    fields = extract_local(user_message, conversation.call_data)
+    found = fields.model_dump(exclude_defaults=True)
+    for field in found:
+        LOCAL_EXTRACTIONS.inc(field)
+    if found:
+        call_log.record(conversation.call_sid, "extracted", source="local", **found)
+    apply_extracted(conversation, fields)
+
+def log_turn(conversation: ConversationState, user_message: str, reply: str, source: str,
+             fields: ExtractedFields = None):
+    """Append the turn (and what the model extracted from it) to the call log"""
+    call_log.record(
+        conversation.call_sid, "turn", user=user_message, reply=reply, source=source,
+        language=conversation.language, stage=conversation.stage
     )
-    
-    assistant_message = response.choices[0].message.content
+    if fields:
+        log_extracted(conversation.call_sid, fields)
+
+def log_extracted(call_sid: str, fields: ExtractedFields):
+    found = fields.model_dump(exclude_defaults=True)
+    if found:
+        call_log.record(call_sid, "extracted", source="model", **found)
+
+async def start_turn(call_sid: str, user_message: str, detected_language: str = None,
+                     caller_id: str = None) -> ConversationState:
+    """Record what the user said and return the conversation to respond in"""
+    conversation = await get_conversation(call_sid)
+    seed_caller_id(conversation, caller_id)
+    add_user_message(conversation, user_message, detected_language)
+    apply_local_extraction(conversation, user_message)
+    print(f"Detected language: {conversation.language}")
+    return conversation
+
+def timeout_reply(conversation: ConversationState) -> str:
+    """Record and return the fallback line used when the model is too slow"""
+    print(f"OpenAI timed out after {OPENAI_TIMEOUT}s for {conversation.call_sid}")
+    UPSTREAM_ERRORS.inc("openai", "reply")
+    FALLBACKS.inc("llm_timeout")
+    assistant_message = TIMEOUT_REPLIES.get(conversation.language, TIMEOUT_REPLIES["en"])
     conversation.messages.append(Message(role="assistant", content=assistant_message))
-    
-    # Extract structured data
-    extracted_data = {}
+    return assistant_message
+
+async def complete_reply(messages: list[dict], tier: str = LARGE) -> str | None:
+    """Get Nova's spoken reply from the given model tier, or None if the model didn't answer in time"""
+    model = reply_model(tier)
     try:
-        if "{" in assistant_message and "}" in assistant_message:
-            json_start = assistant_message.rfind("{")
-            json_end = assistant_message.rfind("}") + 1
-            json_str = assistant_message[json_start:json_end]
-            extracted_data = json.loads(json_str)
-            
-            # Update call data
-            if extracted_data.get("name"):
-                conversation.call_data.name = extracted_data["name"]
-            if extracted_data.get("phone"):
-                conversation.call_data.phone = extracted_data["phone"]
-            if extracted_data.get("email"):
-                conversation.call_data.email = extracted_data["email"]
-            if extracted_data.get("service"):
-                conversation.call_data.service = extracted_data["service"]
-            
-            # Remove JSON from response
-            assistant_message = assistant_message[:json_start].strip()
-    except:
-        pass
-    
+        async with llm_slots:
+            start = time.perf_counter()
+            with UPSTREAM_SECONDS.time("openai", "reply"):
+                response = await create_completion(
+                    model=model,
+                    messages=messages,
+                    temperature=0.9,  # Higher temperature for more natural, varied responses
+                    max_tokens=REPLY_MAX_TOKENS,  # Shorter max to keep responses brief and punchy
+                    presence_penalty=0.6,  # Encourage variety in word choice
+                    frequency_penalty=0.3  # Reduce repetition
+                )
+        reply = response.choices[0].message.content
+        record_completion(tier, "reply", model, time.perf_counter() - start, *usage_tokens(response, messages, reply))
+        return reply
+    except LLMTimeout:
+        return None
+
+async def draft_reply(conversation: ConversationState) -> tuple[str | None, ExtractedFields]:
+    """Run the spoken reply and the structured extraction as two parallel calls (no state changes)"""
+    return await asyncio.gather(
+        complete_reply(build_messages(conversation), reply_tier(conversation)),
+        extract_call_data(conversation)
+    )
+
+async def generate_response(call_sid: str, user_message: str, detected_language: str = None,
+                            speculation: asyncio.Task = None, caller_id: str = None) -> tuple[str, dict]:
+    """
+    Generate Nova's response to what the user said
+
+    The spoken reply and the structured extraction run as two parallel calls.
+    Pass a speculation from take_speculation() to use the reply that was
+    already drafted from the partial transcript, and the caller's From number
+    to pre-fill their phone from caller ID.
+
+    Returns:
+        tuple: (Nova's response text, extracted data)
+    """
+    conversation = await start_turn(call_sid, user_message, detected_language, caller_id)
+    key = cache_key(conversation)
+    cached = reply_cache.get(key)
+
+    if cached is not None:
+        if speculation:
+            speculation.cancel()
+        assistant_message, fields = cached, ExtractedFields()
+    elif speculation:
+        assistant_message, fields = await speculation
+    else:
+        assistant_message, fields = await draft_reply(conversation)
+        reply_cache.put(key, assistant_message and strip_json_tail(assistant_message), fields, conversation.caller_id)
+    extracted_data = apply_extracted(conversation, fields)
+
+    source = "cache" if cached is not None else "speculation" if speculation else "model"
+    if assistant_message is None:
+        assistant_message = timeout_reply(conversation)
+        source = "timeout"
+    else:
+        assistant_message = strip_json_tail(assistant_message)
+        conversation.messages.append(Message(role="assistant", content=assistant_message))
+
+    log_turn(conversation, user_message, assistant_message, source, fields)
+    await save_conversation(conversation)
     return assistant_message, extracted_data
 
-def end_conversation(call_sid: str):
-    """Clean up conversation when call ends"""
-    if call_sid in active_conversations:
-        del active_conversations[call_sid]
+def find_sentence_end(text: str) -> int:
+    """
+    Find where the first speakable sentence of streamed text ends
+
+    Returns the index just past the first sentence boundary, or -1 if none has arrived yet.
+    """
+    match = SENTENCE_BOUNDARY.search(text)
+    return match.end() if match else -1
+
+async def stream_response(call_sid: str, user_message: str, detected_language: str = None,
+                          caller_id: str = None) -> tuple[str, asyncio.Task]:
+    """
+    Stream Nova's response and hand back the first sentence as soon as it arrives
+
+    The rest of the completion keeps streaming in a background task, while the
+    extraction call runs next to it and updates the call data when it finishes.
+
+    Returns:
+        tuple: (first sentence to speak now, task resolving to (rest of the reply, extracted data))
+    """
+    conversation = await start_turn(call_sid, user_message, detected_language, caller_id)
+    key = cache_key(conversation)
+    cached = reply_cache.get(key)
+    if cached is not None:
+        conversation.messages.append(Message(role="assistant", content=cached))
+        log_turn(conversation, user_message, cached, "cache")
+        await save_conversation(conversation)
+        done = asyncio.get_running_loop().create_future()
+        done.set_result(("", ExtractedFields().model_dump()))
+        return cached, done
+
+    messages = build_messages(conversation)
+    tier = reply_tier(conversation)
+    model = reply_model(tier)
+    first_sentence = asyncio.get_running_loop().create_future()
+    extraction = asyncio.create_task(extract_call_data(conversation))
+    deadline_passed = False
+
+    async def consume() -> tuple[str, dict]:
+        buffer = ""
+        stream = None
+        try:
+            async with llm_slots:
+                start = time.perf_counter()
+                stream = await create_completion(
+                    model=model,
+                    messages=messages,
+                    temperature=0.9,
+                    max_tokens=REPLY_MAX_TOKENS,
+                    presence_penalty=0.6,
+                    frequency_penalty=0.3,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    buffer += chunk.choices[0].delta.content or ""
+                    if not first_sentence.done():
+                        end = find_sentence_end(buffer)
+                        if end != -1:
+                            first_sentence.set_result(buffer[:end].strip())
+        except asyncio.CancelledError as e:
+            # Settle the stream only now it has ended: a stall past the deadline counts against OpenAI
+            if stream:
+                stream.finish(LLMTimeout("stream stalled past the deadline") if deadline_passed else e)
+            raise
+        except Exception as e:
+            if stream:
+                stream.finish(e)
+            if first_sentence.done():
+                raise
+            # Nothing spoken yet - let stream_response surface the error
+            first_sentence.set_exception(e)
+            return "", {}
+
+        stream.finish()
+        record_completion(tier, "reply", model, time.perf_counter() - start, *usage_tokens(None, messages, buffer))
+        spoken = strip_json_tail(buffer)
+        fields = await extraction
+        reply_cache.put(key, spoken, fields, conversation.caller_id)
+        extracted_data = apply_extracted(conversation, fields)
+        conversation.messages.append(Message(role="assistant", content=spoken))
+        log_turn(conversation, user_message, spoken, "streamed", fields)
+        await save_conversation(conversation)
+
+        if not first_sentence.done():
+            # Whole reply was a single sentence without terminal punctuation
+            first_sentence.set_result(spoken)
+            return "", extracted_data
+
+        already_said = first_sentence.result()
+        if not spoken.startswith(already_said):
+            # The first sentence ran into a JSON tail that has been stripped since - nothing left to say
+            return "", extracted_data
+        return spoken[len(already_said):].strip(), extracted_data
+
+    task = asyncio.create_task(consume())
+
+    try:
+        with UPSTREAM_SECONDS.time("openai", "first_sentence"):
+            spoken_now = await asyncio.wait_for(asyncio.shield(first_sentence), timeout=max(time_left(OPENAI_TIMEOUT), 0))
+    except (asyncio.TimeoutError, LLMTimeout):
+        deadline_passed = True
+        task.cancel()
+        assistant_message = timeout_reply(conversation)
+        log_turn(conversation, user_message, assistant_message, "timeout")
+        await save_conversation(conversation)
+
+        async def finish_extraction() -> tuple[str, dict]:
+            # May still be queued on llm_slots - runs while the apology is spoken
+            fields = await extraction
+            log_extracted(call_sid, fields)
+            latest = await find_conversation(call_sid)
+            if latest is None:
+                return "", fields.model_dump()
+            extracted_data = apply_extracted(latest, fields)
+            await save_conversation(latest)
+            return "", extracted_data
+
+        return assistant_message, asyncio.create_task(finish_extraction())
+
+    return spoken_now, task
+
+def normalize_transcript(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+def transcripts_match(speculated: str, final: str) -> bool:
+    """
+    Whether a reply drafted for the speculated transcript still fits the final one
+
+    The words must be nearly identical and every digit must match exactly,
+    so a phone number that was still being read out never counts as a match.
+    """
+    speculated, final = normalize_transcript(speculated), normalize_transcript(final)
+    if speculated == final:
+        return True
+    if re.sub(r"\D", "", speculated) != re.sub(r"\D", "", final):
+        return False
+    return SequenceMatcher(None, speculated, final).ratio() >= SPECULATION_MATCH_RATIO
+
+def cancel_speculation(call_sid: str):
+    speculation = speculations.pop(call_sid, None)
+    if speculation:
+        speculation[1].cancel()
+        SPECULATIONS.inc("discarded")
+
+async def speculate(call_sid: str, partial_transcript: str):
+    """
+    Start drafting a reply to what the caller has said so far
+
+    Called for each partial transcript Twilio sends while the caller is still
+    talking. The draft runs on a copy of the conversation, so nothing is
+    stored until the final transcript arrives and take_speculation() accepts it.
+    """
+    if len(partial_transcript.split()) < SPECULATION_MIN_WORDS:
+        return
+
+    current = speculations.get(call_sid)
+    if current and transcripts_match(current[0], partial_transcript):
+        return  # The draft in flight still fits
+
+    draft = (await get_conversation(call_sid)).model_copy(deep=True)
+    add_user_message(draft, partial_transcript)
+    cancel_speculation(call_sid)
+    speculations[call_sid] = (partial_transcript, asyncio.create_task(draft_reply(draft)))
+    SPECULATIONS.inc("started")
+
+def take_speculation(call_sid: str, final_transcript: str) -> asyncio.Task | None:
+    """Return the drafted reply if it was made for (nearly) the final transcript, else cancel it"""
+    speculation = speculations.pop(call_sid, None)
+    if speculation is None:
+        return None
+
+    transcript, task = speculation
+    if task.cancelled() or not transcripts_match(transcript, final_transcript):
+        task.cancel()
+        SPECULATIONS.inc("discarded")
+        return None
+
+    SPECULATIONS.inc("used")
+    return task
+
+def hold_pending_turn(call_sid: str, task: asyncio.Task):
+    """Park the rest of a streamed turn until Twilio comes back for it"""
+    stale = pending_turns.pop(call_sid, None)
+    if stale and not stale.done():
+        stale.cancel()
+    pending_turns[call_sid] = task
+
+def take_pending_turn(call_sid: str):
+    """Return the parked rest of a streamed turn, or None if this worker has none"""
+    return pending_turns.pop(call_sid, None)
+
+async def end_conversation(call_sid: str) -> bool:
+    """
+    Clean up conversation when call ends
+
+    Returns True only for the caller that actually dropped the call's state,
+    so a retried status callback can tell the call was already ended.
+    """
+    pending = pending_turns.pop(call_sid, None)
+    if pending and not pending.done():
+        pending.cancel()
+    cancel_speculation(call_sid)
+
+    # Let other callers have the slots this call was offered
+    conversation = await store.get(call_sid)
+    if conversation and conversation.offered_slots:
+        await release_slots(call_sid, conversation.offered_slots)
+
+    return await store.delete(call_sid)
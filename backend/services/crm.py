@@ -2,89 +2,95 @@
 CRM Service - Integrates with Notion database and CRM backend
 """
 import httpx
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import NOTION_TOKEN, NOTION_DATABASE_ID, NOTION_API_URL, CRM_BACKEND_URL, CRM_TENANT_CODE
+from config import NOTION_DATABASE_ID, CRM_BACKEND_URL, CRM_TENANT_CODE, CRM_TIMEOUT
 from models import CallData
+from services.http_clients import get_client
+from services.resilience import call_upstream, UpstreamUnavailable
+from services.metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS
+from services.notion import writer as notion
 from datetime import datetime
 
-async def create_lead(call_data: CallData, call_sid: str) -> dict:
-    """Create a new lead entry in Notion"""
-    try:
-        url = f"{NOTION_API_URL}/pages"
-
-        headers = {
-            "Authorization": f"Bearer {NOTION_TOKEN}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
-
-        properties = {
-            "Name": {
-                "title": [{"text": {"content": call_data.name or "Unknown"}}]
-            },
-            "Phone_Number": {
-                "phone_number": call_data.phone or ""
-            },
-            "Email": {
-                "email": call_data.email or ""
-            },
-            "service": {
-                "rich_text": [{"text": {"content": call_data.service or ""}}]
-            },
-            "status": {
-                "select": {"name": call_data.status}
-            },
-            "Date": {
-                "date": {"start": datetime.now().isoformat()}
-            },
-            "notes": {
-                "rich_text": [{
-                    "text": {
-                        "content": f"Call SID: {call_sid}\n{call_data.notes}"
-                    }
-                }]
-            }
+def lead_properties(call_data: CallData, call_sid: str) -> dict:
+    """Notion page properties for a call's lead (everything but the creation Date)"""
+    notes = f"Call SID: {call_sid}\n{call_data.notes}"
+    if call_data.appointment_time:
+        notes += f"\nAppointment: {call_data.appointment_time}"
+
+    return {
+        "Name": {
+            "title": [{"text": {"content": call_data.name or "Unknown"}}]
+        },
+        "Phone_Number": {
+            "phone_number": call_data.phone or ""
+        },
+        "Email": {
+            "email": call_data.email or ""
+        },
+        "service": {
+            "rich_text": [{"text": {"content": call_data.service or ""}}]
+        },
+        "status": {
+            "select": {"name": call_data.status}
+        },
+        "notes": {
+            "rich_text": [{"text": {"content": notes}}]
         }
+    }
 
-        if call_data.appointment_time:
-            properties["notes"]["rich_text"][0]["text"]["content"] += f"\nAppointment: {call_data.appointment_time}"
-
-        data = {
-            "parent": {"database_id": NOTION_DATABASE_ID},
-            "properties": properties
-        }
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=data, headers=headers)
-
-            if response.status_code != 200:
-                error_detail = response.text
-                print(f"Notion API Error {response.status_code}:")
-                print(f"Response: {error_detail}")
-                return {"success": False, "error": error_detail}
-
-            result = response.json()
-
-            print(f"Notion lead created!")
-            return {
-                "success": True,
-                "page_id": result.get("id"),
-                "url": result.get("url")
-            }
-
-    except httpx.HTTPStatusError as e:
-        error_detail = e.response.text if hasattr(e, 'response') else str(e)
-        print(f"Notion HTTP error: {e}")
-        print(f"Response body: {error_detail}")
-        return {"success": False, "error": error_detail}
-    except Exception as e:
-        print(f"Notion error: {e}")
-        import traceback
-        traceback.print_exc()
-        return {"success": False, "error": str(e)}
+async def create_lead(call_data: CallData, call_sid: str) -> dict:
+    """Create a new lead entry in Notion (through the rate-limited writer)"""
+    properties = lead_properties(call_data, call_sid)
+    properties["Date"] = {"date": {"start": datetime.now().isoformat()}}
+
+    data = {
+        "parent": {"database_id": NOTION_DATABASE_ID},
+        "properties": properties
+    }
+
+    result = await notion.create_page(data)
+    if not result["success"]:
+        return result
+
+    print(f"Notion lead created!")
+    return {
+        "success": True,
+        "page_id": result["page"].get("id"),
+        "url": result["page"].get("url")
+    }
+
+async def update_lead(page_id: str, properties: dict) -> dict:
+    """Patch some properties of an existing Notion lead page"""
+    result = await notion.update_page(page_id, properties)
+    if not result["success"]:
+        return result
+
+    print(f"Notion lead updated ({', '.join(properties)})")
+    return {"success": True, "page_id": page_id}
+
+def crm_contact(call_data: CallData, call_sid: str = None) -> dict:
+    """The submit-contact body for a call's lead"""
+    # Minimal payload required by the public submit-contact endpoint
+    payload = {
+        "name": call_data.name or "Unknown",
+        "email": call_data.email or "",
+        "phone": call_data.phone or "",
+        "tenant_code": CRM_TENANT_CODE,
+    }
+
+    # Include extra context in optional notes field if accepted by backend
+    # but keep the primary contract minimal to avoid schema mismatches.
+    if call_data.notes:
+        payload["notes"] = call_data.notes
+    if call_sid:
+        payload["call_sid"] = call_sid
+    if call_data.service:
+        payload["service"] = call_data.service
+    if call_data.status:
+        payload["status"] = call_data.status
+    if call_data.appointment_time:
+        payload["appointment_time"] = call_data.appointment_time
+    return payload
 
 async def push_to_crm_backend(call_data: CallData, call_sid: str = None) -> dict:
     """
@@ -104,50 +110,38 @@ async def push_to_crm_backend(call_data: CallData, call_sid: str = None) -> dict
             "Content-Type": "application/json"
         }
 
-        # Minimal payload required by the public submit-contact endpoint
-        payload = {
-            "name": call_data.name or "Unknown",
-            "email": call_data.email or "",
-            "phone": call_data.phone or "",
-            "tenant_code": CRM_TENANT_CODE,
-        }
-
-        # Include extra context in optional notes field if accepted by backend
-        # but keep the primary contract minimal to avoid schema mismatches.
-        if call_data.notes:
-            payload["notes"] = call_data.notes
-        if call_sid:
-            payload["call_sid"] = call_sid
-        if call_data.service:
-            payload["service"] = call_data.service
-        if call_data.status:
-            payload["status"] = call_data.status
-        if call_data.appointment_time:
-            payload["appointment_time"] = call_data.appointment_time
+        payload = crm_contact(call_data, call_sid)
 
         print(f"Pushing to CRM backend: {url}")
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
+        async def request():
+            response = await get_client("crm").post(url, json=payload, headers=headers)
             response.raise_for_status()
+            return response
+
+        with UPSTREAM_SECONDS.time("crm", "submit_contact"):
+            response = await call_upstream("crm", request, CRM_TIMEOUT)
 
-            print("CRM backend: Contact submitted successfully")
-            result = response.json() if response.text else {}
-            return {
-                "success": True,
-                "response": result
-            }
+        print("CRM backend: Contact submitted successfully")
+        result = response.json() if response.text else {}
+        return {
+            "success": True,
+            "response": result
+        }
 
-    except httpx.TimeoutException as e:
-        error_msg = f"CRM backend request timeout: {str(e)}"
+    except (httpx.TimeoutException, UpstreamUnavailable) as e:
+        UPSTREAM_ERRORS.inc("crm", "submit_contact")
+        error_msg = f"CRM backend unavailable: {str(e)}"
         print(error_msg)
         return {"success": False, "error": error_msg}
     except httpx.HTTPStatusError as e:
+        UPSTREAM_ERRORS.inc("crm", "submit_contact")
         error_detail = e.response.text
         print(f"CRM backend HTTP error: {e}")
         print(f"Response body: {error_detail}")
         return {"success": False, "error": error_detail}
     except Exception as e:
+        UPSTREAM_ERRORS.inc("crm", "submit_contact")
         error_msg = f"CRM backend error: {str(e)}"
         print(error_msg)
         import traceback
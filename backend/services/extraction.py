@@ -0,0 +1,95 @@
+"""
+Extraction Service - Pulls structured call data out of the conversation
+
+Runs as its own forced function call next to the spoken reply, so the reply
+can be short (and streamed) while extraction gets its own token budget and
+a typed schema that maps straight onto CallData.
+"""
+import time
+from pydantic import ValidationError
+
+from config import EXTRACTION_MAX_TOKENS
+from models import ConversationState, ExtractedFields
+from services.llm import create_completion, llm_slots, LLMTimeout
+from services.context import context_note
+from services.model_router import extraction_tier, extraction_model, record_completion, usage_tokens, FAST, LARGE
+from services.metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS
+
+EXTRACTION_PROMPT = """You extract caller details from a phone call between Nova, an assistant for Orbyn.ai, and a caller.
+Call record_call_data with what the caller has told us so far. Use null for anything they haven't said.
+Set ready_to_book to true only once the caller has agreed to book a consultation."""
+
+EXTRACTION_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "record_call_data",
+        "description": "Record the caller details collected so far",
+        "parameters": ExtractedFields.model_json_schema()
+    }
+}
+
+async def extract_call_data(conversation: ConversationState) -> ExtractedFields:
+    """
+    Run the extraction call for the conversation so far
+
+    Never raises - a timeout or malformed tool call is logged and yields
+    empty fields, so the turn still goes ahead with what we already know.
+    A malformed answer from the fast model is retried once on the large one.
+    """
+    messages = [{"role": "system", "content": EXTRACTION_PROMPT}]
+    note = context_note(conversation)
+    if note:
+        messages.append({"role": "system", "content": note})
+    for msg in conversation.messages:
+        messages.append({"role": msg.role, "content": msg.content})
+
+    tier = extraction_tier(conversation)
+    try:
+        while True:
+            model = extraction_model(tier)
+            async with llm_slots:
+                start = time.perf_counter()
+                with UPSTREAM_SECONDS.time("openai", "extraction"):
+                    response = await create_completion(
+                        model=model,
+                        messages=messages,
+                        tools=[EXTRACTION_TOOL],
+                        tool_choice={"type": "function", "function": {"name": "record_call_data"}},
+                        temperature=0,
+                        max_tokens=EXTRACTION_MAX_TOKENS
+                    )
+            tool_calls = response.choices[0].message.tool_calls or []
+            arguments = tool_calls[0].function.arguments if tool_calls else ""
+            record_completion(tier, "extraction", model, time.perf_counter() - start,
+                              *usage_tokens(response, messages, arguments))
+            if not tool_calls:
+                print(f"Extraction returned no tool call for {conversation.call_sid}")
+                return ExtractedFields()
+            try:
+                return ExtractedFields.model_validate_json(arguments)
+            except ValidationError:
+                if tier != FAST:
+                    raise
+                print(f"Fast model returned invalid extraction for {conversation.call_sid}, retrying on the large model")
+                tier = LARGE
+
+    except LLMTimeout:
+        print(f"Extraction timed out for {conversation.call_sid}")
+    except ValidationError as e:
+        print(f"Extraction returned invalid data for {conversation.call_sid}: {e}")
+    except Exception as e:
+        print(f"Extraction error for {conversation.call_sid}: {e}")
+    UPSTREAM_ERRORS.inc("openai", "extraction")
+    return ExtractedFields()
+
+def apply_extracted(conversation: ConversationState, fields: ExtractedFields) -> dict:
+    """Store extracted fields on the call data and return them as a dict"""
+    if fields.name:
+        conversation.call_data.name = fields.name
+    if fields.phone:
+        conversation.call_data.phone = fields.phone
+    if fields.email:
+        conversation.call_data.email = fields.email
+    if fields.service:
+        conversation.call_data.service = fields.service
+    return fields.model_dump()
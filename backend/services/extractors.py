@@ -0,0 +1,150 @@
+"""
+Extractors Service - Pulls phone numbers, emails and names out of a turn without the model
+
+Callers read details out loud, so transcripts say "five five five, oh one
+two three" or "john at gmail dot com". These are plain patterns, so they
+are parsed locally with precompiled regexes before the LLM call. CallData
+fills in the same turn, and Nova doesn't ask again. The extraction call
+still runs and corrects anything these miss.
+
+Weak guesses never overwrite what the call already knows. A name from a
+bare "this is X" doesn't replace one we have, and a new number only
+replaces a known one when the caller says it is their number.
+"""
+import re
+
+from models import CallData, ExtractedFields
+
+DIGIT_WORDS = {
+    "zero": "0", "oh": "0", "o": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9",
+    "cero": "0", "uno": "1", "una": "1", "dos": "2", "tres": "3", "cuatro": "4",
+    "cinco": "5", "seis": "6", "siete": "7", "ocho": "8", "nueve": "9",
+}
+
+AMBIGUOUS_DIGITS = {"o", "oh", "uno", "una"}
+
+# "double five" -> 55, "triple cero" -> 000
+REPEAT_WORDS = {"double": 2, "doble": 2, "triple": 3}
+
+# Separators callers (and transcripts) put between groups of digits
+DIGIT_SEPARATOR = re.compile(r"(?<=\d)[\s\-.()]+(?=[\d(])|(?<=\d),\s*(?=\d)")
+
+# A phone number once separators are gone: optional +, then 10-15 digits
+PHONE = re.compile(r"(?<![\d+])\+?\d{10,15}(?!\d)")
+
+# Words that say a number in the turn is the caller's (correcting one we already have)
+PHONE_CUE = re.compile(
+    r"\b(?:phone|number|cell|mobile|call me|reach me|text me|use|better|instead|actually|"
+    r"telefono|teléfono|numero|número|celular|movil|móvil|llamame|llámame|mejor)\b",
+    re.IGNORECASE
+)
+
+EMAIL = re.compile(r"[a-z0-9][a-z0-9._%+\-]*@[a-z0-9\-]+(?:\.[a-z0-9\-]+)+")
+
+# Spoken email punctuation, English and Spanish
+EMAIL_WORDS = (
+    (re.compile(r"\s+(?:at|arroba)\s+", re.IGNORECASE), "@"),
+    (re.compile(r"\s+(?:dot|punto)\s+", re.IGNORECASE), "."),
+    (re.compile(r"\s+(?:underscore|guion bajo)\s+", re.IGNORECASE), "_"),
+    (re.compile(r"\s+(?:dash|hyphen|guion)\s+", re.IGNORECASE), "-"),
+)
+
+# Letters spelled one at a time: "j o h n" -> "john"
+SPELLED = re.compile(r"(?<![\w'])(?:[a-z0-9] )+[a-z0-9]\b", re.IGNORECASE)
+
+NAME_WORD = r"[A-Za-zÀ-ÿ'\-]+"
+
+# Introductions that are always followed by a name, and ones that only are when it's capitalized
+# ("this is Ana" vs "this is urgent")
+NAME_INTRO = re.compile(rf"\b(?:my name is|my name's|name is|call me|me llamo|mi nombre es)\s+({NAME_WORD}(?:\s+{NAME_WORD})?)", re.IGNORECASE)
+CAPITALIZED_INTRO = re.compile(rf"\b(?:[Tt]his is|I'm|I am|[Ss]oy|[Hh]abla)\s+([A-ZÀ-Ý]{NAME_WORD}(?:\s+[A-ZÀ-Ý]{NAME_WORD})?)")
+
+# Words that follow an introduction but aren't part of the name
+NOT_NAME = {
+    "and", "from", "with", "calling", "here", "the", "a", "an", "i", "my", "y", "de", "con", "desde",
+    "llamando", "aqui", "aquí", "el", "la", "interested", "looking", "just", "not", "so", "very", "really",
+    "at", "on", "back", "later", "tomorrow", "anytime",
+    # "I am Good thanks", "This is Orbyn, right?"
+    "good", "fine", "great", "well", "okay", "ok", "sure", "sorry", "ready", "busy", "orbyn", "nova",
+    "bien", "listo", "lista",
+}
+
+def spoken_digits(text: str) -> str:
+    """Replace digit words ("five", "cinco", "double oh") with digits, leaving other words alone"""
+    out = []
+    pending_repeat = None
+    for word in text.split():
+        bare = word.lower().strip(",.;:!?")
+        if bare in REPEAT_WORDS and pending_repeat is None:
+            pending_repeat = word
+            continue
+        # "oh" and "uno"/"una" only count as digits in the middle of a number
+        is_digit = bare in DIGIT_WORDS and (bare not in AMBIGUOUS_DIGITS or (out and out[-1][-1:].isdigit()))
+        if is_digit:
+            repeat = REPEAT_WORDS[pending_repeat.lower().strip(",.;:!?")] if pending_repeat else 1
+            out.append(DIGIT_WORDS[bare] * repeat)
+        else:
+            if pending_repeat:
+                out.append(pending_repeat)
+            out.append(word)
+        pending_repeat = None
+    if pending_repeat:
+        out.append(pending_repeat)
+    return " ".join(out)
+
+def is_plausible_phone(number: str) -> bool:
+    """A North American number (10 digits, or 11 starting with 1) or any + international number"""
+    if number.startswith("+"):
+        return True
+    if len(number) == 11 and number[0] == "1":
+        number = number[1:]
+    # Area codes never start with 0 or 1, so "1000000000 customers" isn't a phone number
+    return len(number) == 10 and number[0] not in "01"
+
+def extract_phone(text: str) -> str | None:
+    """Phone number read out in the turn, as digits (with + if one was given)"""
+    joined = DIGIT_SEPARATOR.sub("", spoken_digits(text))
+    for match in PHONE.finditer(joined):
+        if is_plausible_phone(match.group(0)):
+            return match.group(0)
+    return None
+
+def extract_email(text: str) -> str | None:
+    """Email address in the turn, typed or spelled out ("ana dot diaz at gmail dot com")"""
+    typed = EMAIL.search(text.lower())
+    if typed:
+        return typed.group(0).rstrip(".")
+    spoken = f" {text} "
+    for pattern, symbol in EMAIL_WORDS:
+        spoken = pattern.sub(symbol, spoken)
+    spoken = SPELLED.sub(lambda match: match.group(0).replace(" ", ""), spoken)
+    match = EMAIL.search(spoken.lower())
+    return match.group(0).rstrip(".") if match else None
+
+def extract_name(text: str, weak: bool = True) -> str | None:
+    """Name the caller introduced themselves with, title-cased (weak=False skips bare "this is X")"""
+    match = NAME_INTRO.search(text) or (CAPITALIZED_INTRO.search(text) if weak else None)
+    if not match:
+        return None
+    words = []
+    for word in match.group(1).split():
+        if word.lower() in NOT_NAME:
+            break
+        words.append(word)
+    return " ".join(word[:1].upper() + word[1:] for word in words) or None
+
+def extract_local(text: str, known: CallData = None) -> ExtractedFields:
+    """Everything the fast-path extractors find in one turn, minus weak guesses at details already known"""
+    known = known or CallData()
+    phone = extract_phone(text)
+    if phone and known.phone and phone != known.phone and not PHONE_CUE.search(text):
+        phone = None
+    return ExtractedFields(name=extract_name(text, weak=not known.name), phone=phone, email=extract_email(text))
+
+def caller_id_phone(from_number: str | None) -> str | None:
+    """The caller's number from Twilio's From, or None for blocked, client or SIP callers"""
+    if not from_number:
+        return None
+    match = PHONE.fullmatch(from_number.strip())
+    return match.group(0) if match else None
@@ -0,0 +1,62 @@
+"""
+Follow-ups - Post-call side effects run through the job queue
+
+Confirmation SMS, Notion leads and CRM pushes used to run inline in the
+webhooks while the caller sat in dead air. They are now enqueued here and
+handled by the job queue workers, keyed by CallSid so each runs once per call.
+Lead jobs sync the call's entry in the lead ledger (services/leads.py), so a
+call gets one Notion page and one CRM contact however many times it's reported,
+each brought up to date when a later report adds something.
+"""
+import hashlib
+
+from models import CallData
+from services.jobs import queue
+from services.sms import send_confirmation_sms
+from services.leads import ledger, sync_notion_lead, sync_crm_contact
+
+@queue.handler("confirmation_sms")
+async def run_confirmation_sms(payload: dict):
+    """Send the booking confirmation text"""
+    sent = await send_confirmation_sms(
+        to_phone=payload["to_phone"],
+        name=payload["name"],
+        appointment_time=payload["appointment_time"]
+    )
+    if not sent:
+        raise RuntimeError("SMS was not sent")
+
+@queue.handler("notion_lead")
+async def run_notion_lead(payload: dict):
+    """Create or update the call's lead in Notion"""
+    # Jobs queued before the ledger existed only carry their payload
+    await ledger.record(payload["call_sid"], CallData(**payload["call_data"]))
+    await sync_notion_lead(payload["call_sid"])
+
+@queue.handler("crm_push")
+async def run_crm_push(payload: dict):
+    """Submit the contact to the CRM backend"""
+    await ledger.record(payload["call_sid"], CallData(**payload["call_data"]))
+    await sync_crm_contact(payload["call_sid"])
+
+async def enqueue_lead(call_data: CallData, call_sid: str):
+    """Queue the Notion lead and CRM push for a call, unless this report adds nothing new"""
+    merged = await ledger.record(call_sid, call_data)
+    if merged is None:
+        print(f"Lead for {call_sid} unchanged, nothing to sync")
+        return
+
+    payload = {"call_data": merged.model_dump(), "call_sid": call_sid}
+    # One job of each per distinct lead state; each writes whatever the last one didn't
+    version = hashlib.sha1(merged.model_dump_json().encode()).hexdigest()[:12]
+    await queue.enqueue("notion_lead", payload, f"{call_sid}:notion_lead:{version}")
+    await queue.enqueue("crm_push", payload, f"{call_sid}:crm_push:{version}")
+
+async def enqueue_booking_followups(call_data: CallData, call_sid: str, appointment_time: str):
+    """Queue everything that happens after a successful booking"""
+    await queue.enqueue(
+        "confirmation_sms",
+        {"to_phone": call_data.phone, "name": call_data.name, "appointment_time": appointment_time},
+        f"{call_sid}:confirmation_sms"
+    )
+    await enqueue_lead(call_data, call_sid)
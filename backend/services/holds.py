@@ -0,0 +1,187 @@
+"""
+Slot Holds - Short reservations on the slots we read out to a caller
+
+Availability is cached, so two concurrent callers could be offered the same
+slot and race to book it at Cal.com. Each offered slot is held for one live
+call for SLOT_HOLD_SECONDS; other calls are offered different slots, and a
+hold is released when its call books, hangs up or the hold expires.
+
+- MemorySlotHolds: per-process (default)
+- SqliteSlotHolds: shared by the workers on one host, used with CONVERSATION_STORE=sqlite
+- RedisSlotHolds: shared across workers, used with CONVERSATION_STORE=redis
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from config import CONVERSATION_STORE, CONVERSATION_DB_PATH, REDIS_URL, SLOT_HOLD_SECONDS
+
+class SlotHolds(ABC):
+    """Interface every slot hold backend implements. Slots are keyed by their UTC datetime."""
+
+    @abstractmethod
+    async def acquire(self, slot_key: str, call_sid: str) -> bool:
+        """Hold a slot for a call (or refresh its hold); False if another call holds it"""
+
+    @abstractmethod
+    async def holder(self, slot_key: str) -> str | None:
+        """CallSid currently holding the slot, if any"""
+
+    @abstractmethod
+    async def release(self, slot_key: str, call_sid: str):
+        """Drop the call's hold on a slot (no-op if someone else holds it)"""
+
+class MemorySlotHolds(SlotHolds):
+    """In-process hold table with TTL expiry"""
+
+    def __init__(self, ttl_seconds: float = 120, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._holds: dict[str, tuple[str, float]] = {}
+
+    def __len__(self) -> int:
+        now = self.clock()
+        return sum(1 for _, expires_at in self._holds.values() if expires_at > now)
+
+    async def acquire(self, slot_key: str, call_sid: str) -> bool:
+        now = self.clock()
+        current = self._holds.get(slot_key)
+        if current and current[0] != call_sid and current[1] > now:
+            return False
+        self._holds[slot_key] = (call_sid, now + self.ttl_seconds)
+        return True
+
+    async def holder(self, slot_key: str) -> str | None:
+        current = self._holds.get(slot_key)
+        if current is None:
+            return None
+        if current[1] <= self.clock():
+            del self._holds[slot_key]
+            return None
+        return current[0]
+
+    async def release(self, slot_key: str, call_sid: str):
+        current = self._holds.get(slot_key)
+        if current and current[0] == call_sid:
+            del self._holds[slot_key]
+
+class SqliteSlotHolds(SlotHolds):
+    """Hold table in the SQLite conversation store's file"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS slot_holds (
+        slot_key TEXT PRIMARY KEY,
+        call_sid TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 120, clock=time.time):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._db = None
+        self._db_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(self.SCHEMA)
+            self._db = db
+        return self._db
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._db_lock:
+            return self._connect().execute(sql, params)
+
+    async def _run_sql(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        # sqlite3 blocks, so keep it off the event loop
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def acquire(self, slot_key: str, call_sid: str) -> bool:
+        now = self.clock()
+        # One statement, so two workers can't both win the slot
+        cursor = await self._run_sql(
+            "INSERT INTO slot_holds (slot_key, call_sid, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (slot_key) DO UPDATE SET call_sid = excluded.call_sid, expires_at = excluded.expires_at "
+            "WHERE slot_holds.call_sid = excluded.call_sid OR slot_holds.expires_at <= ?",
+            (slot_key, call_sid, now + self.ttl_seconds, now)
+        )
+        return cursor.rowcount == 1
+
+    async def holder(self, slot_key: str) -> str | None:
+        row = (await self._run_sql(
+            "SELECT call_sid FROM slot_holds WHERE slot_key = ? AND expires_at > ?",
+            (slot_key, self.clock())
+        )).fetchone()
+        return row[0] if row else None
+
+    async def release(self, slot_key: str, call_sid: str):
+        await self._run_sql("DELETE FROM slot_holds WHERE slot_key = ? AND call_sid = ?", (slot_key, call_sid))
+
+class RedisSlotHolds(SlotHolds):
+    """
+    Shared hold table on a redis-compatible async client
+
+    Needs get/set(nx=, ex=)/delete. SET NX makes the first call to ask win the slot.
+    """
+
+    def __init__(self, redis, ttl_seconds: float = 120, prefix: str = "nova:hold:"):
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def acquire(self, slot_key: str, call_sid: str) -> bool:
+        key = self.prefix + slot_key
+        if await self.redis.set(key, call_sid, nx=True, ex=int(self.ttl_seconds)):
+            return True
+        if await self.holder(slot_key) == call_sid:
+            await self.redis.set(key, call_sid, ex=int(self.ttl_seconds))
+            return True
+        return False
+
+    async def holder(self, slot_key: str) -> str | None:
+        raw = await self.redis.get(self.prefix + slot_key)
+        return raw.decode() if isinstance(raw, bytes) else raw
+
+    async def release(self, slot_key: str, call_sid: str):
+        if await self.holder(slot_key) == call_sid:
+            await self.redis.delete(self.prefix + slot_key)
+
+def create_slot_holds() -> SlotHolds:
+    """Shared holds when conversations are shared across workers, otherwise in-process"""
+    if CONVERSATION_STORE == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CONVERSATION_STORE=redis needs the redis package: pip install redis")
+        return RedisSlotHolds(redis.from_url(REDIS_URL), ttl_seconds=SLOT_HOLD_SECONDS)
+
+    if CONVERSATION_STORE == "sqlite":
+        return SqliteSlotHolds(CONVERSATION_DB_PATH, ttl_seconds=SLOT_HOLD_SECONDS)
+
+    return MemorySlotHolds(ttl_seconds=SLOT_HOLD_SECONDS)
+
+holds = create_slot_holds()
+
+async def hold_slots(call_sid: str, slots: list[dict], count: int = 3) -> list[dict]:
+    """Hold up to count slots for a call, skipping ones other live calls are holding"""
+    held = []
+    for slot in slots:
+        if await holds.acquire(slot["datetime"], call_sid):
+            held.append(slot)
+            if len(held) == count:
+                break
+    return held
+
+async def unheld_slots(call_sid: str, slots: list[dict]) -> list[dict]:
+    """Slots that no other live call is holding"""
+    return [slot for slot in slots if await holds.holder(slot["datetime"]) in (None, call_sid)]
+
+async def release_slots(call_sid: str, slots: list[dict]):
+    """Let other callers have these slots again"""
+    for slot in slots:
+        await holds.release(slot["datetime"], call_sid)
@@ -0,0 +1,88 @@
+"""
+HTTP Clients - Shared, long-lived connection pools per upstream
+
+One httpx.AsyncClient per upstream host (Cal.com, Notion, CRM, Twilio),
+opened in the main.py lifespan and closed on shutdown. Keeping the pools
+alive between webhooks skips the TCP+TLS handshake on every request.
+"""
+import importlib.util
+import httpx
+
+from config import (
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY, HTTP2_ENABLED,
+    CAL_TIMEOUT, NOTION_TIMEOUT, CRM_TIMEOUT, TWILIO_TIMEOUT
+)
+
+# Default request timeout per upstream (seconds); individual calls can override it
+UPSTREAM_TIMEOUTS = {
+    "calcom": CAL_TIMEOUT,
+    "notion": NOTION_TIMEOUT,
+    "crm": CRM_TIMEOUT,
+    "twilio": TWILIO_TIMEOUT,
+}
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+clients: dict[str, httpx.AsyncClient] = {}
+
+# Per-upstream counters: requests sent vs new connections opened
+stats: dict[str, dict] = {}
+
+def make_hooks(name: str) -> dict:
+    """Event hooks that count requests and new connections for an upstream"""
+    counters = stats.setdefault(name, {"requests": 0, "connections_opened": 0})
+
+    async def trace(event: str, info: dict):
+        # httpcore only reports connect_tcp when the pool had no idle connection to reuse
+        if event == "connection.connect_tcp.complete":
+            counters["connections_opened"] += 1
+
+    async def on_request(request: httpx.Request):
+        counters["requests"] += 1
+        request.extensions["trace"] = trace
+
+    return {"request": [on_request]}
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Return the shared client for an upstream, creating it on first use"""
+    client = clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED and HTTP2_AVAILABLE,
+            timeout=UPSTREAM_TIMEOUTS.get(name, 5.0),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            event_hooks=make_hooks(name)
+        )
+        clients[name] = client
+    return client
+
+def open_clients():
+    """Create every upstream pool up front (called from the app lifespan)"""
+    for name in UPSTREAM_TIMEOUTS:
+        get_client(name)
+    http_version = "HTTP/2" if HTTP2_ENABLED and HTTP2_AVAILABLE else "HTTP/1.1"
+    print(f"HTTP pools ready ({http_version}): {', '.join(clients)}")
+
+async def close_clients():
+    """Close every upstream pool (called on shutdown)"""
+    for name, client in list(clients.items()):
+        await client.aclose()
+    clients.clear()
+
+def connection_stats() -> dict:
+    """Requests, new connections and connection reuse rate per upstream"""
+    report = {}
+    for name, counters in stats.items():
+        requests = counters["requests"]
+        opened = counters["connections_opened"]
+        report[name] = {
+            "requests": requests,
+            "connections_opened": opened,
+            "reuse_rate": round(1 - opened / requests, 3) if requests else None
+        }
+    return report
@@ -0,0 +1,218 @@
+"""
+Job Queue - Durable background jobs backed by a SQLite outbox
+
+Webhooks enqueue side effects (SMS, Notion, CRM) and return TwiML right away.
+Async workers pick jobs up from the outbox, retry failures with exponential
+backoff, and resume whatever was pending after a restart. Each job carries
+an idempotency key (e.g. "<CallSid>:notion_lead") so Twilio retries and
+duplicate events never run the same side effect twice.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Awaitable, Callable
+
+from config import JOBS_DB_PATH, JOB_WORKERS, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS
+
+# How long a worker may hold a job before another worker assumes it crashed
+JOB_LEASE_SECONDS = 300
+
+# Longest wait between retries, however many attempts have failed
+JOB_RETRY_MAX_SECONDS = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_run_at REAL NOT NULL,
+    claimed_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_run_at);
+"""
+
+class JobQueue:
+    """SQLite-backed outbox plus the async workers that drain it"""
+
+    def __init__(self, db_path: str, workers: int = 4, max_attempts: int = 6,
+                 retry_base_seconds: float = 2.0, poll_seconds: float = 1.0):
+        self.db_path = db_path
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_seconds = poll_seconds
+        self.handlers: dict[str, Callable[[dict], Awaitable]] = {}
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._wakeup = None
+        self._workers: list[asyncio.Task] = []
+        self._in_progress: set[int] = set()
+
+    def handler(self, kind: str):
+        """Decorator registering the coroutine that runs jobs of this kind"""
+        def register(func):
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._db_lock:
+            return self._connect().execute(sql, params)
+
+    async def _run_sql(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        # sqlite3 blocks, so keep it off the event loop
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def enqueue(self, kind: str, payload: dict, idempotency_key: str) -> bool:
+        """
+        Add a job to the outbox
+
+        Returns False if a job with this idempotency key already exists.
+        """
+        now = time.time()
+        cursor = await self._run_sql(
+            "INSERT OR IGNORE INTO jobs (kind, idempotency_key, payload, next_run_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (kind, idempotency_key, json.dumps(payload), now, now)
+        )
+        if cursor.rowcount == 0:
+            print(f"Job {idempotency_key} already queued, skipping")
+            return False
+
+        if self._wakeup:
+            self._wakeup.set()
+        return True
+
+    def _claim_next(self):
+        """Atomically take the next due job (also safe across processes sharing the file)"""
+        now = time.time()
+        with self._db_lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT id, kind, idempotency_key, payload, attempts FROM jobs "
+                "WHERE status = 'pending' AND next_run_at <= ? ORDER BY next_run_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = db.execute(
+                "UPDATE jobs SET status = 'running', claimed_at = ? WHERE id = ? AND status = 'pending'",
+                (now, row[0])
+            ).rowcount
+            return row if claimed else None
+
+    async def _finish(self, job_id: int, attempts: int, error: str = None):
+        if error is None:
+            await self._run_sql(
+                "UPDATE jobs SET status = 'done', attempts = ?, last_error = NULL WHERE id = ?",
+                (attempts, job_id)
+            )
+        elif attempts >= self.max_attempts:
+            await self._run_sql(
+                "UPDATE jobs SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                (attempts, error, job_id)
+            )
+        else:
+            delay = min(self.retry_base_seconds * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+            await self._run_sql(
+                "UPDATE jobs SET status = 'pending', attempts = ?, last_error = ?, next_run_at = ? WHERE id = ?",
+                (attempts, error, time.time() + delay, job_id)
+            )
+
+    async def run_next(self) -> bool:
+        """Run one due job, if any. Returns True if a job was run."""
+        row = await asyncio.to_thread(self._claim_next)
+        if row is None:
+            return False
+
+        job_id, kind, key, payload, attempts = row
+        attempts += 1
+        self._in_progress.add(job_id)
+        try:
+            handler = self.handlers.get(kind)
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job kind '{kind}'")
+            await handler(json.loads(payload))
+            await self._finish(job_id, attempts)
+            print(f"Job {key} done (attempt {attempts})")
+        except Exception as e:
+            print(f"Job {key} failed (attempt {attempts}/{self.max_attempts}): {e}")
+            await self._finish(job_id, attempts, str(e) or type(e).__name__)
+        finally:
+            self._in_progress.discard(job_id)
+        return True
+
+    async def _worker(self):
+        while True:
+            try:
+                if await self.run_next():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job worker error: {e}")
+                traceback.print_exc()
+
+            # Nothing due - sleep until something is enqueued or a retry comes due
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def start(self):
+        """Recover abandoned jobs and start the workers (called from the app lifespan)"""
+        await self._run_sql(
+            "UPDATE jobs SET status = 'pending' WHERE status = 'running' AND claimed_at < ?",
+            (time.time() - JOB_LEASE_SECONDS,)
+        )
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        print(f"Job queue started: {self.worker_count} workers, outbox at {self.db_path}")
+
+    async def stop(self, drain_seconds: float = 10.0):
+        """Let running jobs finish (up to drain_seconds), then stop the workers"""
+        deadline = time.monotonic() + drain_seconds
+        while self._in_progress and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        interrupted = list(self._in_progress)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Jobs interrupted mid-run go back to pending for the next start
+        for job_id in interrupted:
+            await self._run_sql("UPDATE jobs SET status = 'pending' WHERE id = ?", (job_id,))
+        pending = (await self._run_sql("SELECT COUNT(*) FROM jobs WHERE status = 'pending'")).fetchone()[0]
+        print(f"Job queue stopped ({pending} pending jobs kept in outbox)")
+
+    async def counts(self) -> dict:
+        """Number of jobs per status"""
+        rows = (await self._run_sql("SELECT status, COUNT(*) FROM jobs GROUP BY status")).fetchall()
+        return dict(rows)
+
+# The app's job queue
+queue = JobQueue(
+    JOBS_DB_PATH,
+    workers=JOB_WORKERS,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    retry_base_seconds=JOB_RETRY_BASE_SECONDS
+)
@@ -0,0 +1,99 @@
+"""
+Language Service - Detects whether the caller is speaking English or Spanish
+
+Utterances are split on whitespace and the distinct words are intersected
+with precompiled word sets. The sets hold each word with and without
+accents (speech recognition isn't consistent about them) and with the
+punctuation transcripts attach to it, so matching is whole words only -
+no regex, no substring hits like "sí" inside "así".
+
+The scores give a language plus a confidence. Each call keeps its language
+until several confident turns in a row point the other way, so a Spanish
+name or a stray "sí" won't flip Nova mid-call.
+"""
+
+from config import LANGUAGE_MIN_CONFIDENCE, LANGUAGE_STRONG_CONFIDENCE, LANGUAGE_SWITCH_TURNS
+from models import ConversationState
+
+FOLD_ACCENTS = str.maketrans("áéíóúüñ", "aeiouun")
+
+# Common words. Words both languages use ("no", "me", "a") are left out.
+SPANISH_SPELLINGS = """
+    hola buenos buenas días tardes noches gracias favor sí necesito quiero busco
+    ayuda información habla hablas hablo español puedo puede puedes estoy está
+    estás tengo tiene es el la los las de del que para con una un mi mis yo
+    usted muy mucho cómo como cuándo cuando dónde donde nombre llamo número
+    teléfono correo negocio empresa cita mañana lunes martes miércoles jueves
+    viernes sábado domingo pero también bien claro vale bueno este esto eso hay
+    quisiera gustaría llamar hora tarde sería perfecto servicio automatización
+""".split()
+ENGLISH_SPELLINGS = """
+    hello hi hey yes yeah yep the an i i'm im my is are to for with and of
+    need want help looking name number phone email business company
+    appointment tomorrow monday tuesday wednesday thursday friday saturday
+    sunday what how when where can could would please thanks thank you your
+    it that this okay ok sure good great morning afternoon evening call time
+    have do am be we our book sounds works speak english service automation
+""".split()
+
+def word_forms(words: list[str]) -> frozenset:
+    """Every way a word can appear as a whitespace-separated token in a transcript"""
+    forms = set()
+    for word in words:
+        for spelling in {word, word.translate(FOLD_ACCENTS)}:
+            forms.update((spelling, "¿" + spelling, "¡" + spelling, "¿" + spelling + "?", "¡" + spelling + "!"))
+            forms.update(spelling + mark for mark in ",.?!;:")
+    return frozenset(forms)
+
+SPANISH_WORDS = word_forms(SPANISH_SPELLINGS)
+ENGLISH_WORDS = word_forms(ENGLISH_SPELLINGS)
+
+def score_language(text: str) -> tuple[str, float]:
+    """
+    Best guess at the language of one utterance, with a 0-1 confidence
+
+    Returns ('en', 0.0) when there's no evidence either way.
+    """
+    lowered = text.lower()
+    words = set(lowered.split())
+    # Accents, ñ and ¿¡ only show up in Spanish transcripts
+    spanish = len(words & SPANISH_WORDS) + (0 if lowered.isascii() else 1)
+    english = len(words & ENGLISH_WORDS)
+
+    if spanish == english:
+        return "en", 0.0
+    language = "es" if spanish > english else "en"
+    # The +1 keeps a single matching word from counting as certainty
+    return language, abs(spanish - english) / (spanish + english + 1)
+
+def detect_language(text: str) -> str:
+    """
+    Detect if the text is in Spanish or English
+    Returns: 'es' for Spanish, 'en' for English
+    """
+    language, confidence = score_language(text)
+    return language if confidence >= LANGUAGE_MIN_CONFIDENCE else "en"
+
+def update_language(conversation: ConversationState, text: str) -> str:
+    """
+    Update the call's language from the caller's latest utterance (call before recording it)
+
+    The first confident utterance sets the language. After that it switches
+    on one strongly confident turn or LANGUAGE_SWITCH_TURNS confident turns
+    in a row; anything else resets the streak.
+    """
+    language, confidence = score_language(text)
+    first_turn = not conversation.summary and not any(message.role == "user" for message in conversation.messages)
+
+    if language == conversation.language or confidence < LANGUAGE_MIN_CONFIDENCE:
+        conversation.language_streak = 0
+    elif first_turn or confidence >= LANGUAGE_STRONG_CONFIDENCE:
+        conversation.language = language
+        conversation.language_streak = 0
+    else:
+        conversation.language_streak += 1
+        if conversation.language_streak >= LANGUAGE_SWITCH_TURNS:
+            conversation.language = language
+            conversation.language_streak = 0
+
+    return conversation.language
@@ -0,0 +1,206 @@
+"""
+Lead Sync - One Notion page and one CRM contact per call
+
+The book and status webhooks (and Twilio's retries of them) can all report
+the same call. Every report is merged into a per-CallSid ledger kept next to
+the job outbox, and the lead jobs sync Notion and the CRM to the ledger's
+latest state: the first sync creates the page, later ones patch only the
+properties that changed, and a sync with nothing new writes nothing. The CRM
+contact is submitted again whenever the fields it receives change.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from config import JOBS_DB_PATH
+from models import CallData
+from services.crm import create_lead, update_lead, lead_properties, crm_contact, push_to_crm_backend
+from services.metrics import LEAD_WRITES
+
+# How long a worker may be creating a call's Notion page before another may try
+CREATE_LEASE_SECONDS = 300
+
+# Later statuses win; a status webhook arriving after a booking can't undo it
+STATUS_RANK = {"new": 0, "no_booking": 1, "needs_callback": 2, "booked": 3}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    call_sid TEXT PRIMARY KEY,
+    call_data TEXT NOT NULL,
+    notion_page_id TEXT,
+    notion_written TEXT,
+    notion_claimed_at REAL,
+    crm_pushed_at REAL,
+    crm_version TEXT,
+    updated_at REAL NOT NULL
+);
+"""
+
+def contact_version(call_data: CallData, call_sid: str) -> str:
+    """Fingerprint of what the CRM receives for a call, to tell whether it needs pushing again"""
+    return hashlib.sha1(json.dumps(crm_contact(call_data, call_sid), sort_keys=True).encode()).hexdigest()[:12]
+
+def merge_call_data(current: CallData, update: CallData) -> CallData:
+    """Combine two reports of the same call without losing anything the first one knew"""
+    merged = current.model_copy()
+    for field in ("name", "phone", "email", "service", "appointment_time"):
+        value = getattr(update, field)
+        if value:
+            setattr(merged, field, value)
+    if len(update.notes) > len(current.notes):
+        merged.notes = update.notes
+    if STATUS_RANK.get(update.status, 0) >= STATUS_RANK.get(current.status, 0):
+        merged.status = update.status
+    return merged
+
+class LeadLedger:
+    """What each call's lead should look like, and what has been written upstream"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._db = None
+        self._db_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            columns = {row[1] for row in db.execute("PRAGMA table_info(leads)")}
+            if "crm_version" not in columns:  # ledgers created before CRM re-pushes
+                db.execute("ALTER TABLE leads ADD COLUMN crm_version TEXT")
+            self._db = db
+        return self._db
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._db_lock:
+            return self._connect().execute(sql, params)
+
+    async def _run_sql(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        # sqlite3 blocks, so keep it off the event loop
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    def _merge(self, call_sid: str, call_data: CallData) -> CallData | None:
+        with self._db_lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT call_data FROM leads WHERE call_sid = ?", (call_sid,)).fetchone()
+                if row is None:
+                    merged = call_data
+                else:
+                    current = CallData.model_validate_json(row[0])
+                    merged = merge_call_data(current, call_data)
+                    if merged == current:
+                        db.execute("COMMIT")
+                        return None
+                db.execute(
+                    "INSERT INTO leads (call_sid, call_data, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (call_sid) DO UPDATE SET call_data = excluded.call_data, updated_at = excluded.updated_at",
+                    (call_sid, merged.model_dump_json(), time.time())
+                )
+                db.execute("COMMIT")
+                return merged
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    async def record(self, call_sid: str, call_data: CallData) -> CallData | None:
+        """Merge a report of the call into its lead. Returns the merged data, or None if nothing changed."""
+        return await asyncio.to_thread(self._merge, call_sid, call_data)
+
+    async def get(self, call_sid: str) -> dict | None:
+        row = (await self._run_sql(
+            "SELECT call_data, notion_page_id, notion_written, crm_version FROM leads WHERE call_sid = ?",
+            (call_sid,)
+        )).fetchone()
+        if row is None:
+            return None
+        return {
+            "call_data": CallData.model_validate_json(row[0]),
+            "notion_page_id": row[1],
+            "notion_written": json.loads(row[2]) if row[2] else {},
+            "crm_version": row[3],
+        }
+
+    async def claim_notion_create(self, call_sid: str) -> bool:
+        """Take the right to create the call's Notion page (False if another worker has it)"""
+        now = time.time()
+        cursor = await self._run_sql(
+            "UPDATE leads SET notion_claimed_at = ? WHERE call_sid = ? AND notion_page_id IS NULL "
+            "AND (notion_claimed_at IS NULL OR notion_claimed_at < ?)",
+            (now, call_sid, now - CREATE_LEASE_SECONDS)
+        )
+        return cursor.rowcount == 1
+
+    async def release_notion_create(self, call_sid: str):
+        await self._run_sql("UPDATE leads SET notion_claimed_at = NULL WHERE call_sid = ?", (call_sid,))
+
+    async def record_notion(self, call_sid: str, page_id: str, written: dict):
+        await self._run_sql(
+            "UPDATE leads SET notion_page_id = ?, notion_written = ?, notion_claimed_at = NULL, updated_at = ? "
+            "WHERE call_sid = ?",
+            (page_id, json.dumps(written), time.time(), call_sid)
+        )
+
+    async def record_crm_push(self, call_sid: str, version: str):
+        await self._run_sql(
+            "UPDATE leads SET crm_pushed_at = ?, crm_version = ?, updated_at = ? WHERE call_sid = ?",
+            (time.time(), version, time.time(), call_sid)
+        )
+
+# The app's lead ledger, in the same SQLite file as the job outbox
+ledger = LeadLedger(JOBS_DB_PATH)
+
+async def sync_notion_lead(call_sid: str):
+    """Bring the call's Notion page up to date: create it once, then patch what changed"""
+    lead = await ledger.get(call_sid)
+    if lead is None:
+        raise RuntimeError(f"No lead recorded for call {call_sid}")
+
+    properties = lead_properties(lead["call_data"], call_sid)
+
+    if lead["notion_page_id"] is None:
+        if not await ledger.claim_notion_create(call_sid):
+            # Another worker is creating it - retry later and patch instead
+            raise RuntimeError(f"Notion page for {call_sid} is being created")
+        result = await create_lead(lead["call_data"], call_sid)
+        if not result["success"]:
+            await ledger.release_notion_create(call_sid)
+            raise RuntimeError(result["error"])
+        await ledger.record_notion(call_sid, result["page_id"], properties)
+        LEAD_WRITES.inc("notion", "created")
+        return
+
+    written = lead["notion_written"]
+    changed = {name: value for name, value in properties.items() if written.get(name) != value}
+    if not changed:
+        print(f"Notion lead for {call_sid} already up to date")
+        LEAD_WRITES.inc("notion", "unchanged")
+        return
+
+    result = await update_lead(lead["notion_page_id"], changed)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    await ledger.record_notion(call_sid, lead["notion_page_id"], {**written, **changed})
+    LEAD_WRITES.inc("notion", "patched")
+
+async def sync_crm_contact(call_sid: str):
+    """Submit the call's contact to the CRM backend, again only if what it would receive has changed"""
+    lead = await ledger.get(call_sid)
+    if lead is None:
+        raise RuntimeError(f"No lead recorded for call {call_sid}")
+    version = contact_version(lead["call_data"], call_sid)
+    if lead["crm_version"] == version:
+        print(f"CRM contact for {call_sid} already up to date")
+        LEAD_WRITES.inc("crm", "unchanged")
+        return
+
+    result = await push_to_crm_backend(lead["call_data"], call_sid)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    await ledger.record_crm_push(call_sid, version)
+    LEAD_WRITES.inc("crm", "pushed")
@@ -0,0 +1,138 @@
+"""
+LLM Client - Shared async OpenAI client and concurrency limit
+
+The openai package is the slowest import in the app and its client refuses
+to build without an API key, so the client is built on first use (or warmed
+in the background at startup by warm_client) rather than at import.
+"""
+import asyncio
+import threading
+import time
+import httpx
+
+from config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_TIMEOUT, OPENAI_MAX_RETRIES,
+    OPENAI_MAX_CONCURRENCY, OPENAI_MAX_CONNECTIONS
+)
+from services.resilience import admit, UpstreamUnavailable
+from services.call_log import call_log
+
+class LLMTimeout(Exception):
+    """The model didn't answer within OPENAI_TIMEOUT"""
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The shared AsyncOpenAI client, created on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import AsyncOpenAI
+
+                # Shared keep-alive connection pool, so concurrent callers get
+                # overlapping completions instead of blocking the event loop
+                _client = AsyncOpenAI(
+                    api_key=OPENAI_API_KEY,
+                    base_url=OPENAI_BASE_URL,
+                    timeout=OPENAI_TIMEOUT,
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=OPENAI_MAX_CONNECTIONS,
+                            max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+                        ),
+                        timeout=OPENAI_TIMEOUT
+                    )
+                )
+    return _client
+
+async def warm_client():
+    """Import openai and build the client off the event loop (called from the app lifespan)"""
+    if not OPENAI_API_KEY:
+        print("OPENAI_API_KEY is not set - calls will fail until it is")
+        return
+    await asyncio.to_thread(get_client)
+
+def record_outcome(breaker, start: float, error: BaseException = None):
+    """Tell the OpenAI breaker and the call log how a completion went (error is None if it succeeded)"""
+    from openai import APITimeoutError, APIStatusError
+
+    if error is None:
+        outcome = "ok"
+        breaker.record_success()
+    elif isinstance(error, (APITimeoutError, httpx.TimeoutException, LLMTimeout)):
+        outcome = "timeout"
+        breaker.record_failure()
+    elif isinstance(error, APIStatusError):
+        outcome = "error"
+        if error.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    elif isinstance(error, asyncio.CancelledError):
+        outcome = "cancelled"
+        breaker.trial_in_flight = False
+    else:
+        # Connection errors, and anything else (a malformed response, a client-side
+        # bug) - count it so a half-open trial never stays in flight forever
+        outcome = "error"
+        breaker.record_failure()
+    call_log.record_upstream("openai", time.monotonic() - start, outcome)
+
+class CompletionStream:
+    """
+    A streamed completion, settled with finish() once it has been read
+
+    Opening the stream only means OpenAI started answering; it can still fail
+    or stall partway. The reader calls finish() when the stream ends (or
+    finish(error) when it breaks off), and only then do the breaker and the
+    call log hear how it went.
+    """
+
+    def __init__(self, stream, breaker, start: float):
+        self.stream = stream
+        self.breaker = breaker
+        self.start = start
+        self.settled = False
+
+    def __aiter__(self):
+        return self.stream.__aiter__()
+
+    def finish(self, error: BaseException = None):
+        if not self.settled:
+            self.settled = True
+            record_outcome(self.breaker, self.start, error)
+
+async def create_completion(**kwargs):
+    """
+    client.chat.completions.create behind the OpenAI circuit breaker and the webhook deadline
+
+    A timeout, an open circuit or no time left before Twilio gives up all
+    raise LLMTimeout, so callers fall back the same way for each. With
+    stream=True the result is a CompletionStream the caller must finish().
+    """
+    try:
+        breaker, budget = admit("openai", OPENAI_TIMEOUT)
+    except UpstreamUnavailable as e:
+        call_log.record_upstream("openai", 0, "skipped")
+        raise LLMTimeout(str(e)) from e
+
+    client = get_client()
+    from openai import APITimeoutError
+    start = time.monotonic()
+    try:
+        response = await client.chat.completions.create(timeout=budget, **kwargs)
+    except BaseException as e:
+        record_outcome(breaker, start, e)
+        if isinstance(e, APITimeoutError):
+            raise LLMTimeout(str(e)) from e
+        raise
+    if kwargs.get("stream"):
+        return CompletionStream(response, breaker, start)
+    record_outcome(breaker, start)
+    return response
+
+# Caps how many completions this worker runs at once; extra requests wait for a free slot
+llm_slots = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
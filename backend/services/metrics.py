@@ -0,0 +1,164 @@
+"""
+Metrics - Lightweight counters, gauges and histograms for the hot path
+
+Exposed in Prometheus text format on /metrics. Recording a sample is a dict
+lookup plus a bisect, so it is cheap enough to leave on in production.
+Each uvicorn worker keeps its own numbers.
+"""
+import time
+from bisect import bisect_left
+
+# Latency buckets (seconds) sized for phone-call webhooks and upstream APIs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+registry = []
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic count, optionally split by labels"""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values: dict[tuple, float] = {}
+        registry.append(self)
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values) -> float:
+        return self.values.get(label_values, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+
+    def dec(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) - amount
+
+    def set(self, *label_values, value: float):
+        self.values[label_values] = value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    """Distribution of observed values (e.g. latencies), optionally split by labels"""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self.series: dict[tuple, list] = {}
+        registry.append(self)
+
+    def observe(self, value: float, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, *label_values) -> "Timer":
+        """Context manager that observes how long its block took"""
+        return Timer(self, label_values)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = format_labels(self.labels, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Timer:
+    """Times a block into a histogram; works in sync and async code"""
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram: Histogram, label_values: tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# HTTP routes (webhooks, health, metrics)
+REQUEST_SECONDS = Histogram("nova_request_seconds", "Request handling time by route", ("route",))
+REQUESTS_IN_FLIGHT = Gauge("nova_requests_in_flight", "Requests currently being handled")
+
+# Upstream services
+UPSTREAM_SECONDS = Histogram("nova_upstream_seconds", "Upstream call time", ("upstream", "operation"))
+UPSTREAM_ERRORS = Counter("nova_upstream_errors_total", "Failed upstream calls", ("upstream", "operation"))
+
+# Call flow
+STAGE_SECONDS = Histogram("nova_stage_seconds", "Time spent in local processing stages", ("stage",))
+FALLBACKS = Counter("nova_fallbacks_total", "Times Nova fell back to a canned response or default data", ("kind",))
+ERRORS = Counter("nova_errors_total", "Unhandled errors by webhook", ("route",))
+# Calls start and end on whichever worker Twilio's webhook lands on - sum across workers for the total
+CALLS_IN_FLIGHT = Gauge("nova_calls_in_flight", "Calls started minus calls ended on this worker")
+SPECULATIONS = Counter("nova_speculations_total", "Replies drafted from partial transcripts, by outcome", ("result",))
+LOCAL_EXTRACTIONS = Counter("nova_local_extractions_total", "Caller details filled in without the model, by field", ("field",))
+BREAKER_STATE = Gauge("nova_circuit_open", "1 while an upstream's circuit breaker is open", ("upstream",))
+UPSTREAM_REJECTIONS = Counter("nova_upstream_rejections_total", "Upstream calls skipped to fail fast", ("upstream", "reason"))
+HEDGED_REQUESTS = Counter("nova_hedged_requests_total", "Second copies of slow idempotent reads", ("upstream", "result"))
+CACHE_LOOKUPS = Counter("nova_cache_lookups_total", "Cache lookups by cache and result", ("cache", "result"))
+MODEL_SECONDS = Histogram("nova_model_seconds", "OpenAI completion time by model tier", ("tier", "operation"))
+MODEL_TOKENS = Counter("nova_model_tokens_total", "OpenAI tokens by model tier", ("tier", "kind"))
+MODEL_COST = Counter("nova_model_cost_usd_total", "Estimated OpenAI spend in USD by model tier", ("tier",))
+CALL_LOG_EVENTS = Counter("nova_call_log_events_total", "Call log events by outcome (written or dropped)", ("result",))
+LEAD_WRITES = Counter("nova_lead_writes_total", "Lead syncs to Notion and the CRM, by outcome", ("target", "result"))
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route"""
+
+    def __init__(self, app, routes: set = None):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        # Keep label cardinality bounded - unknown paths share one series
+        route = path if self.routes is None or path in self.routes else "other"
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route)
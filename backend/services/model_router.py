@@ -0,0 +1,91 @@
+"""
+Model Router - Picks a fast or a large model for each completion
+
+Most turns are chit-chat ("sure", "sounds good", "what do you do?") that a
+small model answers well in a fraction of the time. The large model is kept
+for turns where quality decides the outcome: long or booking-related
+utterances, the booking negotiation once we have the caller's name and
+number, and extracting details the caller is dictating.
+
+Every completion is counted per tier - latency, tokens and estimated cost -
+so /metrics shows what routing saves.
+"""
+import re
+
+from config import MODEL_ROUTING, OPENAI_MODEL, OPENAI_FAST_MODEL, EXTRACTION_MODEL, ROUTER_COMPLEX_WORDS
+from models import ConversationState
+from services.context import estimate_tokens
+from services.reply_cache import has_personal_data
+from services.metrics import MODEL_SECONDS, MODEL_TOKENS, MODEL_COST
+
+FAST = "fast"
+LARGE = "large"
+
+# USD per million (prompt, completion) tokens, for the cost estimate on /metrics
+MODEL_PRICES = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-3.5-turbo": (0.5, 1.5),
+}
+
+# Talk of dates and times means the caller is negotiating a booking
+BOOKING_WORDS = re.compile(
+    r"\b(book|booking|schedule|appointment|reschedule|available|availability|tomorrow|today|tonight|"
+    r"morning|afternoon|evening|next week|monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"cita|agendar|reservar|disponible|mañana|tarde|noche|semana|lunes|martes|miércoles|jueves|viernes|sábado|domingo)\b",
+    re.IGNORECASE
+)
+
+def last_utterance(conversation: ConversationState) -> str:
+    for msg in reversed(conversation.messages):
+        if msg.role == "user":
+            return msg.content
+    return ""
+
+def reply_tier(conversation: ConversationState) -> str:
+    """Tier for Nova's spoken reply to the caller's latest turn"""
+    if not MODEL_ROUTING:
+        return LARGE
+    utterance = last_utterance(conversation)
+    call_data = conversation.call_data
+    if conversation.stage in ("booking", "booked"):
+        return LARGE
+    # Name and number in hand - the next turns negotiate the booking
+    if call_data.name and call_data.phone:
+        return LARGE
+    if len(utterance.split()) > ROUTER_COMPLEX_WORDS or BOOKING_WORDS.search(utterance):
+        return LARGE
+    return FAST
+
+def extraction_tier(conversation: ConversationState) -> str:
+    """Tier for the extraction call - large while the caller is dictating details"""
+    if not MODEL_ROUTING:
+        return LARGE
+    utterance = last_utterance(conversation)
+    if has_personal_data(utterance) or len(utterance.split()) > ROUTER_COMPLEX_WORDS:
+        return LARGE
+    return FAST
+
+def reply_model(tier: str) -> str:
+    return OPENAI_FAST_MODEL if tier == FAST else OPENAI_MODEL
+
+def extraction_model(tier: str) -> str:
+    return OPENAI_FAST_MODEL if tier == FAST else EXTRACTION_MODEL
+
+def record_completion(tier: str, operation: str, model: str, seconds: float,
+                      prompt_tokens: int, completion_tokens: int):
+    """Count one completion's latency, tokens and estimated cost against its tier"""
+    MODEL_SECONDS.observe(seconds, tier, operation)
+    MODEL_TOKENS.inc(tier, "prompt", amount=prompt_tokens)
+    MODEL_TOKENS.inc(tier, "completion", amount=completion_tokens)
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    MODEL_COST.inc(tier, amount=(prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000)
+
+def usage_tokens(response, messages: list[dict], output: str) -> tuple[int, int]:
+    """(prompt, completion) tokens from the response's usage, estimated when it has none (streams)"""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        return usage.prompt_tokens, usage.completion_tokens
+    return sum(estimate_tokens(msg["content"] or "") for msg in messages), estimate_tokens(output or "")
@@ -0,0 +1,173 @@
+"""
+Notion Service - Rate-limited writer for the Notion pages API
+
+Notion allows about 3 requests per second per integration and answers 429
+with a Retry-After header beyond that. Every page create and update goes
+through one bounded send queue, paced by a token bucket. A 429 pauses the
+bucket for Retry-After and the write is retried, so a call spike queues
+leads instead of losing them. Updates to a page that are still waiting to
+be sent are merged into a single PATCH.
+
+Writes come from lead jobs (services/leads.py), which stay in the SQLite
+job outbox until their write succeeds - that outbox is the backlog that
+survives a restart.
+"""
+import asyncio
+
+from config import (
+    NOTION_TOKEN, NOTION_API_URL, NOTION_RATE_PER_SECOND, NOTION_QUEUE_SIZE, NOTION_MAX_RATE_LIMIT_RETRIES,
+    NOTION_TIMEOUT
+)
+from services.http_clients import get_client
+from services.resilience import call_upstream, detached
+from services.rate_limit import TokenBucket, parse_retry_after
+from services.metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS
+
+NOTION_HEADERS = {
+    "Authorization": f"Bearer {NOTION_TOKEN}",
+    "Content-Type": "application/json",
+    "Notion-Version": "2022-06-28"
+}
+
+class PendingWrite:
+    """A create or update waiting for its turn, and everyone waiting on its result"""
+
+    def __init__(self, operation: str, page_id: str = None, body: dict = None):
+        self.operation = operation  # "create_page" or "update_page"
+        self.page_id = page_id
+        self.body = body
+        self.waiters: list[asyncio.Future] = []
+
+class NotionWriter:
+    """Rate-limited send queue in front of Notion's pages API"""
+
+    def __init__(self, rate_per_second: float = 3.0, queue_size: int = 500, max_rate_limit_retries: int = 5):
+        self.queue_size = queue_size
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.bucket = TokenBucket(rate_per_second)
+        self.rate_limited = 0
+        self._queue = None
+        self._consumer = None
+        self._pending_updates: dict[str, PendingWrite] = {}
+        self._last_write: dict[str, asyncio.Task] = {}
+        self._in_flight: set[asyncio.Task] = set()
+
+    def _ensure_started(self):
+        if self._consumer is None or self._consumer.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            # Long-lived, so it must not inherit the deadline of whichever webhook started it
+            self._consumer = detached(self._consume())
+
+    async def _consume(self):
+        while True:
+            write = await self._queue.get()
+            if write.operation == "update_page":
+                # From here on, new updates to this page start a new write
+                self._pending_updates.pop(write.page_id, None)
+            await self.bucket.acquire()
+
+            # Writes to the same page go out in order, one at a time
+            previous = self._last_write.get(write.page_id) if write.page_id else None
+            task = asyncio.create_task(self._deliver(write, previous))
+            if write.page_id:
+                self._last_write[write.page_id] = task
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _deliver(self, write: PendingWrite, previous: asyncio.Task = None):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            result = await self._send(write)
+        except Exception as e:
+            UPSTREAM_ERRORS.inc("notion", write.operation)
+            print(f"Notion error: {e}")
+            result = {"success": False, "error": str(e) or type(e).__name__}
+        finally:
+            if write.page_id and self._last_write.get(write.page_id) is asyncio.current_task():
+                del self._last_write[write.page_id]
+        self._resolve(write, result)
+
+    def _resolve(self, write: PendingWrite, result: dict):
+        for waiter in write.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    async def _send(self, write: PendingWrite) -> dict:
+        if write.operation == "create_page":
+            method, url = "POST", f"{NOTION_API_URL}/pages"
+        else:
+            method, url = "PATCH", f"{NOTION_API_URL}/pages/{write.page_id}"
+
+        for attempt in range(self.max_rate_limit_retries + 1):
+            if attempt:
+                await self.bucket.acquire()
+            with UPSTREAM_SECONDS.time("notion", write.operation):
+                response = await call_upstream(
+                    "notion",
+                    lambda: get_client("notion").request(method, url, json=write.body, headers=NOTION_HEADERS),
+                    NOTION_TIMEOUT
+                )
+            if response.status_code != 429:
+                break
+            self.rate_limited += 1
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            print(f"Notion rate limited, retrying in {retry_after}s")
+            # Everything behind this write waits too
+            self.bucket.pause(retry_after)
+
+        if response.status_code != 200:
+            UPSTREAM_ERRORS.inc("notion", write.operation)
+            error_detail = response.text
+            print(f"Notion API Error {response.status_code}:")
+            print(f"Response: {error_detail}")
+            return {"success": False, "error": error_detail}
+        return {"success": True, "page": response.json()}
+
+    async def _submit(self, write: PendingWrite) -> dict:
+        self._ensure_started()
+        waiter = asyncio.get_running_loop().create_future()
+        write.waiters.append(waiter)
+        await self._queue.put(write)
+        return await waiter
+
+    async def create_page(self, body: dict) -> dict:
+        """Queue a page create and wait for Notion's answer"""
+        return await self._submit(PendingWrite("create_page", body=body))
+
+    async def update_page(self, page_id: str, properties: dict) -> dict:
+        """Queue a property update, merged with any update to the page not sent yet"""
+        pending = self._pending_updates.get(page_id)
+        if pending is not None:
+            pending.body["properties"].update(properties)
+            waiter = asyncio.get_running_loop().create_future()
+            pending.waiters.append(waiter)
+            return await waiter
+
+        write = PendingWrite("update_page", page_id=page_id, body={"properties": dict(properties)})
+        self._pending_updates[page_id] = write
+        return await self._submit(write)
+
+    def backlog(self) -> int:
+        """Writes queued or in flight"""
+        return (self._queue.qsize() if self._queue else 0) + len(self._in_flight)
+
+    async def stop(self):
+        """Stop taking writes and wait for in-flight ones (called on shutdown)"""
+        if self._consumer:
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            self._consumer = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        # Anything never sent stays pending in the job outbox and is retried after the restart
+        while self._queue and not self._queue.empty():
+            self._resolve(self._queue.get_nowait(), {"success": False, "error": "Notion writer stopped"})
+        self._pending_updates.clear()
+
+# The app's Notion writer
+writer = NotionWriter(
+    rate_per_second=NOTION_RATE_PER_SECOND,
+    queue_size=NOTION_QUEUE_SIZE,
+    max_rate_limit_retries=NOTION_MAX_RATE_LIMIT_RETRIES
+)
@@ -0,0 +1,67 @@
+"""
+Rate Limiting - Token bucket shared by the outbound API senders
+"""
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+
+def parse_retry_after(value: str, default: float = 1.0) -> float:
+    """
+    Seconds to wait from a Retry-After header
+
+    Accepts both forms the header may take: delay-seconds or an HTTP date.
+    Missing or unreadable values wait `default` seconds.
+    """
+    if value is None:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts up to `capacity`
+
+    Waiters are served in arrival order. pause() blocks the bucket for a
+    while, e.g. when an upstream answers 429 with a Retry-After header.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+        self.blocked_until = 0.0
+        self._lock = None
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = self.clock()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the next `seconds`"""
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+        self.tokens = 0
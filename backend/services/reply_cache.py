@@ -0,0 +1,127 @@
+"""
+Reply Cache - Answers short, repeated opening turns without calling OpenAI
+
+Many callers open the same way ("hello", "yes", "what do you do", "hola").
+Early in a call the reply depends only on what was said so far, so replies
+are cached per worker, keyed on the normalized utterance, the language, the
+conversation stage and the normalized turns before it.
+
+Personal data is kept out by three guards. Utterances with digits, spoken
+numbers, an email or an introduction are never looked up. A reply is only
+stored when extraction found nothing in that turn. Replies containing
+digits or an @ are never stored.
+"""
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+from config import REPLY_CACHE_ENABLED, REPLY_CACHE_MAX_ENTRIES, REPLY_CACHE_TTL_SECONDS, REPLY_CACHE_MAX_WORDS
+from models import ConversationState, ExtractedFields
+from services.metrics import CACHE_LOOKUPS
+
+# Stages where replies don't depend on anything the caller told us about themselves
+CACHEABLE_STAGES = ("greeting", "discovery")
+
+# Hesitations dropped before matching, so "um hello" and "hello" share an entry
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "uhm", "er", "ah", "eh", "hmm", "mm", "oh", "este", "pues"}
+
+NUMBER_WORDS = {
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "oh",
+    "cero", "uno", "dos", "tres", "cuatro", "cinco", "seis", "siete", "ocho", "nueve",
+}
+
+# Utterances that probably carry personal data: digits, an email, or the caller introducing themselves
+PERSONAL_DATA = re.compile(
+    r"\d|@|\b(at|arroba)\b.*\b(dot|punto)\b|"
+    r"\b(my name|i am|i'm|this is|call me|me llamo|mi nombre|soy|habla)\b",
+    re.IGNORECASE
+)
+
+def normalize_utterance(text: str) -> str:
+    """Lowercase, accents and punctuation stripped, filler words and repeats dropped"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    words = [word for word in re.sub(r"[^\w\s]", " ", text).split() if word not in FILLER_WORDS]
+    return " ".join(word for i, word in enumerate(words) if i == 0 or word != words[i - 1])
+
+def has_personal_data(text: str) -> bool:
+    if PERSONAL_DATA.search(text):
+        return True
+    # Two spoken digits in a row is the start of a phone number
+    words = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    return any(a in NUMBER_WORDS and b in NUMBER_WORDS for a, b in zip(words, words[1:]))
+
+def cache_key(conversation: ConversationState) -> str | None:
+    """
+    Key for the caller's latest utterance, or None if this turn must go to the model
+
+    Call after the utterance was added to the conversation and before the reply is.
+    """
+    if not REPLY_CACHE_ENABLED or conversation.stage not in CACHEABLE_STAGES or conversation.summary:
+        return None
+    if not conversation.messages or conversation.messages[-1].role != "user":
+        return None
+
+    utterance = conversation.messages[-1].content
+    if len(utterance.split()) > REPLY_CACHE_MAX_WORDS or has_personal_data(utterance):
+        return None
+    normalized = normalize_utterance(utterance)
+    if not normalized:
+        return None
+
+    earlier = "\n".join(
+        f"{msg.role}:{normalize_utterance(msg.content)}" for msg in conversation.messages[:-1]
+    )
+    context = hashlib.sha1(earlier.encode()).hexdigest()[:16]
+    # Nova offers to use the caller-ID number when there is one, so those replies differ
+    caller_id = "cid" if conversation.caller_id else "-"
+    return f"{conversation.language}|{conversation.stage}|{caller_id}|{context}|{normalized}"
+
+def can_store(reply: str | None, fields: ExtractedFields, caller_id: str = None) -> bool:
+    """Whether a generated reply is safe to serve to other callers"""
+    if not reply or re.search(r"\d|@", reply):
+        return False
+    # The caller-ID number is in the prompt, so extraction echoing it back tells us nothing new
+    if caller_id and fields.phone == caller_id:
+        fields = fields.model_copy(update={"phone": None})
+    # Extraction found something about the caller, so the reply may mention it
+    return fields == ExtractedFields()
+
+class ReplyCache:
+    """LRU of replies with a fixed lifetime from when each was stored"""
+
+    def __init__(self, max_entries: int = 500, ttl_seconds: float = 3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str | None) -> str | None:
+        """Cached reply for key, recording the lookup (None key = bypassed)"""
+        if key is None:
+            CACHE_LOOKUPS.inc("replies", "bypass")
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self._entries[key]
+            CACHE_LOOKUPS.inc("replies", "miss")
+            return None
+        self._entries.move_to_end(key)
+        CACHE_LOOKUPS.inc("replies", "hit")
+        return entry[1]
+
+    def put(self, key: str | None, reply: str | None, fields: ExtractedFields, caller_id: str = None):
+        if key is None or not can_store(reply, fields, caller_id):
+            return
+        self._entries[key] = (self.clock() + self.ttl_seconds, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+reply_cache = ReplyCache(REPLY_CACHE_MAX_ENTRIES, REPLY_CACHE_TTL_SECONDS)
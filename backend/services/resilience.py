@@ -0,0 +1,226 @@
+"""
+Resilience Service - Circuit breakers, webhook deadlines and hedged reads for upstream calls
+
+Twilio gives a webhook about 15 seconds before it gives up on the call, so
+an upstream that is slow or down must fail fast instead of holding the
+caller. Three things make that happen:
+
+- A circuit breaker per upstream. After BREAKER_FAILURE_THRESHOLD failures
+  in a row, calls are refused immediately for BREAKER_RESET_SECONDS, then
+  one trial call decides whether the circuit closes again.
+- A deadline per webhook. Every upstream call made while answering Twilio
+  gets at most the time left before the webhook has to respond, whatever
+  its own timeout says.
+- Hedged reads. An idempotent request that hasn't answered after its hedge
+  delay gets a second copy sent, and the first answer wins.
+
+Background work (the job queue, the Notion and SMS senders) runs outside
+any webhook, so it gets the breakers but keeps its normal timeouts.
+"""
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+
+import httpx
+
+from config import BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS, TWILIO_WEBHOOK_TIMEOUT, DEADLINE_MARGIN_SECONDS
+from services.metrics import BREAKER_STATE, UPSTREAM_REJECTIONS, HEDGED_REQUESTS
+from services.call_log import call_log
+
+# Not worth starting a request with less time than this left
+MIN_ATTEMPT_SECONDS = 0.25
+
+# Webhooks answered within Twilio's timeout (everything else Twilio calls returns right away)
+DEADLINE_PATH_PREFIX = "/webhooks/voice/"
+
+class UpstreamUnavailable(Exception):
+    """An upstream call was refused or gave up - degrade instead of waiting"""
+
+class CircuitOpen(UpstreamUnavailable):
+    """The upstream failed repeatedly and is being skipped for now"""
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """The call didn't answer within its timeout or the webhook's remaining time"""
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open trial call -> closed or open again"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (in half-open, only one trial at a time)"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            print(f"{self.name} recovered, closing circuit")
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        BREAKER_STATE.set(self.name, value=0)
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                print(f"{self.name} failed {self.failures} times in a row, opening circuit for {self.reset_seconds}s")
+            self.opened_at = self.clock()
+            BREAKER_STATE.set(self.name, value=1)
+
+breakers: dict[str, CircuitBreaker] = {}
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    breaker = breakers.get(upstream)
+    if breaker is None:
+        breaker = breakers[upstream] = CircuitBreaker(upstream, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+    return breaker
+
+# Monotonic time by which the webhook being answered must respond, if any
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("nova_deadline", default=None)
+
+def time_left(timeout: float) -> float:
+    """The smaller of timeout and the time left before the current webhook must answer"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return timeout
+    return min(timeout, deadline - time.monotonic())
+
+@contextmanager
+def deadline_after(seconds: float):
+    """Upstream calls inside this block must finish within seconds from now"""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def detached(coroutine) -> asyncio.Task:
+    """Start background work that isn't bound by the current webhook's deadline"""
+    return asyncio.create_task(coroutine, context=contextvars.Context())
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each Twilio voice webhook a deadline inside Twilio's timeout"""
+
+    def __init__(self, app, budget_seconds: float = None):
+        self.app = app
+        self.budget_seconds = budget_seconds or TWILIO_WEBHOOK_TIMEOUT - DEADLINE_MARGIN_SECONDS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(DEADLINE_PATH_PREFIX):
+            return await self.app(scope, receive, send)
+        with deadline_after(self.budget_seconds):
+            await self.app(scope, receive, send)
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Errors that say the upstream is unhealthy (a 4xx, 429 included, means it's up and said no)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return True
+
+def admit(upstream: str, timeout: float) -> tuple[CircuitBreaker, float]:
+    """Breaker and time budget for a call, or UpstreamUnavailable if it shouldn't go out at all"""
+    budget = time_left(timeout)
+    if budget < MIN_ATTEMPT_SECONDS:
+        UPSTREAM_REJECTIONS.inc(upstream, "deadline")
+        raise DeadlineExceeded(f"{upstream}: no time left before the webhook must answer")
+    breaker = get_breaker(upstream)
+    if not breaker.allow():
+        UPSTREAM_REJECTIONS.inc(upstream, "circuit_open")
+        raise CircuitOpen(f"{upstream} is failing, skipping it for now")
+    return breaker, budget
+
+async def hedged(upstream: str, request, hedge_after: float):
+    """Run request(), and a second copy if the first hasn't answered after hedge_after seconds"""
+    first = asyncio.create_task(request())
+    second = None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        HEDGED_REQUESTS.inc(upstream, "sent")
+        second = asyncio.create_task(request())
+        pending = {first, second}
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        HEDGED_REQUESTS.inc(upstream, "won")
+                    return task.result()
+            if not pending:
+                # Both failed - report the original request's error
+                return first.result()
+    finally:
+        for task in (first, second):
+            if task is not None:
+                task.cancel()
+
+async def call_upstream(upstream: str, request, timeout: float, hedge_after: float = None):
+    """
+    Run request() (a coroutine function) against an upstream, behind its breaker and the webhook deadline
+
+    Raises CircuitOpen or DeadlineExceeded instead of waiting on an upstream
+    that can't answer in time. Errors from request() are re-raised as they are.
+    Only pass hedge_after for idempotent requests.
+    """
+    try:
+        breaker, budget = admit(upstream, timeout)
+    except UpstreamUnavailable:
+        call_log.record_upstream(upstream, 0, "skipped")
+        raise
+
+    start = time.monotonic()
+    outcome = "ok"
+    try:
+        if hedge_after and hedge_after < budget:
+            result = await asyncio.wait_for(hedged(upstream, request, hedge_after), budget)
+        else:
+            result = await asyncio.wait_for(request(), budget)
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        breaker.record_failure()
+        raise DeadlineExceeded(f"{upstream} didn't answer within {budget:.1f}s") from None
+    except asyncio.CancelledError:
+        # The caller went away - says nothing about the upstream's health
+        outcome = "cancelled"
+        breaker.trial_in_flight = False
+        raise
+    except Exception as e:
+        outcome = "error"
+        if is_upstream_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    finally:
+        call_log.record_upstream(upstream, time.monotonic() - start, outcome)
+
+    if isinstance(result, httpx.Response) and result.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return result
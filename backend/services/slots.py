@@ -0,0 +1,275 @@
+"""
+Slot Service - Works out which appointment slot the caller picked
+
+Parses spoken day and time phrases in English and Spanish ("Thursday at
+two", "el martes por la tarde", "the second one") and matches them against
+an index of the available slots by date, weekday and hour. When nothing
+matches, the nearest slots to what was asked for come back as alternatives
+to offer. Everything is local - no LLM call, no Cal.com round trip.
+"""
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+EASTERN = ZoneInfo("America/New_York")
+
+FOLD_ACCENTS = str.maketrans("áéíóúüñ", "aeiouun")
+
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+    "lunes": 0, "martes": 1, "miercoles": 2, "jueves": 3, "viernes": 4, "sabado": 5, "domingo": 6,
+}
+
+HOUR_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "noon": 12, "midday": 12,
+    "una": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5, "seis": 6, "siete": 7,
+    "ocho": 8, "nueve": 9, "diez": 10, "once": 11, "doce": 12, "mediodia": 12,
+}
+
+ORDINALS = {
+    "first": 0, "1st": 0, "primero": 0, "primera": 0, "primer": 0,
+    "second": 1, "2nd": 1, "segundo": 1, "segunda": 1,
+    "third": 2, "3rd": 2, "tercero": 2, "tercera": 2, "tercer": 2,
+    "last": -1, "ultimo": -1, "ultima": -1,
+}
+
+AFFIRMATIVE = frozenset("""
+    yes yeah yep sure ok okay works good great perfect fine
+    si claro perfecto vale bueno bien dale
+""".split())
+
+# A clause with one of these turns down whatever it mentions ("not Thursday", "none of those work")
+NEGATION = re.compile(
+    r"\b(?:no|not|none|never|neither|nor|nothing|cannot|ni|ninguno|ninguna|ningun|nunca|tampoco)\b|n't\b"
+)
+
+# Set phrases that sound negative but aren't turning anything down
+NOT_NEGATION = re.compile(r"\b(?:no problem|no worries|why not|no hay problema|sin problema|por que no)\b")
+
+# Where one clause ends and the next begins: "not Thursday, how about Friday", "el martes no, mejor el jueves"
+CLAUSE_BREAK = re.compile(r"[,.;!?]|\b(?:but|how about|what about|instead|rather|pero|mejor|que tal|y si)\b")
+
+# Part of day -> (first hour, last hour + 1, hour to aim for when suggesting alternatives)
+BUCKETS = {
+    "morning": (0, 12, 10),
+    "afternoon": (12, 17, 14),
+    "evening": (17, 24, 18),
+}
+
+BUCKET_PHRASES = [
+    (re.compile(r"\b(?:morning|(?:por|de|en) la manana)\b"), "morning"),
+    (re.compile(r"\b(?:afternoon|(?:por|de|en) la tarde)\b"), "afternoon"),
+    (re.compile(r"\b(?:evening|tonight|(?:por|de|en) la noche)\b"), "evening"),
+]
+
+# Digit times: "2", "2pm", "2:30", "14:00" (not part of a phone number, or an ordinal like "2nd")
+DIGIT_TIME = re.compile(r"(?<![\d:])(\d{1,2})(?::(\d{2}))?\s*(am|pm)?(?![\w:])")
+
+# Spoken times need a cue so "the first one" or "los dos" aren't read as hours
+WORD_TIME = re.compile(
+    r"\b(?:(?:at|a las|a la)\s+(?P<cued>" + "|".join(HOUR_WORDS) + r")|(?P<bare>" + "|".join(HOUR_WORDS) + r")"
+    r"(?=\s+(?:am|pm|o'?clock|thirty|fifteen|forty five|y media|y cuarto|de la)\b))"
+    r"(?:\s+(?P<minutes>thirty|fifteen|forty five|y media|y cuarto))?"
+)
+SPOKEN_MINUTES = {"thirty": 30, "y media": 30, "fifteen": 15, "y cuarto": 15, "forty five": 45}
+
+class SlotRequest:
+    """What the caller asked for - any part may be missing"""
+
+    def __init__(self):
+        self.day: date | None = None
+        self.weekday: int | None = None
+        self.hour: int | None = None
+        self.minute: int | None = None
+        self.bucket: str | None = None
+        self.ordinal: int | None = None
+        self.affirmative = False
+        self.negated = False  # The caller turned something down
+
+    def is_empty(self) -> bool:
+        return (self.day is None and self.weekday is None and self.hour is None
+                and self.bucket is None and self.ordinal is None)
+
+def fold(text: str) -> str:
+    text = text.lower().translate(FOLD_ACCENTS)
+    return re.sub(r"\b([ap])\.\s?m\.?", r"\1m", text)
+
+def normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s:']", " ", fold(text)).split())
+
+def is_negated(clause: str) -> bool:
+    return bool(NEGATION.search(NOT_NEGATION.sub(" ", clause)))
+
+def parse_slot_request(text: str, today: date) -> SlotRequest:
+    """Pull a day, time, part of day or "the second one" out of what the caller said"""
+    request = SlotRequest()
+    # Days, times and ordinals in a negated clause are ones the caller doesn't want
+    clauses = [normalize(clause) for clause in CLAUSE_BREAK.split(fold(text))]
+    request.negated = any(is_negated(clause) for clause in clauses)
+    text = " ".join(clause for clause in clauses if clause and not is_negated(clause))
+    words = text.split()
+
+    for pattern, bucket in BUCKET_PHRASES:
+        if pattern.search(text):
+            request.bucket = bucket
+            break
+
+    # Day: "pasado mañana", "tomorrow"/"mañana" (not "la mañana"), "today"/"hoy", weekday names
+    if "pasado manana" in text:
+        request.day = today + timedelta(days=2)
+    elif "tomorrow" in words or re.search(r"(?<!la )\bmanana\b", text):
+        request.day = today + timedelta(days=1)
+    elif "today" in words or "hoy" in words:
+        request.day = today
+    else:
+        for word in words:
+            if word in WEEKDAYS:
+                request.weekday = WEEKDAYS[word]
+                break
+
+    for word in words:
+        if word in ORDINALS:
+            request.ordinal = ORDINALS[word]
+            break
+
+    meridiem = None
+    match = WORD_TIME.search(text)
+    if match:
+        request.hour = HOUR_WORDS[match.group("cued") or match.group("bare")]
+        request.minute = SPOKEN_MINUTES.get(match.group("minutes"), 0)
+        following = text[match.end():].split()[:1]
+        meridiem = following[0] if following and following[0] in ("am", "pm") else None
+    else:
+        for match in DIGIT_TIME.finditer(text):
+            hour = int(match.group(1))
+            if hour > 23 or (hour > 12 and match.group(3)):
+                continue
+            request.hour = hour
+            request.minute = int(match.group(2) or 0)
+            meridiem = match.group(3)
+            break
+
+    if request.hour is not None and request.hour <= 12:
+        if meridiem == "pm" or (meridiem is None and request.bucket in ("afternoon", "evening")):
+            request.hour = request.hour % 12 + 12
+        elif meridiem == "am" or request.bucket == "morning":
+            request.hour = request.hour % 12
+        elif request.hour < 8:
+            # No am/pm given - "at two" during business hours means 2 PM
+            request.hour += 12
+
+    # "No good, sorry" or "none of them are fine" is never a yes
+    request.affirmative = not request.negated and any(word in AFFIRMATIVE for word in words)
+    return request
+
+def slot_local_time(slot: dict) -> datetime:
+    """A slot's start in Eastern Time, from its display date and time"""
+    return datetime.strptime(f"{slot['date']} {slot['time'].strip()}", "%Y-%m-%d %I:%M %p")
+
+class SlotIndex:
+    """Available slots indexed by date and weekday, in time order"""
+
+    def __init__(self, slots: list[dict]):
+        self.entries = sorted(((slot_local_time(slot), slot) for slot in slots), key=lambda entry: entry[0])
+        self.by_date: dict[date, list] = {}
+        self.by_weekday: dict[int, list] = {}
+        for entry in self.entries:
+            self.by_date.setdefault(entry[0].date(), []).append(entry)
+            self.by_weekday.setdefault(entry[0].weekday(), []).append(entry)
+
+    def candidates(self, request: SlotRequest) -> list[tuple[datetime, dict]]:
+        if request.day is not None:
+            pool = self.by_date.get(request.day, [])
+        elif request.weekday is not None:
+            pool = self.by_weekday.get(request.weekday, [])
+        else:
+            pool = self.entries
+
+        if request.hour is not None:
+            return [entry for entry in pool
+                    if entry[0].hour == request.hour and entry[0].minute == (request.minute or 0)]
+        if request.bucket is not None:
+            start, end, _ = BUCKETS[request.bucket]
+            return [entry for entry in pool if start <= entry[0].hour < end]
+        return pool
+
+    def nearest(self, request: SlotRequest, today: date, count: int = 3) -> list[dict]:
+        """Slots closest to what was asked for, in time order"""
+        target_day = request.day
+        if target_day is None and request.weekday is not None:
+            target_day = today + timedelta(days=(request.weekday - today.weekday()) % 7)
+
+        if request.hour is not None:
+            target_minutes = request.hour * 60 + (request.minute or 0)
+        elif request.bucket is not None:
+            target_minutes = BUCKETS[request.bucket][2] * 60
+        else:
+            target_minutes = None
+
+        def distance(entry) -> float:
+            start = entry[0]
+            if target_day is not None:
+                minutes = target_minutes if target_minutes is not None else 12 * 60
+                target = datetime.combine(target_day, datetime.min.time()) + timedelta(minutes=minutes)
+                return abs((start - target).total_seconds())
+            if target_minutes is not None:
+                # Same time on another day beats another time on the same day
+                return abs(start.hour * 60 + start.minute - target_minutes) * 86400 + start.timestamp() / 1e6
+            return start.timestamp()
+
+        closest = sorted(self.entries, key=distance)[:count]
+        return [slot for _, slot in sorted(closest, key=lambda entry: entry[0])]
+
+class SlotMatch:
+    """Result of matching a caller's pick: the slot, or alternatives to offer instead"""
+
+    def __init__(self, slot: dict = None, alternatives: list[dict] = None, unclear: bool = False):
+        self.slot = slot
+        self.alternatives = alternatives or []
+        self.unclear = unclear  # True when we couldn't tell which slot they meant at all
+
+@lru_cache(maxsize=16)
+def cached_index(key: tuple) -> SlotIndex:
+    return SlotIndex([{"date": slot_date, "time": slot_time, "datetime": utc} for slot_date, slot_time, utc in key])
+
+def index_slots(slots: list[dict]) -> SlotIndex:
+    """Index for a slot list, reused while the availability cache serves the same slots"""
+    return cached_index(tuple((slot["date"], slot["time"], slot["datetime"]) for slot in slots))
+
+def resolve_slot(text: str, slots: list[dict], offered: list[dict] = None, today: date = None) -> SlotMatch:
+    """Match what the caller said against the available slots (offered = what we read out, in order)"""
+    if not slots:
+        return SlotMatch()
+    today = today or datetime.now(EASTERN).date()
+    offered = [slot for slot in (offered or []) if slot in slots] or slots[:3]
+
+    request = parse_slot_request(text or "", today)
+
+    # "The second one" / "la última" refers to the order we read them out in
+    if request.ordinal is not None and request.hour is None and request.day is None and request.weekday is None:
+        if -len(offered) <= request.ordinal < len(offered):
+            return SlotMatch(offered[request.ordinal])
+        return SlotMatch(alternatives=offered, unclear=True)
+
+    # A plain "yes" / "sí, perfecto" accepts the first slot we offered
+    if request.is_empty():
+        if request.affirmative:
+            return SlotMatch(offered[0])
+        if request.negated:
+            # "None of those work" - offer the next slots instead of the same ones again
+            return SlotMatch(alternatives=[slot for slot in slots if slot not in offered][:3] or offered, unclear=True)
+        return SlotMatch(alternatives=offered, unclear=True)
+
+    index = index_slots(slots)
+    candidates = index.candidates(request)
+    if candidates:
+        # Prefer a slot we actually read out, then the earliest
+        offered_times = {slot["datetime"] for slot in offered}
+        for _, slot in candidates:
+            if slot["datetime"] in offered_times:
+                return SlotMatch(slot)
+        return SlotMatch(candidates[0][1])
+
+    return SlotMatch(alternatives=index.nearest(request, today))
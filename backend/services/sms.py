@@ -1,20 +1,131 @@
 """
 SMS Service - Sends text messages via Twilio
+
+Messages go through an async send queue that talks to the Twilio REST API
+over the shared HTTP pool, rate limited to the sending number's throughput
+(1 message/second for a standard long code). Delivery status callbacks
+from Twilio are tracked per message SID.
 """
-from twilio.rest import Client
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import time
+from collections import OrderedDict
+
+from config import (
+    TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, TWILIO_API_URL,
+    SMS_RATE_PER_SECOND, SMS_QUEUE_SIZE, PUBLIC_BASE_URL, TWILIO_TIMEOUT
+)
+from services.http_clients import get_client
+from services.resilience import call_upstream, detached
+from services.rate_limit import TokenBucket, parse_retry_after
+from services.metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS
+
+# How many message delivery statuses to remember
+MAX_TRACKED_MESSAGES = 10000
+
+class SmsSender:
+    """Rate-limited send queue in front of the Twilio Messages API"""
+
+    def __init__(self, rate_per_second: float = 1.0, queue_size: int = 1000,
+                 from_number: str = None, status_callback: str = None):
+        self.from_number = from_number
+        self.status_callback = status_callback
+        self.queue_size = queue_size
+        self.bucket = TokenBucket(rate_per_second)
+        self.delivery: OrderedDict[str, dict] = OrderedDict()
+        self._queue = None
+        self._consumer = None
+        self._in_flight: set[asyncio.Task] = set()
+
+    def _ensure_started(self):
+        if self._consumer is None or self._consumer.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            # Long-lived, so it must not inherit the deadline of whichever webhook started it
+            self._consumer = detached(self._consume())
+
+    async def _consume(self):
+        while True:
+            to_phone, body, result = await self._queue.get()
+            await self.bucket.acquire()
+            # Deliver in its own task so a slow request doesn't cut throughput below the rate
+            task = asyncio.create_task(self._deliver(to_phone, body, result))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _deliver(self, to_phone: str, body: str, result: asyncio.Future):
+        try:
+            outcome = await self._post_message(to_phone, body)
+        except Exception as e:
+            UPSTREAM_ERRORS.inc("twilio", "send_sms")
+            outcome = {"success": False, "error": str(e)}
+        # The sender may have given up waiting (e.g. its webhook's deadline passed)
+        if not result.done():
+            result.set_result(outcome)
+
+    async def _post_message(self, to_phone: str, body: str) -> dict:
+        url = f"{TWILIO_API_URL}/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json"
+        form = {"To": to_phone, "From": self.from_number, "Body": body}
+        if self.status_callback:
+            form["StatusCallback"] = self.status_callback
 
-from config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER
+        with UPSTREAM_SECONDS.time("twilio", "send_sms"):
+            response = await call_upstream(
+                "twilio",
+                lambda: get_client("twilio").post(url, data=form, auth=(TWILIO_ACCOUNT_SID or "", TWILIO_AUTH_TOKEN or "")),
+                TWILIO_TIMEOUT
+            )
+        if response.status_code >= 400:
+            UPSTREAM_ERRORS.inc("twilio", "send_sms")
+            error_detail = response.text
+            print(f"❌ SMS error {response.status_code}: {error_detail}")
+            if response.status_code == 429:
+                # Twilio queue overflow - back off before the next message
+                self.bucket.pause(parse_retry_after(response.headers.get("Retry-After")))
+            return {"success": False, "error": error_detail}
 
-# Initialize Twilio client
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        message = response.json()
+        self.track(message["sid"], message.get("status", "queued"), to=to_phone)
+        print(f"✅ SMS sent! SID: {message['sid']}")
+        return {"success": True, "sid": message["sid"]}
 
-def send_confirmation_sms(to_phone: str, name: str, appointment_time: str) -> bool:
+    async def send(self, to_phone: str, body: str) -> dict:
+        """Queue a message and wait until Twilio has accepted (or rejected) it"""
+        self._ensure_started()
+        result = asyncio.get_running_loop().create_future()
+        await self._queue.put((to_phone, body, result))
+        return await result
+
+    async def send_bulk(self, messages: list[tuple[str, str]]) -> list[dict]:
+        """Queue many (to_phone, body) messages, e.g. a reminder campaign"""
+        return await asyncio.gather(*(self.send(to_phone, body) for to_phone, body in messages))
+
+    def track(self, message_sid: str, status: str, to: str = None, error_code: str = None):
+        """Record the latest delivery status for a message"""
+        entry = self.delivery.pop(message_sid, {"to": to})
+        entry.update({"status": status, "error_code": error_code, "updated_at": time.time()})
+        self.delivery[message_sid] = entry
+        while len(self.delivery) > MAX_TRACKED_MESSAGES:
+            self.delivery.popitem(last=False)
+
+    async def stop(self):
+        """Stop taking messages and wait for in-flight sends (called on shutdown)"""
+        if self._consumer:
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            self._consumer = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+# The app's SMS sender
+sender = SmsSender(
+    rate_per_second=SMS_RATE_PER_SECOND,
+    queue_size=SMS_QUEUE_SIZE,
+    from_number=TWILIO_PHONE_NUMBER,
+    status_callback=f"{PUBLIC_BASE_URL.rstrip('/')}/webhooks/sms/status" if PUBLIC_BASE_URL else None
+)
+
+async def send_confirmation_sms(to_phone: str, name: str, appointment_time: str) -> bool:
     """Send appointment confirmation via SMS"""
-    try:
-        message_body = f"""Hi {name}! 
+    message_body = f"""Hi {name}!
 
 Your free consultation with Orbyn.ai is confirmed for {appointment_time}.
 
@@ -22,31 +133,25 @@ We'll call you at this number. Looking forward to speaking with you!
 
 - The Orbyn.ai Team"""
 
-        message = twilio_client.messages.create(
-            body=message_body,
-            from_=TWILIO_PHONE_NUMBER,
-            to=to_phone
-        )
-        
-        print(f"✅ SMS sent! SID: {message.sid}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ SMS error: {e}")
-        return False
-
-def send_simple_sms(to_phone: str, message: str) -> bool:
+    result = await sender.send(to_phone, message_body)
+    return result["success"]
+
+async def send_simple_sms(to_phone: str, message: str) -> bool:
     """Send a simple SMS message"""
-    try:
-        msg = twilio_client.messages.create(
-            body=message,
-            from_=TWILIO_PHONE_NUMBER,
-            to=to_phone
-        )
-        
-        print(f"✅ SMS sent! SID: {msg.sid}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ SMS error: {e}")
-        return False
+    result = await sender.send(to_phone, message)
+    return result["success"]
+
+async def send_bulk_sms(messages: list[tuple[str, str]]) -> list[dict]:
+    """Send many (to_phone, message) texts through the rate-limited queue"""
+    results = await sender.send_bulk(messages)
+    sent = sum(1 for result in results if result["success"])
+    print(f"Bulk SMS: {sent}/{len(results)} sent")
+    return results
+
+def record_delivery_status(message_sid: str, status: str, error_code: str = None):
+    """Store a delivery status update from Twilio's StatusCallback"""
+    sender.track(message_sid, status, error_code=error_code)
+
+def get_delivery_status(message_sid: str) -> dict | None:
+    """Latest known delivery status for a message"""
+    return sender.delivery.get(message_sid)
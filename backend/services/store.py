@@ -0,0 +1,199 @@
+"""
+Conversation Store - Keeps conversation state between webhooks
+
+Twilio posts every turn of a call as a separate webhook, and with several
+uvicorn workers those can land on any process. The store backends below
+share one interface so the rest of the app doesn't care where state lives:
+
+- MemoryConversationStore: per-process, LRU + TTL bounded (default)
+- SqliteConversationStore: shared by the workers on one host via a WAL-mode SQLite file
+- RedisConversationStore: shared across workers via any redis-compatible client
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from config import (
+    CONVERSATION_STORE, CONVERSATION_TTL_SECONDS, CONVERSATION_MAX_ACTIVE, CONVERSATION_DB_PATH, REDIS_URL
+)
+from models import ConversationState
+
+class ConversationStore(ABC):
+    """Interface every conversation store backend implements"""
+
+    @abstractmethod
+    async def get(self, call_sid: str) -> ConversationState | None:
+        """Return the stored conversation, or None if unknown or expired"""
+
+    @abstractmethod
+    async def save(self, conversation: ConversationState):
+        """Store the conversation and restart its TTL"""
+
+    @abstractmethod
+    async def delete(self, call_sid: str) -> bool:
+        """Forget the conversation; True if there was one to forget"""
+
+class MemoryConversationStore(ConversationStore):
+    """
+    In-process store with LRU + TTL eviction
+
+    Conversations whose /voice/status 'completed' never arrives expire after
+    ttl_seconds of inactivity, and the least recently used ones are dropped
+    once max_entries is reached, so memory stays bounded on long days.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, ConversationState]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _purge_expired(self, now: float):
+        # Entries are kept in last-touched order, so expired ones sit at the front
+        while self._entries:
+            call_sid, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[call_sid]
+
+    async def get(self, call_sid: str) -> ConversationState | None:
+        now = self.clock()
+        self._purge_expired(now)
+        entry = self._entries.get(call_sid)
+        if entry is None:
+            return None
+        self._entries[call_sid] = (now + self.ttl_seconds, entry[1])
+        self._entries.move_to_end(call_sid)
+        return entry[1]
+
+    async def save(self, conversation: ConversationState):
+        now = self.clock()
+        self._entries[conversation.call_sid] = (now + self.ttl_seconds, conversation)
+        self._entries.move_to_end(conversation.call_sid)
+        self._purge_expired(now)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            print(f"Conversation store full, evicted {evicted}")
+
+    async def delete(self, call_sid: str) -> bool:
+        return self._entries.pop(call_sid, None) is not None
+
+class SqliteConversationStore(ConversationStore):
+    """
+    Store in a SQLite file that every worker process on the host opens
+
+    For running several uvicorn workers on one machine without Redis.
+    State is stored as JSON with an expiry time; expired rows are skipped
+    on read and swept out every few hundred saves.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS conversations (
+        call_sid TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS conversations_expiry ON conversations (expires_at);
+    """
+
+    # Saves between sweeps of expired conversations
+    SWEEP_EVERY = 500
+
+    def __init__(self, db_path: str, ttl_seconds: float = 3600, clock=time.time):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._saves = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(self.SCHEMA)
+            self._db = db
+        return self._db
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._db_lock:
+            return self._connect().execute(sql, params)
+
+    async def _run_sql(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        # sqlite3 blocks, so keep it off the event loop
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def get(self, call_sid: str) -> ConversationState | None:
+        row = (await self._run_sql(
+            "SELECT state FROM conversations WHERE call_sid = ? AND expires_at > ?",
+            (call_sid, self.clock())
+        )).fetchone()
+        if row is None:
+            return None
+        return ConversationState.model_validate_json(row[0])
+
+    async def save(self, conversation: ConversationState):
+        now = self.clock()
+        await self._run_sql(
+            "INSERT OR REPLACE INTO conversations (call_sid, state, expires_at) VALUES (?, ?, ?)",
+            (conversation.call_sid, conversation.model_dump_json(), now + self.ttl_seconds)
+        )
+        self._saves += 1
+        if self._saves % self.SWEEP_EVERY == 0:
+            await self._run_sql("DELETE FROM conversations WHERE expires_at <= ?", (now,))
+
+    async def delete(self, call_sid: str) -> bool:
+        cursor = await self._run_sql("DELETE FROM conversations WHERE call_sid = ?", (call_sid,))
+        return cursor.rowcount > 0
+
+class RedisConversationStore(ConversationStore):
+    """
+    Shared store on top of a redis-compatible async client
+
+    Any client with async get/set(ex=)/delete works, e.g. redis.asyncio.Redis
+    or a local fake in tests. Redis handles the TTL; state is stored as JSON.
+    """
+
+    def __init__(self, redis, ttl_seconds: float = 3600, prefix: str = "nova:conversation:"):
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get(self, call_sid: str) -> ConversationState | None:
+        raw = await self.redis.get(self.prefix + call_sid)
+        if raw is None:
+            return None
+        return ConversationState.model_validate_json(raw)
+
+    async def save(self, conversation: ConversationState):
+        await self.redis.set(
+            self.prefix + conversation.call_sid,
+            conversation.model_dump_json(),
+            ex=int(self.ttl_seconds)
+        )
+
+    async def delete(self, call_sid: str) -> bool:
+        return bool(await self.redis.delete(self.prefix + call_sid))
+
+def create_conversation_store() -> ConversationStore:
+    """Build the store selected by CONVERSATION_STORE"""
+    if CONVERSATION_STORE == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CONVERSATION_STORE=redis needs the redis package: pip install redis")
+        print(f"Using Redis conversation store at {REDIS_URL}")
+        return RedisConversationStore(redis.from_url(REDIS_URL), ttl_seconds=CONVERSATION_TTL_SECONDS)
+
+    if CONVERSATION_STORE == "sqlite":
+        print(f"Using SQLite conversation store at {CONVERSATION_DB_PATH}")
+        return SqliteConversationStore(CONVERSATION_DB_PATH, ttl_seconds=CONVERSATION_TTL_SECONDS)
+
+    return MemoryConversationStore(max_entries=CONVERSATION_MAX_ACTIVE, ttl_seconds=CONVERSATION_TTL_SECONDS)
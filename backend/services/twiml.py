@@ -0,0 +1,135 @@
+"""
+TwiML Service - Renders Twilio voice responses from pre-built templates
+
+Voice, language code and canned phrases live in one profile per language.
+Documents that never change (the greeting, error replies) are rendered once
+at import; dynamic replies are spliced into pre-built tag strings, so no
+XML tree is built per request. Output matches twilio's VoiceResponse
+serializer byte for byte.
+"""
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from config import SPECULATIVE_REPLIES
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>'
+SPEECH_MODEL = "experimental_conversations"
+
+# Where Twilio posts partial transcripts while the caller is still talking
+PARTIAL_CALLBACK = "/webhooks/voice/partial" if SPECULATIVE_REPLIES else None
+
+# Speech hints for the first turn, before we know which language the caller speaks
+GREETING_HINTS = "hola, hello, buenos días, ayuda, help, español, spanish"
+
+class VoiceProfile:
+    """Voice, speech recognition language and canned phrases for one language"""
+
+    def __init__(self, language: str, lang_code: str, voice: str, still_there: str,
+                 callback: str, booking_confirmed: str, slot_unavailable: str, slot_unclear: str,
+                 slot_taken: str):
+        self.language = language
+        self.lang_code = lang_code
+        self.voice = voice
+        self.still_there = still_there
+        self.callback = callback
+        self.booking_confirmed = booking_confirmed
+        self.slot_unavailable = slot_unavailable
+        self.slot_unclear = slot_unclear
+        self.slot_taken = slot_taken
+        self.say_open = f'<Say voice="{voice}">'
+
+PROFILES = {
+    "en": VoiceProfile(
+        language="en",
+        lang_code="en-US",
+        voice="Google.en-US-Neural2-F",
+        still_there="Hello? You still there?",
+        callback="Hmm, I'm having a little tech issue. Let me have someone from the team call you back. Thanks!",
+        booking_confirmed="Perfect! You're all set for {date} at {time}. Just sent you a confirmation text. Talk to you soon!",
+        slot_unavailable="Hmm, I don't have that time open.",
+        slot_unclear="Sorry, I didn't catch which time you'd like.",
+        slot_taken="Ah, that time just got taken."
+    ),
+    "es": VoiceProfile(
+        language="es",
+        lang_code="es-MX",
+        voice="Google.es-US-Neural2-A",
+        still_there="¿Sigues ahí?",
+        callback="Hmm, tengo un problema técnico. Déjame que alguien del equipo te llame de vuelta. ¡Gracias!",
+        booking_confirmed="¡Perfecto! Te reservé para el {date} a las {time}. Te acabo de enviar un mensaje de confirmación. ¡Nos vemos pronto!",
+        slot_unavailable="Mmm, ese horario no lo tengo disponible.",
+        slot_unclear="Perdón, no entendí qué horario prefieres.",
+        slot_taken="Uy, ese horario se acaba de ocupar."
+    ),
+}
+
+def get_profile(language: str) -> VoiceProfile:
+    """Profile for a conversation language (English if we don't have one)"""
+    return PROFILES.get(language, PROFILES["en"])
+
+def document(*verbs: str) -> str:
+    return XML_HEADER + "<Response>" + "".join(verbs) + "</Response>"
+
+def say(text: str, profile: VoiceProfile) -> str:
+    return profile.say_open + escape(text) + "</Say>"
+
+def redirect(url: str) -> str:
+    return "<Redirect>" + escape(url) + "</Redirect>"
+
+@lru_cache(maxsize=None)
+def gather_open(action: str, lang_code: str, hints: str = None, partial_callback: str = None) -> str:
+    """Opening <Gather> tag for speech input (attributes sorted like twilio's serializer)"""
+    hints_attr = f' hints="{hints}"' if hints else ""
+    partial_attr = f' partialResultCallback="{partial_callback}"' if partial_callback else ""
+    return (f'<Gather action="{action}"{hints_attr} input="speech" language="{lang_code}"{partial_attr} '
+            f'speechModel="{SPEECH_MODEL}" speechTimeout="auto"')
+
+def gather(action: str, profile: VoiceProfile, text: str = "", hints: str = None,
+           partial_callback: str = None) -> str:
+    """Listen for speech, optionally saying something first"""
+    tag = gather_open(action, profile.lang_code, hints, partial_callback)
+    if not text:
+        return tag + " />"
+    return tag + ">" + say(text, profile) + "</Gather>"
+
+def listen(reply: str, profile: VoiceProfile) -> str:
+    """Say Nova's reply and wait for the caller's next turn"""
+    return document(
+        gather("/webhooks/voice/process", profile, reply, partial_callback=PARTIAL_CALLBACK),
+        say(profile.still_there, profile),
+        redirect("/webhooks/voice/process")
+    )
+
+def offer_slots(text: str, profile: VoiceProfile) -> str:
+    """Read out available slots and send the caller's pick to /voice/book"""
+    return document(gather("/webhooks/voice/book", profile, text))
+
+def speak_then_redirect(text: str, profile: VoiceProfile, url: str) -> str:
+    """Say something, then fetch the next instructions from url"""
+    return document(say(text, profile), redirect(url))
+
+def speak(text: str, profile: VoiceProfile) -> str:
+    """Say something and end the call's instructions"""
+    return document(say(text, profile))
+
+def booking_confirmed(profile: VoiceProfile, date: str, time: str) -> str:
+    return speak(profile.booking_confirmed.format(date=date, time=time), profile)
+
+# Static documents, rendered once
+GREETING = document(
+    gather(
+        "/webhooks/voice/process",
+        PROFILES["en"],
+        "Hey there! This is Nova from Orbyn AI. How can I help you today?",
+        hints=GREETING_HINTS,
+        partial_callback=PARTIAL_CALLBACK
+    ),
+    say("I didn't hear anything. Please call back when you're ready. Goodbye!", PROFILES["en"])
+)
+INCOMING_ERROR = speak("Sorry, there was an error. Please try again later.", PROFILES["en"])
+DIDNT_CATCH = speak_then_redirect(
+    "Sorry, I didn't catch that. Could you say that again?", PROFILES["en"], "/webhooks/voice/incoming"
+)
+TECH_ISSUE = speak("Oops, I'm having a little tech issue. Let me have someone call you back. Thanks!", PROFILES["en"])
+BOOKING_ERROR = speak("Oops, having a tech issue. Let me have someone call you back. Thanks!", PROFILES["en"])
+CALLBACK = {language: speak(profile.callback, profile) for language, profile in PROFILES.items()}
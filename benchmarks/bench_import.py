@@ -0,0 +1,86 @@
+"""
+Import-Time Benchmark - How long a fresh worker takes to import the app
+
+Runs `python -X importtime -c "import main"` in new processes (the work
+every uvicorn worker does before it can answer a webhook), reports the
+median total and the slowest top-level packages, and fails if:
+
+- the median is over the budget (--budget-ms), or
+- a module that should load lazily (openai, uvicorn, dotenv) is imported at startup
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --runs 9 --budget-ms 1200
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, "backend")
+
+# Only needed once a call comes in (openai), when launching from the CLI (uvicorn),
+# or when there is a .env file (dotenv)
+DEFERRED_MODULES = ("openai", "uvicorn", "dotenv")
+
+DEFAULT_BUDGET_MS = 1500
+
+def import_once() -> tuple[float, dict[str, int], set[str]]:
+    """Import main in a fresh interpreter: (total ms, self µs per top-level package, modules loaded)"""
+    env = os.environ.copy()
+    env.setdefault("OPENAI_API_KEY", "sk-import-bench")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    )
+
+    total_us = 0
+    by_package: dict[str, int] = {}
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        loaded.add(name)
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + int(self_us)
+        if name == "main":
+            total_us = int(cumulative_us)
+    return total_us / 1000, by_package, loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long importing the Nova app takes")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Fail if the median is above this")
+    parser.add_argument("--top", type=int, default=12, help="Packages to list")
+    args = parser.parse_args()
+
+    runs = [import_once() for _ in range(args.runs)]
+    totals = [total for total, _, _ in runs]
+    median = statistics.median(totals)
+    _, by_package, loaded = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+    print(f"import main: median {median:.0f} ms over {args.runs} runs (min {min(totals):.0f}, max {max(totals):.0f})")
+    print(f"\n{'package':<28}{'self ms':>10}")
+    print("-" * 38)
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<28}{self_us / 1000:>10.1f}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    eager = [name for name in DEFERRED_MODULES if name in loaded]
+    if eager:
+        failures.append(f"imported at startup but should load lazily: {', '.join(eager)}")
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"OK: within the {args.budget_ms:.0f} ms budget, {', '.join(DEFERRED_MODULES)} deferred")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Language Detection Benchmark - Throughput and accuracy of the caller language detector
+
+Compares the tokenized detector in services/language.py with the original
+substring scan on a mix of English and Spanish phone utterances.
+
+    python benchmarks/bench_language.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from services.language import detect_language
+
+# (utterance, expected language)
+UTTERANCES = [
+    ("Hi, I need some help with AI automation for my business", "en"),
+    ("My name is Jose Garcia and my number is 555 010 1234", "en"),
+    ("Sounds great, let's book a consultation for Tuesday", "en"),
+    ("Yes please, the first one works", "en"),
+    ("I'm calling about the chatbot, does it speak Spanish?", "en"),
+    ("Hola, necesito ayuda con mi negocio", "es"),
+    ("Me llamo María y mi número es 555 010 1234", "es"),
+    ("Sí, el martes a las diez está perfecto", "es"),
+    ("Quisiera una cita para mañana por la tarde", "es"),
+    ("Buenos días, ¿habla español?", "es"),
+    ("Si", "es"),
+    ("Okay", "en"),
+]
+
+def substring_detector(text: str) -> str:
+    """The original detector: substring scan over a word list"""
+    spanish_indicators = [
+        'hola', 'buenos', 'días', 'tardes', 'noches', 'gracias', 'por favor',
+        'sí', 'necesito', 'quiero', 'busco', 'ayuda', 'información',
+        'habla', 'español', 'puedo', 'estoy', 'tengo'
+    ]
+    text_lower = text.lower()
+    spanish_word_count = sum(1 for word in spanish_indicators if word in text_lower)
+    return 'es' if spanish_word_count >= 2 else 'en'
+
+def run(name: str, detector, iterations: int):
+    correct = sum(1 for text, expected in UTTERANCES if detector(text) == expected)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text, _expected in UTTERANCES:
+            detector(text)
+    elapsed = time.perf_counter() - start
+
+    calls = iterations * len(UTTERANCES)
+    print(f"{name:<12}{calls / elapsed:>14,.0f}{elapsed / calls * 1e6:>12.2f}{correct:>8}/{len(UTTERANCES)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark caller language detection")
+    parser.add_argument("--iterations", type=int, default=20000, help="Passes over the utterance set")
+    args = parser.parse_args()
+
+    print(f"{'detector':<12}{'utterances/s':>14}{'us each':>12}{'correct':>11}")
+    run("substring", substring_detector, args.iterations)
+    run("tokenized", detect_language, args.iterations)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Worker Scaling Benchmark - Call throughput as production workers are added
+
+Starts the fake upstreams once, then for each worker count starts Nova in
+production mode (python main.py --production --workers N, conversations
+shared through the SQLite store) and drives the same simulated calls as
+load_test.py through it. Upstream latency defaults low so the run measures
+Nova's own CPU work, which is what extra workers add capacity for.
+
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --workers 1,2,4,8 --calls 600 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_upstreams import upstream_env
+from load_test import ROOT, BACKEND, run_load, start_process, wait_until_up
+
+def default_worker_counts() -> list[int]:
+    """1, 2, 4 ... up to the number of CPU cores"""
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+async def measure(workers: int, fake_url: str, port: int, calls: int, concurrency: int) -> dict:
+    data_dir = tempfile.mkdtemp()
+    env = os.environ.copy()
+    env.update(upstream_env(fake_url))
+    env.update({
+        "OPENAI_API_KEY": "sk-load-test",
+        "TWILIO_ACCOUNT_SID": "ACloadtest",
+        "TWILIO_AUTH_TOKEN": "load-test",
+        "TWILIO_PHONE_NUMBER": "+15555550000",
+        "CONVERSATION_STORE": "sqlite",
+        "CONVERSATION_DB_PATH": os.path.join(data_dir, "conversations.db"),
+        "JOBS_DB_PATH": os.path.join(data_dir, "jobs.db"),
+        # Keep the benchmark's calls out of the real call log
+        "CALL_LOG_DB_PATH": os.path.join(data_dir, "calls.db"),
+        "SMS_RATE_PER_SECOND": "1000",
+        "NOTION_RATE_PER_SECOND": "1000",
+    })
+    server = start_process(
+        [sys.executable, "main.py", "--production", "--workers", str(workers), "--port", str(port)],
+        env=env, cwd=BACKEND
+    )
+    try:
+        target = f"http://127.0.0.1:{port}"
+        await wait_until_up(f"{target}/health")
+        # Warm every worker's pools and caches before timing
+        await run_load(target, calls=workers * 4, concurrency=workers * 4)
+        return await run_load(target, calls, concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure Nova call throughput per number of production workers")
+    parser.add_argument("--workers", help="Comma-separated worker counts (default 1, 2, 4 ... CPU cores)")
+    parser.add_argument("--calls", type=int, default=400, help="Simulated calls per worker count")
+    parser.add_argument("--concurrency", type=int, default=200, help="Calls in flight at once")
+    parser.add_argument("--latency", default="openai=0.05,calcom=0.02,notion=0.02,crm=0.02,twilio=0.02",
+                        help="Fake upstream latency")
+    parser.add_argument("--port", type=int, default=8800, help="Port for the Nova server")
+    parser.add_argument("--fake-port", type=int, default=9100, help="Port for the fake upstreams")
+    args = parser.parse_args()
+
+    worker_counts = [int(n) for n in args.workers.split(",")] if args.workers else default_worker_counts()
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    fake = start_process(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "fake_upstreams.py"),
+         "--port", str(args.fake_port), "--latency", args.latency],
+        env=os.environ.copy(), cwd=ROOT
+    )
+    try:
+        await wait_until_up(f"{fake_url}/stats")
+        print(f"{os.cpu_count()} CPU cores, {args.calls} calls per run, {args.concurrency} concurrent")
+
+        rows = []
+        for workers in worker_counts:
+            result = await measure(workers, fake_url, args.port, args.calls, args.concurrency)
+            completed = result["calls"] - result["errors"]
+            rows.append((workers, completed, completed / result["elapsed"]))
+            print(f"  {workers} workers: {completed / result['elapsed']:.1f} calls/s ({result['errors']} errors)")
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    baseline = rows[0][2]
+    print("\n" + "=" * 48)
+    print(f"{'workers':>8}{'calls':>10}{'calls/s':>12}{'speedup':>12}")
+    print("-" * 48)
+    for workers, completed, rate in rows:
+        print(f"{workers:>8}{completed:>10}{rate:>12.1f}{rate / baseline:>11.2f}x")
+    print("=" * 48)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,239 @@
+"""
+Fake Upstreams - Local stand-ins for OpenAI, Cal.com, Notion, the CRM and Twilio
+
+Serves every upstream Nova talks to from one local app, each behind its
+own path prefix and with configurable latency, so the webhook flow can be
+load tested without touching (or paying for) the real services.
+
+Run standalone:
+    python benchmarks/fake_upstreams.py --port 9100 --latency openai=0.6,calcom=0.2
+
+--notion-rate-limit 3 makes the Notion fake answer 429 with Retry-After
+above 3 requests per second, like the real API.
+
+Then point Nova at it:
+    OPENAI_BASE_URL=http://127.0.0.1:9100/openai/v1
+    CAL_API_V2_URL=http://127.0.0.1:9100/cal/v2
+    NOTION_API_URL=http://127.0.0.1:9100/notion/v1
+    CRM_BACKEND_URL=http://127.0.0.1:9100/crm
+    TWILIO_API_URL=http://127.0.0.1:9100/twilio
+"""
+import argparse
+import asyncio
+import json
+import math
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+# Default simulated latency per upstream (seconds)
+DEFAULT_LATENCY = {
+    "openai": 0.5,
+    "calcom": 0.2,
+    "notion": 0.3,
+    "crm": 0.2,
+    "twilio": 0.15,
+}
+
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s-]{6,}\d")
+NAME_PATTERN = re.compile(r"(?:my name is|i'm|me llamo)\s+([A-Za-z]+(?:\s[A-Za-z]+)?)", re.IGNORECASE)
+
+def upstream_env(base_url: str) -> dict:
+    """Environment variables that point Nova at a running fake upstreams server"""
+    return {
+        "OPENAI_BASE_URL": f"{base_url}/openai/v1",
+        "CAL_API_V2_URL": f"{base_url}/cal/v2",
+        "NOTION_API_URL": f"{base_url}/notion/v1",
+        "CRM_BACKEND_URL": f"{base_url}/crm",
+        "TWILIO_API_URL": f"{base_url}/twilio",
+    }
+
+def parse_latency(spec: str) -> dict:
+    """Parse 'openai=0.6,calcom=0.2' into a latency table"""
+    latency = dict(DEFAULT_LATENCY)
+    for part in filter(None, (spec or "").split(",")):
+        name, seconds = part.split("=")
+        latency[name.strip()] = float(seconds)
+    return latency
+
+class SlidingWindowLimit:
+    """At most `per_second` requests in any one-second window"""
+
+    def __init__(self, per_second: float):
+        self.per_second = per_second
+        self.recent: list[float] = []
+
+    def retry_after(self) -> float | None:
+        """None if the request is allowed, otherwise seconds until it would be"""
+        now = time.monotonic()
+        self.recent = [at for at in self.recent if now - at < 1.0]
+        if len(self.recent) >= self.per_second:
+            return 1.0 - (now - self.recent[0])
+        self.recent.append(now)
+        return None
+
+def fake_extraction(messages: list[dict]) -> dict:
+    """Pull name, phone and booking intent out of the transcript like the real extraction call would"""
+    transcript = " ".join(m["content"] or "" for m in messages if m["role"] == "user")
+    name = NAME_PATTERN.search(transcript)
+    phone = PHONE_PATTERN.search(transcript)
+    return {
+        "name": name.group(1) if name else None,
+        "phone": re.sub(r"[^\d+]", "", phone.group(0)) if phone else None,
+        "email": None,
+        "service": "AI automation" if "automation" in transcript.lower() else None,
+        "ready_to_book": "book" in transcript.lower(),
+    }
+
+def completion(message: dict, model: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 200, "completion_tokens": 20, "total_tokens": 220},
+    }
+
+def create_app(latency: dict, notion_rate_limit: float = None) -> FastAPI:
+    app = FastAPI(title="Nova fake upstreams")
+    counts = {name: 0 for name in DEFAULT_LATENCY}
+    notion_limit = SlidingWindowLimit(notion_rate_limit) if notion_rate_limit else None
+
+    def notion_throttled() -> JSONResponse | None:
+        retry_after = notion_limit.retry_after() if notion_limit else None
+        if retry_after is None:
+            return None
+        counts["notion_rate_limited"] = counts.get("notion_rate_limited", 0) + 1
+        return JSONResponse(
+            {"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"},
+            status_code=429,
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+    async def delay(upstream: str):
+        counts[upstream] = counts.get(upstream, 0) + 1
+        await asyncio.sleep(latency.get(upstream, 0))
+
+    @app.get("/stats")
+    async def stats():
+        return counts
+
+    # OpenAI
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "gpt-4")
+
+        if body.get("tools"):
+            await delay("openai")
+            arguments = json.dumps(fake_extraction(body["messages"]))
+            return completion({
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {"name": "record_call_data", "arguments": arguments}
+                }]
+            }, model)
+
+        reply = "Got it, thanks for sharing that. What else can I help with?"
+        if not body.get("stream"):
+            await delay("openai")
+            return completion({"role": "assistant", "content": reply}, model)
+
+        async def stream():
+            # Time to first token is most of the latency; the rest trickles in
+            await delay("openai")
+            for word in reply.split(" "):
+                chunk = {
+                    "id": "chatcmpl-stream",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0.01)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    # Cal.com
+
+    @app.get("/cal/v2/slots/available")
+    async def slots_available():
+        await delay("calcom")
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        slots = {}
+        for day in range(3):
+            date = (start + timedelta(days=day)).date().isoformat()
+            slots[date] = [
+                {"time": (start + timedelta(days=day, hours=hour)).strftime("%Y-%m-%dT%H:00:00.000Z")}
+                for hour in (0, 2, 4)
+            ]
+        return {"status": "success", "data": {"slots": slots}}
+
+    @app.post("/cal/v2/bookings")
+    async def create_booking(request: Request):
+        body = await request.json()
+        await delay("calcom")
+        booking_id = uuid.uuid4().int % 10_000_000
+        return {"status": "success", "data": {"id": booking_id, "start": body.get("start"), "url": f"https://cal.example/{booking_id}"}}
+
+    # Notion
+
+    @app.post("/notion/v1/pages")
+    async def create_page():
+        throttled = notion_throttled()
+        if throttled:
+            return throttled
+        await delay("notion")
+        page_id = str(uuid.uuid4())
+        return {"object": "page", "id": page_id, "url": f"https://notion.example/{page_id}"}
+
+    @app.patch("/notion/v1/pages/{page_id}")
+    async def update_page(page_id: str):
+        throttled = notion_throttled()
+        if throttled:
+            return throttled
+        await delay("notion")
+        return {"object": "page", "id": page_id, "url": f"https://notion.example/{page_id}"}
+
+    # CRM backend
+
+    @app.post("/crm/public/submit-contact")
+    async def submit_contact():
+        await delay("crm")
+        return {"success": True, "id": uuid.uuid4().hex}
+
+    # Twilio
+
+    @app.post("/twilio/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def create_message():
+        await delay("twilio")
+        return {"sid": "SM" + uuid.uuid4().hex, "status": "queued"}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake OpenAI, Cal.com, Notion, CRM and Twilio APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="", help="Per-upstream latency, e.g. openai=0.6,calcom=0.2")
+    parser.add_argument("--notion-rate-limit", type=float, help="Answer 429 above this many Notion requests per second")
+    args = parser.parse_args()
+
+    latency = parse_latency(args.latency)
+    print(f"Fake upstreams on http://{args.host}:{args.port} with latency {latency}")
+    uvicorn.run(create_app(latency, args.notion_rate_limit), host=args.host, port=args.port, log_level="warning", backlog=4096)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Load Test - Drives concurrent simulated calls through the Nova webhooks
+
+Starts the fake upstreams and a Nova server pointed at them (or targets a
+server you already started with --target), then runs many concurrent
+CallSid flows through:
+
+    /voice/incoming -> /voice/process (x3) -> /voice/book -> /voice/status
+
+and reports p50/p95/p99 webhook latency per route and completed calls/second.
+
+    python benchmarks/load_test.py --calls 300 --concurrency 100
+    python benchmarks/load_test.py --latency openai=1.0 --server-args "--workers 4"
+
+(With several workers, set CONVERSATION_STORE=sqlite or redis so calls are shared.)
+"""
+import argparse
+import asyncio
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_upstreams import upstream_env
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, "backend")
+
+# What each simulated caller says, in order
+SCRIPT = [
+    "Hi, I need some help with AI automation for my business",
+    "My name is Load Tester and my number is 555 010 1234",
+    "Sounds great, let's book a consultation",
+]
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+async def post(client: httpx.AsyncClient, timings: dict, route: str, data: dict) -> str:
+    start = time.perf_counter()
+    response = await client.post(f"/webhooks{route}", data=data)
+    timings.setdefault(route, []).append(time.perf_counter() - start)
+    response.raise_for_status()
+    return response.text
+
+async def simulate_call(client: httpx.AsyncClient, timings: dict, index: int):
+    call_sid = f"CALOAD{index:08d}"
+    caller = f"+1555{index:07d}"[:12]
+
+    await post(client, timings, "/voice/incoming", {"CallSid": call_sid})
+    for utterance in SCRIPT:
+        twiml = await post(client, timings, "/voice/process", {"CallSid": call_sid, "SpeechResult": utterance, "From": caller})
+        # Streaming mode speaks the first sentence and redirects for the rest
+        if "/webhooks/voice/continue" in twiml:
+            await post(client, timings, "/voice/continue", {"CallSid": call_sid})
+    await post(client, timings, "/voice/book", {"CallSid": call_sid, "SpeechResult": "The first one works"})
+    await post(client, timings, "/voice/status", {"CallSid": call_sid, "CallStatus": "completed"})
+
+async def run_load(target: str, calls: int, concurrency: int) -> dict:
+    timings: dict[str, list[float]] = {}
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=60.0) as client:
+        async def one(index: int):
+            nonlocal errors
+            async with semaphore:
+                try:
+                    await simulate_call(client, timings, index)
+                except Exception as e:
+                    errors += 1
+                    print(f"Call {index} failed: {e!r}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(calls)))
+        elapsed = time.perf_counter() - start
+
+    return {"timings": timings, "errors": errors, "elapsed": elapsed, "calls": calls}
+
+def print_report(result: dict):
+    print("\n" + "=" * 72)
+    print(f"{'route':<18}{'requests':>10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    print("-" * 72)
+    all_timings = []
+    for route, values in result["timings"].items():
+        all_timings.extend(values)
+        print(f"{route:<18}{len(values):>10}"
+              f"{percentile(values, 50) * 1000:>12.1f}"
+              f"{percentile(values, 95) * 1000:>12.1f}"
+              f"{percentile(values, 99) * 1000:>12.1f}")
+    if all_timings:
+        print("-" * 72)
+        print(f"{'all webhooks':<18}{len(all_timings):>10}"
+              f"{percentile(all_timings, 50) * 1000:>12.1f}"
+              f"{percentile(all_timings, 95) * 1000:>12.1f}"
+              f"{percentile(all_timings, 99) * 1000:>12.1f}")
+    completed = result["calls"] - result["errors"]
+    print("=" * 72)
+    print(f"{completed}/{result['calls']} calls completed in {result['elapsed']:.2f}s "
+          f"-> {completed / result['elapsed']:.1f} calls/s, "
+          f"{len(all_timings) / result['elapsed']:.1f} webhooks/s")
+
+def start_process(args: list[str], env: dict, cwd: str) -> subprocess.Popen:
+    return subprocess.Popen(args, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the Nova webhook flow against local fake upstreams")
+    parser.add_argument("--calls", type=int, default=200, help="Simulated calls to run")
+    parser.add_argument("--concurrency", type=int, default=100, help="Calls in flight at once")
+    parser.add_argument("--latency", default="", help="Fake upstream latency, e.g. openai=0.6,calcom=0.2")
+    parser.add_argument("--target", help="Nova base URL to hit instead of starting a server")
+    parser.add_argument("--port", type=int, default=8800, help="Port for the Nova server this script starts")
+    parser.add_argument("--fake-port", type=int, default=9100, help="Port for the fake upstreams")
+    parser.add_argument("--server-args", default="", help="Extra arguments for the Nova server command")
+    args = parser.parse_args()
+
+    processes = []
+    try:
+        fake_url = f"http://127.0.0.1:{args.fake_port}"
+        target = args.target
+        if not target:
+            processes.append(start_process(
+                [sys.executable, os.path.join(ROOT, "benchmarks", "fake_upstreams.py"),
+                 "--port", str(args.fake_port), "--latency", args.latency],
+                env=os.environ.copy(), cwd=ROOT
+            ))
+            await wait_until_up(f"{fake_url}/stats")
+
+            data_dir = tempfile.mkdtemp()
+            env = os.environ.copy()
+            env.update(upstream_env(fake_url))
+            env.update({
+                "OPENAI_API_KEY": "sk-load-test",
+                "TWILIO_ACCOUNT_SID": "ACloadtest",
+                "TWILIO_AUTH_TOKEN": "load-test",
+                "TWILIO_PHONE_NUMBER": "+15555550000",
+                "CONVERSATION_DB_PATH": os.path.join(data_dir, "load_conversations.db"),
+                "JOBS_DB_PATH": os.path.join(data_dir, "load_jobs.db"),
+                # Keep the load generator's calls out of the real call log
+                "CALL_LOG_DB_PATH": os.path.join(data_dir, "load_calls.db"),
+                "SMS_RATE_PER_SECOND": "1000",
+            })
+            target = f"http://127.0.0.1:{args.port}"
+            processes.append(start_process(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+                 "--log-level", "warning", "--backlog", "4096", *shlex.split(args.server_args)],
+                env=env, cwd=BACKEND
+            ))
+            await wait_until_up(f"{target}/health")
+
+        print(f"Running {args.calls} calls ({args.concurrency} concurrent) against {target}")
+        result = await run_load(target, args.calls, args.concurrency)
+        print_report(result)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""
+Test the call event log: buffered writes, upstream timings and the query helpers (no real APIs)
+"""
+import asyncio
+import sys
+import os
+import tempfile
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from services.call_log import CallLog, call_log, bind_call, open_readonly, read_events, list_calls, call_stats
+from services.resilience import call_upstream
+
+def test_events_are_buffered_until_flushed():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "calls.db")
+            log = CallLog(path, flush_seconds=60)
+            await log.start()
+            log.record("CA_LOG_1", "call_started", from_number="+15550101234")
+            log.record(None, "turn", user="hi")  # not tied to a call - ignored
+
+            db = open_readonly(path)
+            assert read_events(db, "CA_LOG_1") == []  # recording never touches disk
+            await log.flush()
+            events = read_events(db, "CA_LOG_1")
+            assert [event["kind"] for event in events] == ["call_started"]
+            assert events[0]["from_number"] == "+15550101234"
+            await log.stop()
+
+    asyncio.run(run())
+
+def test_full_buffer_drops_instead_of_growing():
+    log = CallLog(":memory:", max_buffered=3)
+    for i in range(5):
+        log.record("CA_LOG_2", "turn", user=str(i))
+    assert len(log._buffer) == 3
+
+def test_upstream_calls_land_on_the_current_call():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "calls.db")
+            original, call_log.db_path = call_log.db_path, path
+
+            async def answer():
+                return "ok"
+
+            try:
+                bind_call("CA_LOG_3")
+                await call_upstream("test-logged", answer, timeout=5)
+                await call_log.stop()
+            finally:
+                call_log.db_path = original
+                if call_log._db is not None:
+                    call_log._db.close()
+                    call_log._db = None
+
+            events = read_events(open_readonly(path), "CA_LOG_3")
+            assert [(event["kind"], event["upstream"], event["result"]) for event in events] == [
+                ("upstream", "test-logged", "ok")
+            ]
+
+    asyncio.run(run())
+
+def test_call_lifecycle_is_logged_once():
+    async def run():
+        from routes import webhooks
+
+        start = len(call_log._buffer)
+        for _ in range(2):  # greeting, then a "didn't catch that" redirect back
+            await webhooks.handle_incoming_call(CallSid="CA_LOG_4", From="+15550101234")
+        await webhooks.call_status(CallSid="CA_LOG_4", CallStatus="no-answer")
+
+        events = [(kind, data) for call_sid, _, kind, data in call_log._buffer[start:] if call_sid == "CA_LOG_4"]
+        assert events == [
+            ("call_started", {"from_number": "+15550101234"}),
+            ("call_ended", {"call_status": "no-answer"}),
+        ]
+
+    asyncio.run(run())
+
+def test_queries():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "calls.db")
+            log = CallLog(path)
+            log.record("CA_A", "call_started", from_number=None)
+            log.record("CA_A", "turn", user="hello", reply="Hi! How can I help?", source="cache")
+            log.record("CA_A", "turn", user="book me in", reply="Sure", source="model")
+            log.record("CA_A", "upstream", upstream="calcom", ms=120.0, result="ok")
+            log.record("CA_A", "outcome", status="booked", call_data={"name": "Ana"})
+            log.record("CA_A", "call_ended", call_status="completed")
+            log.record("CA_B", "call_started", from_number=None)
+            log.record("CA_B", "upstream", upstream="calcom", ms=900.0, result="timeout")
+            log.record("CA_B", "call_ended", call_status="completed")
+            log.record("CA_C", "call_started", from_number=None)
+            await log.stop()
+
+            db = open_readonly(path)
+            calls = {call["call_sid"]: call for call in list_calls(db)}
+            assert calls["CA_A"]["turns"] == 2 and calls["CA_A"]["outcome"] == "booked"
+            assert calls["CA_B"]["outcome"] == "no_booking"  # hung up before any outcome
+            assert calls["CA_C"]["outcome"] == "in_progress"
+
+            stats = call_stats(db)
+            assert stats["calls"] == 3 and stats["turns"] == 2
+            assert stats["outcomes"] == {"booked": 1, "no_booking": 1, "in_progress": 1}
+            assert stats["reply_sources"] == {"cache": 1, "model": 1}
+            assert stats["upstreams"]["calcom"] == {"requests": 2, "failures": 1, "p50_ms": 900.0, "p95_ms": 900.0}
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_events_are_buffered_until_flushed()
+    test_full_buffer_drops_instead_of_growing()
+    test_upstream_calls_land_on_the_current_call()
+    test_call_lifecycle_is_logged_once()
+    test_queries()
+    print("✅ Call log tests passed")
@@ -0,0 +1,114 @@
+"""
+Test the prompt budget: folding old turns into the summary, the context note and JSON tail stripping (no real APIs)
+"""
+import sys
+import os
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from config import CONTEXT_SUMMARY_MAX_CHARS
+from models import CallData, ConversationState, Message
+from services.context import compact_history, context_note, estimate_tokens, strip_json_tail
+
+def call_with(turns: int, words: int = 20) -> ConversationState:
+    """A call with `turns` alternating messages of about `words` words each"""
+    messages = [
+        Message(role="user" if i % 2 == 0 else "assistant", content=f"turn{i} " + "word " * words)
+        for i in range(turns)
+    ]
+    return ConversationState(call_sid="CA_CONTEXT", messages=messages)
+
+def history_tokens(conversation: ConversationState) -> int:
+    return sum(estimate_tokens(message.content) for message in conversation.messages)
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 4
+    assert estimate_tokens("x" * 400) == 104
+    assert estimate_tokens("a longer message") > estimate_tokens("short")
+
+def test_strip_json_tail():
+    assert strip_json_tail('Sure, Thursday works. {"name": "Ana", "ready_to_book": true}') == "Sure, Thursday works."
+    assert strip_json_tail('Done!\n{"name": null}\n') == "Done!"
+    assert strip_json_tail("No JSON here.") == "No JSON here."
+    # Only a trailing block goes; braces mid-reply stay
+    assert strip_json_tail("Use {braces} like this, okay?") == "Use {braces} like this, okay?"
+
+def test_short_call_is_left_alone():
+    conversation = call_with(4)
+    before = list(conversation.messages)
+    compact_history(conversation, budget=600)
+    assert conversation.messages == before
+    assert conversation.summary == ""
+
+def test_oldest_turns_fold_until_within_budget():
+    conversation = call_with(12)
+    budget = 200
+    assert history_tokens(conversation) > budget
+
+    compact_history(conversation, budget=budget, keep_recent=2)
+    assert history_tokens(conversation) <= budget
+    # The oldest ones went, and no more than needed to get under the budget
+    first_kept = int(conversation.messages[0].content.split()[0][4:])
+    last_folded = call_with(first_kept).messages[-1]
+    assert history_tokens(conversation) + estimate_tokens(last_folded.content) > budget
+    assert conversation.messages[-1].content.startswith("turn11 ")
+    assert [line.split()[1] for line in conversation.summary.splitlines()] == [f"turn{i}" for i in range(first_kept)]
+    assert conversation.summary.splitlines()[0].startswith("Caller: turn0")
+    assert conversation.summary.splitlines()[1].startswith("Nova: turn1")
+
+def test_recent_turns_are_kept_even_over_budget():
+    conversation = call_with(10, words=200)
+    compact_history(conversation, budget=10, keep_recent=6)
+    assert len(conversation.messages) == 6
+    assert conversation.messages[0].content.startswith("turn4 ")
+    assert len(conversation.summary.splitlines()) == 4
+
+def test_summary_snippets_and_cap():
+    conversation = call_with(2)
+    conversation.messages[1].content = "Got it! " + "very " * 60 + '{"service": "chatbot"}'
+    compact_history(conversation, budget=0, keep_recent=0)
+    nova = conversation.summary.splitlines()[1]
+    assert nova.startswith("Nova: Got it!") and nova.endswith("...")
+    assert "service" not in nova
+
+    # Folding more keeps the summary capped, dropping its oldest lines
+    for i in range(20):
+        conversation.messages = [Message(role="user", content=f"round{i} " + "word " * 40)]
+        compact_history(conversation, budget=0, keep_recent=0)
+    assert len(conversation.summary) <= CONTEXT_SUMMARY_MAX_CHARS
+    assert "Got it!" not in conversation.summary
+    assert conversation.summary.splitlines()[-1].startswith("Caller: round19 ")
+
+def test_context_note():
+    conversation = call_with(0)
+    assert context_note(conversation) == ""
+
+    conversation.summary = "Caller: hi"
+    conversation.call_data = CallData(name="Ana", service="chatbot")
+    note = context_note(conversation)
+    assert note.startswith("Earlier in this call:\nCaller: hi")
+    assert "Already collected - name: Ana, service: chatbot. Don't ask for these again." in note
+
+    # A phone taken from caller ID is confirmed rather than treated as collected
+    conversation.caller_id = "+15555550100"
+    conversation.call_data.phone = "+15555550100"
+    note = context_note(conversation)
+    assert "phone" not in note.split("\n\n")[1]
+    assert "calling from +15555550100" in note
+
+    conversation.call_data.phone = "+15555550199"
+    assert "phone: +15555550199" in context_note(conversation)
+
+if __name__ == "__main__":
+    test_estimate_tokens()
+    test_strip_json_tail()
+    test_short_call_is_left_alone()
+    test_oldest_turns_fold_until_within_budget()
+    test_recent_turns_are_kept_even_over_budget()
+    test_summary_snippets_and_cap()
+    test_context_note()
+    print("✅ Context tests passed")
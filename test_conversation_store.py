@@ -0,0 +1,173 @@
+"""
+Test the conversation store backends (no external services needed)
+"""
+import asyncio
+import sys
+import os
+import tempfile
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from services.store import ConversationStore, MemoryConversationStore, RedisConversationStore, SqliteConversationStore
+from services.holds import SqliteSlotHolds
+from models import ConversationState, Message
+
+class FakeRedis:
+    """Minimal stand-in for redis.asyncio.Redis (get/set with ex/delete)"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.expiry[key] = ex
+
+    async def delete(self, key):
+        self.expiry.pop(key, None)
+        return int(self.data.pop(key, None) is not None)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_memory_store_expires_idle_conversations():
+    async def run():
+        clock = FakeClock()
+        store = MemoryConversationStore(max_entries=10, ttl_seconds=60, clock=clock)
+        await store.save(ConversationState(call_sid="CA1"))
+
+        clock.now = 30
+        assert await store.get("CA1") is not None  # Touching it restarts the TTL
+
+        clock.now = 80
+        assert await store.get("CA1") is not None
+
+        clock.now = 200
+        assert await store.get("CA1") is None
+        assert len(store) == 0
+
+    asyncio.run(run())
+
+def test_memory_store_evicts_least_recently_used():
+    async def run():
+        store = MemoryConversationStore(max_entries=2, ttl_seconds=60, clock=FakeClock())
+        await store.save(ConversationState(call_sid="CA1"))
+        await store.save(ConversationState(call_sid="CA2"))
+        await store.get("CA1")
+        await store.save(ConversationState(call_sid="CA3"))
+
+        assert await store.get("CA2") is None
+        assert await store.get("CA1") is not None
+        assert await store.get("CA3") is not None
+        assert await store.delete("CA3") and not await store.delete("CA3")
+
+    asyncio.run(run())
+
+def test_redis_store_shares_state_between_workers():
+    async def run():
+        redis = FakeRedis()
+        worker_a = RedisConversationStore(redis, ttl_seconds=120)
+        worker_b = RedisConversationStore(redis, ttl_seconds=120)
+
+        conversation = ConversationState(call_sid="CA1", language="es")
+        conversation.messages.append(Message(role="user", content="hola"))
+        conversation.call_data.name = "Ana"
+        await worker_a.save(conversation)
+
+        loaded = await worker_b.get("CA1")
+        assert loaded.language == "es"
+        assert loaded.call_data.name == "Ana"
+        assert loaded.messages[0].content == "hola"
+        assert redis.expiry["nova:conversation:CA1"] == 120
+
+        assert await worker_b.delete("CA1")
+        assert await worker_a.get("CA1") is None
+        assert not await worker_a.delete("CA1")  # only one worker gets to end the call
+
+    asyncio.run(run())
+
+def test_sqlite_store_shares_state_between_workers():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "conversations.db")
+            now = [1000.0]
+            worker_a = SqliteConversationStore(db_path, ttl_seconds=120, clock=lambda: now[0])
+            worker_b = SqliteConversationStore(db_path, ttl_seconds=120, clock=lambda: now[0])
+
+            conversation = ConversationState(call_sid="CA1", language="es")
+            conversation.call_data.name = "Ana"
+            await worker_a.save(conversation)
+            assert (await worker_b.get("CA1")).call_data.name == "Ana"
+            assert await worker_b.delete("CA1") and not await worker_a.delete("CA1")
+            await worker_a.save(conversation)
+
+            now[0] += 121
+            assert await worker_b.get("CA1") is None
+
+            # Slot holds in the same file: the first worker to ask wins
+            holds_a = SqliteSlotHolds(db_path, ttl_seconds=60, clock=lambda: now[0])
+            holds_b = SqliteSlotHolds(db_path, ttl_seconds=60, clock=lambda: now[0])
+            assert await holds_a.acquire("2026-10-19T14:00:00Z", "CA1")
+            assert not await holds_b.acquire("2026-10-19T14:00:00Z", "CA2")
+            assert await holds_b.holder("2026-10-19T14:00:00Z") == "CA1"
+            now[0] += 61
+            assert await holds_b.acquire("2026-10-19T14:00:00Z", "CA2")
+
+    asyncio.run(run())
+
+def test_backends_must_implement_the_whole_interface():
+    class GetOnlyStore(ConversationStore):
+        async def get(self, call_sid):
+            return None
+
+    try:
+        GetOnlyStore()
+        assert False, "expected TypeError"
+    except TypeError as e:
+        assert "save" in str(e) and "delete" in str(e)
+
+def test_redis_store_against_a_server():
+    """Runs against a real Redis when REDIS_TEST_URL is set (e.g. redis://localhost:6379/15)"""
+    url = os.getenv("REDIS_TEST_URL")
+    if not url:
+        print("REDIS_TEST_URL not set, skipping the live Redis check")
+        return
+
+    async def run():
+        import redis.asyncio as redis
+
+        client = redis.from_url(url)
+        store = RedisConversationStore(client, ttl_seconds=30, prefix="nova:test:conversation:")
+        try:
+            conversation = ConversationState(call_sid="CA_REDIS", language="es")
+            conversation.call_data.name = "Ana"
+            await store.save(conversation)
+            loaded = await store.get("CA_REDIS")
+            assert loaded.language == "es" and loaded.call_data.name == "Ana"
+            assert 0 < await client.ttl("nova:test:conversation:CA_REDIS") <= 30
+            await store.delete("CA_REDIS")
+            assert await store.get("CA_REDIS") is None
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_memory_store_expires_idle_conversations()
+    test_memory_store_evicts_least_recently_used()
+    test_redis_store_shares_state_between_workers()
+    test_sqlite_store_shares_state_between_workers()
+    test_backends_must_implement_the_whole_interface()
+    test_redis_store_against_a_server()
+    print("✅ Conversation store tests passed")
@@ -0,0 +1,109 @@
+"""
+Test the forced function-call extraction and how its fields land on the call data (OpenAI is faked)
+"""
+import asyncio
+import json
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from models import CallData, ConversationState, ExtractedFields, Message
+from services import conversation, extraction
+from services.extraction import apply_extracted
+from services.llm import LLMTimeout
+
+def state(utterance: str = "my name is Ana and I need a chatbot") -> ConversationState:
+    return ConversationState(call_sid="CA_EXTRACT", messages=[Message(role="user", content=utterance)])
+
+def tool_response(*arguments: str):
+    calls = [SimpleNamespace(function=SimpleNamespace(arguments=text)) for text in arguments]
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=calls or None))],
+        usage=SimpleNamespace(prompt_tokens=50, completion_tokens=5)
+    )
+
+def extract_with(*responses) -> tuple[ExtractedFields, list[dict]]:
+    """Run extract_call_data against canned answers (an exception is raised instead of returned)"""
+    requests = []
+
+    async def create_completion(**kwargs):
+        requests.append(kwargs)
+        response = responses[len(requests) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def run():
+        original = extraction.create_completion
+        extraction.create_completion = create_completion
+        try:
+            return await extraction.extract_call_data(state())
+        finally:
+            extraction.create_completion = original
+
+    return asyncio.run(run()), requests
+
+def test_forced_tool_call_is_parsed():
+    arguments = json.dumps({"name": "Ana", "phone": None, "service": "chatbot", "ready_to_book": True})
+    fields, requests = extract_with(tool_response(arguments))
+    assert fields == ExtractedFields(name="Ana", service="chatbot", ready_to_book=True)
+    assert requests[0]["tool_choice"] == {"type": "function", "function": {"name": "record_call_data"}}
+    assert requests[0]["tools"][0]["function"]["parameters"]["properties"].keys() >= {"name", "phone", "email"}
+
+def test_bad_answers_yield_empty_fields():
+    assert extract_with(tool_response())[0] == ExtractedFields()  # no tool call
+    assert extract_with(tool_response("not json"), tool_response("{\"ready_to_book\": \"maybe\"}"))[0] == ExtractedFields()
+    assert extract_with(LLMTimeout("slow"))[0] == ExtractedFields()
+    assert extract_with(RuntimeError("boom"))[0] == ExtractedFields()
+
+def test_apply_only_fills_what_was_found():
+    conversation_state = state()
+    conversation_state.call_data = CallData(name="Ana", phone="5550100")
+    data = apply_extracted(conversation_state, ExtractedFields(email="ana@example.com"))
+    assert conversation_state.call_data.name == "Ana" and conversation_state.call_data.phone == "5550100"
+    assert conversation_state.call_data.email == "ana@example.com"
+    assert data["email"] == "ana@example.com" and data["ready_to_book"] is False
+
+def test_timeout_reply_does_not_wait_for_extraction():
+    async def run():
+        async def create_completion(**kwargs):
+            raise LLMTimeout("reply too slow")
+
+        async def extract_call_data(state):
+            await asyncio.sleep(0.5)  # still queued behind other calls
+            return ExtractedFields(service="chatbot", ready_to_book=True)
+
+        originals = conversation.create_completion, conversation.extract_call_data
+        conversation.create_completion, conversation.extract_call_data = create_completion, extract_call_data
+        try:
+            start = time.monotonic()
+            reply, pending = await conversation.stream_response("CA_EXTRACT_SLOW", "I want to book")
+            assert time.monotonic() - start < 0.3
+            assert reply == conversation.TIMEOUT_REPLIES["en"]
+
+            # /voice/continue gets the extraction once it's in
+            rest, extracted_data = await pending
+            assert rest == "" and extracted_data["ready_to_book"] is True
+            state = await conversation.get_conversation("CA_EXTRACT_SLOW")
+            assert state.call_data.service == "chatbot"
+            assert state.messages[-1].content == reply
+        finally:
+            conversation.create_completion, conversation.extract_call_data = originals
+            await conversation.end_conversation("CA_EXTRACT_SLOW")
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_forced_tool_call_is_parsed()
+    test_bad_answers_yield_empty_fields()
+    test_apply_only_fills_what_was_found()
+    test_timeout_reply_does_not_wait_for_extraction()
+    print("✅ Extraction tests passed")
@@ -0,0 +1,101 @@
+"""
+Test the fast-path phone, email and name extractors and caller-ID seeding (OpenAI is faked)
+"""
+import asyncio
+import sys
+import os
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from models import CallData, ExtractedFields
+from services import conversation
+from services.context import context_note
+from services.extractors import extract_phone, extract_email, extract_name, extract_local, caller_id_phone
+
+def test_spoken_phone_numbers():
+    assert extract_phone("it's five five five, oh one oh, double two three four") == "5550102234"
+    assert extract_phone("es el cinco cinco cinco cero uno cero uno dos tres cuatro") == "5550101234"
+    assert extract_phone("call me at +1 (555) 010-1234 please") == "+15550101234"
+    assert extract_phone("oh, I have two kids and one dog") is None
+    assert extract_phone("we have 12 people") is None
+    assert extract_phone("we serve about 1000000000 customers") is None
+    assert extract_phone("order 123456789012 shipped") is None
+
+def test_spelled_emails():
+    assert extract_email("it's j o h n at gmail dot com") == "john@gmail.com"
+    assert extract_email("ana punto diaz arroba hotmail punto es") == "ana.diaz@hotmail.es"
+    assert extract_email("Email me at Ana.Diaz@Example.com.") == "ana.diaz@example.com"
+    assert extract_email("I'm at home right now") is None
+
+def test_names():
+    assert extract_name("My name is ana lopez and I need help") == "Ana Lopez"
+    assert extract_name("Hi, this is Maria from Acme") == "Maria"
+    assert extract_name("me llamo Carlos") == "Carlos"
+    assert extract_name("this is urgent") is None
+    assert extract_name("I'm looking for help") is None
+    assert extract_name("can you call me back") is None
+    assert extract_name("I am Good thanks") is None
+    assert extract_name("This is Orbyn, right?") is None
+
+def test_weak_guesses_dont_overwrite_known_details():
+    known = CallData(name="Maria", phone="+15550101234")
+    assert extract_local("This is Ana speaking", known).name is None
+    assert extract_local("Actually my name is Ana", known).name == "Ana"
+    assert extract_local("This is Ana speaking").name == "Ana"  # nothing known yet
+
+    assert extract_local("we have 5550199887 widgets in stock", known).phone is None
+    assert extract_local("my cell is five five five oh one nine nine eight eight seven", known).phone == "5550199887"
+    assert extract_local("it's five five five oh one nine nine eight eight seven").phone == "5550199887"
+
+def test_caller_id():
+    assert caller_id_phone("+15550101234") == "+15550101234"
+    assert caller_id_phone("anonymous") is None
+    assert caller_id_phone("client:bob") is None
+
+def test_details_filled_before_the_model_answers():
+    async def run():
+        seen = []
+
+        async def complete_reply(messages, tier=None):
+            seen.append(messages)
+            return "Got it!"
+
+        async def extract_call_data(state):
+            return ExtractedFields()  # Model missed everything - local extraction still counts
+
+        originals = conversation.complete_reply, conversation.extract_call_data
+        conversation.complete_reply, conversation.extract_call_data = complete_reply, extract_call_data
+        try:
+            await conversation.generate_response("CA_LOCAL_1", "Hi, this is Maria", caller_id="+15550101234")
+            state = await conversation.get_conversation("CA_LOCAL_1")
+            assert state.call_data.name == "Maria"
+            assert state.call_data.phone == "+15550101234"
+            # The prompt already knew both when the reply was generated
+            note = seen[0][1]["content"]
+            assert "name: Maria" in note and "calling from +15550101234" in note
+            assert "confirm" in context_note(state).lower()
+            assert conversation.current_stage(state) == "collecting"
+
+            await conversation.generate_response("CA_LOCAL_1", "better use five five five oh one nine nine eight eight seven")
+            state = await conversation.get_conversation("CA_LOCAL_1")
+            assert state.call_data.phone == "5550199887"
+            assert "calling from" not in context_note(state)
+        finally:
+            conversation.complete_reply, conversation.extract_call_data = originals
+            await conversation.end_conversation("CA_LOCAL_1")
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_spoken_phone_numbers()
+    test_spelled_emails()
+    test_names()
+    test_weak_guesses_dont_overwrite_known_details()
+    test_caller_id()
+    test_details_filled_before_the_model_answers()
+    print("✅ Extractor tests passed")
@@ -0,0 +1,86 @@
+"""
+Test the SQLite-backed job queue (no external services needed)
+"""
+import asyncio
+import sys
+import os
+import tempfile
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from services.jobs import JobQueue
+
+def make_queue(db_path: str) -> JobQueue:
+    return JobQueue(db_path, workers=2, max_attempts=3, retry_base_seconds=0.05, poll_seconds=0.05)
+
+def test_failed_jobs_retry_until_they_succeed():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = make_queue(os.path.join(tmp, "jobs.db"))
+            calls = []
+
+            @queue.handler("flaky")
+            async def flaky(payload):
+                calls.append(payload["n"])
+                if len(calls) < 3:
+                    raise RuntimeError("upstream down")
+
+            await queue.start()
+            await queue.enqueue("flaky", {"n": 1}, "CA1:flaky")
+            for _ in range(50):
+                if (await queue.counts()).get("done"):
+                    break
+                await asyncio.sleep(0.05)
+            await queue.stop()
+
+            assert calls == [1, 1, 1]
+            assert await queue.counts() == {"done": 1}
+
+    asyncio.run(run())
+
+def test_duplicate_idempotency_keys_run_once():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = make_queue(os.path.join(tmp, "jobs.db"))
+            calls = []
+
+            @queue.handler("lead")
+            async def lead(payload):
+                calls.append(payload)
+
+            assert await queue.enqueue("lead", {"status": "booked"}, "CA1:lead")
+            assert not await queue.enqueue("lead", {"status": "booked"}, "CA1:lead")
+            while await queue.run_next():
+                pass
+
+            assert calls == [{"status": "booked"}]
+
+    asyncio.run(run())
+
+def test_pending_jobs_survive_a_restart():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "jobs.db")
+            await make_queue(db_path).enqueue("sms", {"to": "+15555550100"}, "CA1:sms")
+
+            restarted = make_queue(db_path)
+            sent = []
+
+            @restarted.handler("sms")
+            async def sms(payload):
+                sent.append(payload["to"])
+
+            assert await restarted.run_next()
+            assert sent == ["+15555550100"]
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_failed_jobs_retry_until_they_succeed()
+    test_duplicate_idempotency_keys_run_once()
+    test_pending_jobs_survive_a_restart()
+    print("✅ Job queue tests passed")
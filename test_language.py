@@ -0,0 +1,49 @@
+"""
+Test caller language detection and per-call language stickiness
+"""
+import sys
+import os
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from models import ConversationState, Message
+from services.language import score_language, detect_language, update_language
+
+def test_detects_whole_words_only():
+    assert detect_language("Hola, necesito ayuda con mi negocio") == "es"
+    assert detect_language("Buenos días, ¿habla español?") == "es"
+    assert detect_language("Hi, I need some help with AI automation for my business") == "en"
+    # The old substring scan matched "sí" inside "así" and "habla" inside "hablando"
+    assert detect_language("I was hablando with Asís about the website") == "en"
+
+    language, confidence = score_language("Okay")
+    assert language == "en" and 0 < confidence < 1
+    assert score_language("") == ("en", 0.0)
+
+def test_language_is_sticky_per_call():
+    conversation = ConversationState(call_sid="CA_LANGUAGE")
+
+    # First confident utterance sets the language
+    update_language(conversation, "Hola, necesito ayuda")
+    conversation.messages.append(Message(role="user", content="Hola, necesito ayuda"))
+    assert conversation.language == "es"
+
+    # One English-leaning turn (a name and a number) doesn't flip it...
+    update_language(conversation, "My name is Ana, thanks")
+    assert conversation.language == "es"
+    # ...a Spanish turn resets the streak...
+    update_language(conversation, "Sí, el martes")
+    assert conversation.language_streak == 0
+    # ...and sustained English does
+    update_language(conversation, "Yes the first one is good")
+    update_language(conversation, "Can you send me the details by email")
+    assert conversation.language == "en"
+
+if __name__ == "__main__":
+    test_detects_whole_words_only()
+    test_language_is_sticky_per_call()
+    print("✅ Language detection tests passed")
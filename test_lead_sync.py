@@ -0,0 +1,144 @@
+"""
+Test that repeated reports of a call become one Notion page plus patches (local stubs, no real API calls)
+"""
+import asyncio
+import sys
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+from fastapi import FastAPI, Request
+
+from models import CallData
+from services import http_clients, crm, notion, leads, followups
+from services.jobs import JobQueue
+
+def make_upstream_stub(received: list) -> FastAPI:
+    """Stand-in for Notion's pages API and the CRM's submit-contact endpoint"""
+    stub = FastAPI()
+
+    @stub.post("/v1/pages")
+    async def create_page(request: Request):
+        received.append(("create", await request.json()))
+        return {"id": "page-1", "url": "https://notion.so/page-1"}
+
+    @stub.patch("/v1/pages/{page_id}")
+    async def update_page(page_id: str, request: Request):
+        received.append(("update", await request.json()))
+        return {"id": page_id}
+
+    @stub.post("/public/submit-contact")
+    async def submit_contact(request: Request):
+        received.append(("crm", await request.json()))
+        return {"ok": True}
+
+    return stub
+
+@contextmanager
+def use_stub(stub: FastAPI, db_path: str):
+    """Point Notion, the CRM and the lead jobs at the stub and a scratch database, then put them back"""
+    originals = (
+        dict(http_clients.clients), notion.NOTION_API_URL, crm.CRM_BACKEND_URL,
+        leads.ledger, followups.ledger, followups.queue
+    )
+    http_clients.clients["notion"] = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    http_clients.clients["crm"] = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    notion.NOTION_API_URL = "http://notion.test/v1"
+    crm.CRM_BACKEND_URL = "http://crm.test"
+    queue = JobQueue(db_path, retry_base_seconds=0.01)
+    queue.handlers = followups.queue.handlers
+    leads.ledger = followups.ledger = leads.LeadLedger(db_path)
+    followups.queue = queue
+    try:
+        yield queue
+    finally:
+        clients, notion.NOTION_API_URL, crm.CRM_BACKEND_URL, leads.ledger, followups.ledger, followups.queue = originals
+        http_clients.clients.clear()
+        http_clients.clients.update(clients)
+
+async def report_call(queue: JobQueue):
+    """The book webhook (twice), the status webhook, then a booking made later in the call"""
+    async def drain():
+        while await queue.run_next():
+            pass
+
+    callback = CallData(name="Ana", phone="+15555550100", service="chatbot", status="needs_callback")
+    await followups.enqueue_lead(callback, "CA1")
+    # Twilio retries the book webhook
+    await followups.enqueue_lead(callback.model_copy(), "CA1")
+    await drain()
+
+    # The status webhook after the conversation ended knows nothing new
+    await followups.enqueue_lead(CallData(status="no_booking"), "CA1")
+    await drain()
+
+    booked = callback.model_copy(update={"status": "booked", "appointment_time": "Thursday at 2 PM"})
+    await followups.enqueue_lead(booked, "CA1")
+    await drain()
+
+def test_repeated_events_create_once_then_patch():
+    async def run():
+        received = []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with use_stub(make_upstream_stub(received), os.path.join(tmp, "jobs.db")) as queue:
+                await report_call(queue)
+
+        assert [kind for kind, _ in received] == ["create", "crm", "update", "crm"]
+        created = received[0][1]["properties"]
+        assert created["Name"]["title"][0]["text"]["content"] == "Ana"
+        assert created["status"]["select"]["name"] == "needs_callback"
+        # Only what changed is patched
+        patched = received[2][1]["properties"]
+        assert set(patched) == {"status", "notes"}
+        assert patched["status"]["select"]["name"] == "booked"
+        assert "Appointment: Thursday at 2 PM" in patched["notes"]["rich_text"][0]["text"]["content"]
+        # The CRM hears about the booking too
+        assert received[1][1]["status"] == "needs_callback"
+        assert received[3][1]["status"] == "booked" and received[3][1]["appointment_time"] == "Thursday at 2 PM"
+
+    asyncio.run(run())
+
+def test_crm_is_pushed_again_only_when_its_fields_change():
+    async def run():
+        received = []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "jobs.db")
+            # A ledger written before CRM pushes were versioned
+            db = sqlite3.connect(db_path)
+            db.execute("CREATE TABLE leads (call_sid TEXT PRIMARY KEY, call_data TEXT NOT NULL, notion_page_id TEXT, "
+                       "notion_written TEXT, notion_claimed_at REAL, crm_pushed_at REAL, updated_at REAL NOT NULL)")
+            db.close()
+
+            with use_stub(make_upstream_stub(received), db_path):
+                await followups.enqueue_lead(CallData(name="Ana", status="needs_callback"), "CA2")
+                await leads.sync_crm_contact("CA2")
+                await leads.sync_crm_contact("CA2")  # a retried job
+                assert [kind for kind, _ in received] == ["crm"]
+
+                await followups.enqueue_lead(CallData(email="ana@example.com"), "CA2")
+                await leads.sync_crm_contact("CA2")
+                assert [kind for kind, _ in received] == ["crm", "crm"]
+                assert received[1][1]["email"] == "ana@example.com"
+
+    asyncio.run(run())
+
+def test_later_reports_never_erase_earlier_details():
+    booked = CallData(name="Ana", email="ana@example.com", status="booked", appointment_time="Thursday at 2 PM")
+    merged = leads.merge_call_data(booked, CallData(status="no_booking"))
+    assert merged == booked
+
+if __name__ == "__main__":
+    test_repeated_events_create_once_then_patch()
+    test_crm_is_pushed_again_only_when_its_fields_change()
+    test_later_reports_never_erase_earlier_details()
+    print("✅ Lead sync tests passed")
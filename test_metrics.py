@@ -0,0 +1,109 @@
+"""
+Test the metrics registry and the Prometheus text output
+"""
+import asyncio
+import sys
+import os
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from services.metrics import Counter, Histogram, MetricsMiddleware, REQUEST_SECONDS, CALLS_IN_FLIGHT, render_metrics
+from services.conversation import find_conversation
+from routes import webhooks
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_latency_seconds", "Test latency", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "llm")
+    histogram.observe(0.5, "llm")
+    histogram.observe(5.0, "llm")
+
+    lines = histogram.render()
+    assert 'test_latency_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="llm",le="1.0"} 2' in lines
+    assert 'test_latency_seconds_bucket{stage="llm",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{stage="llm"} 3' in lines
+
+    with histogram.time("twiml"):
+        pass
+    assert histogram.series[("twiml",)][2] == 1
+
+    counter = Counter("test_fallbacks_total", "Test fallbacks", ("kind",))
+    counter.inc("llm_timeout")
+    counter.inc("llm_timeout")
+    assert 'test_fallbacks_total{kind="llm_timeout"} 2' in render_metrics()
+
+def test_middleware_times_known_routes_only():
+    async def app(scope, receive, send):
+        pass
+
+    async def run():
+        middleware = MetricsMiddleware(app, routes={"/health"})
+        await middleware({"type": "http", "path": "/health"}, None, None)
+        await middleware({"type": "http", "path": "/wp-login.php"}, None, None)
+
+    before_health = REQUEST_SECONDS.series.get(("/health",), [None, 0, 0])[2]
+    before_other = REQUEST_SECONDS.series.get(("other",), [None, 0, 0])[2]
+    asyncio.run(run())
+    assert REQUEST_SECONDS.series[("/health",)][2] == before_health + 1
+    assert REQUEST_SECONDS.series[("other",)][2] == before_other + 1
+    assert ("/wp-login.php",) not in REQUEST_SECONDS.series
+
+def test_calls_in_flight_counts_each_call_once():
+    async def run():
+        before = CALLS_IN_FLIGHT.get()
+        # The greeting plus two "didn't catch that" redirects back to /voice/incoming
+        for _ in range(3):
+            await webhooks.handle_incoming_call(CallSid="CA_GAUGE", From="+15550101234")
+        assert CALLS_IN_FLIGHT.get() == before + 1
+
+        # Calls that end without "completed" come off the gauge too
+        await webhooks.call_status(CallSid="CA_GAUGE", CallStatus="in-progress")
+        assert CALLS_IN_FLIGHT.get() == before + 1
+        await webhooks.call_status(CallSid="CA_GAUGE", CallStatus="canceled")
+        assert CALLS_IN_FLIGHT.get() == before
+        assert await find_conversation("CA_GAUGE") is None
+
+        # Twilio retries the callback, and calls that never reached /voice end here too
+        await webhooks.call_status(CallSid="CA_GAUGE", CallStatus="canceled")
+        await webhooks.call_status(CallSid="CA_GAUGE_NEVER_ANSWERED", CallStatus="no-answer")
+        assert CALLS_IN_FLIGHT.get() == before
+
+    asyncio.run(run())
+
+def test_booked_call_is_counted_out_once():
+    async def run():
+        leads = []
+
+        async def enqueue_lead(call_data, call_sid):
+            leads.append((call_sid, call_data.status))
+
+        original = webhooks.enqueue_lead
+        webhooks.enqueue_lead = enqueue_lead
+        try:
+            before = CALLS_IN_FLIGHT.get()
+            await webhooks.handle_incoming_call(CallSid="CA_GAUGE_BOOKED", From="+15550101234")
+            await webhooks.finish_call("CA_GAUGE_BOOKED")  # what /voice/book does once the slot is booked
+            assert CALLS_IN_FLIGHT.get() == before
+
+            for _ in range(2):  # "completed", then Twilio's retry of it
+                await webhooks.call_status(CallSid="CA_GAUGE_BOOKED", CallStatus="completed")
+            assert CALLS_IN_FLIGHT.get() == before
+            # The status callback doesn't bring the call's state back
+            assert await find_conversation("CA_GAUGE_BOOKED") is None
+            assert leads == [("CA_GAUGE_BOOKED", "no_booking")] * 2  # the lead ledger keeps "booked"
+        finally:
+            webhooks.enqueue_lead = original
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_histogram_buckets_are_cumulative()
+    test_middleware_times_known_routes_only()
+    test_calls_in_flight_counts_each_call_once()
+    test_booked_call_is_counted_out_once()
+    print("✅ Metrics tests passed")
@@ -0,0 +1,73 @@
+"""
+Test tiered model routing: fast model for chit-chat, large model for booking and dictated details
+"""
+import asyncio
+import json
+import sys
+import os
+from types import SimpleNamespace
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from models import CallData, ConversationState, Message
+from services import extraction
+from services.model_router import reply_tier, extraction_tier, extraction_model, FAST, LARGE
+from services.metrics import MODEL_COST, MODEL_TOKENS
+
+def state(utterance: str, **call_data) -> ConversationState:
+    return ConversationState(
+        call_sid="CA_ROUTE", stage="discovery",
+        messages=[Message(role="user", content=utterance)], call_data=CallData(**call_data)
+    )
+
+def test_simple_turns_use_fast_model():
+    assert reply_tier(state("yeah sounds good")) == FAST
+    assert reply_tier(state("what do you guys do?")) == FAST
+    assert extraction_tier(state("what do you guys do?")) == FAST
+
+def test_booking_and_details_use_large_model():
+    assert reply_tier(state("can we do tuesday afternoon")) == LARGE
+    assert reply_tier(state("sure", name="Ana", phone="5550100")) == LARGE
+    long_turn = "so basically we run a small clinic and " + "we need a lot of help with scheduling and follow ups " * 2
+    assert reply_tier(state(long_turn)) == LARGE
+    assert extraction_tier(state("it's five five five oh one")) == LARGE
+    assert extraction_tier(state("my name is Ana")) == LARGE
+
+def test_invalid_fast_extraction_escalates_to_large_model():
+    async def run():
+        models = []
+
+        async def create_completion(**kwargs):
+            models.append(kwargs["model"])
+            arguments = "not json" if len(models) == 1 else json.dumps({"service": "chatbot"})
+            call = SimpleNamespace(function=SimpleNamespace(arguments=arguments))
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[call]))],
+                usage=SimpleNamespace(prompt_tokens=100, completion_tokens=10)
+            )
+
+        original = extraction.create_completion
+        extraction.create_completion = create_completion
+        cost, tokens = MODEL_COST.get(LARGE), MODEL_TOKENS.get(FAST, "prompt")
+        try:
+            fields = await extraction.extract_call_data(state("we need a chatbot"))
+        finally:
+            extraction.create_completion = original
+
+        assert fields.service == "chatbot"
+        assert models == [extraction_model(FAST), extraction_model(LARGE)]
+        assert MODEL_TOKENS.get(FAST, "prompt") == tokens + 100
+        assert MODEL_COST.get(LARGE) > cost
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_simple_turns_use_fast_model()
+    test_booking_and_details_use_large_model()
+    test_invalid_fast_extraction_escalates_to_large_model()
+    print("✅ Model router tests passed")
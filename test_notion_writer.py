@@ -0,0 +1,132 @@
+"""
+Test the rate-limited Notion writer against a local Notion stand-in that enforces a request limit
+"""
+import asyncio
+import sys
+import os
+import time
+from contextlib import contextmanager
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from services import http_clients, notion
+from services.notion import NotionWriter
+
+def make_notion_stub(received: list, limit: int, window: float) -> FastAPI:
+    """Stand-in for Notion's pages API: at most `limit` requests per `window` seconds, then 429"""
+    stub = FastAPI()
+    recent = []
+    stub.state.rejected = 0
+
+    def throttled():
+        now = time.monotonic()
+        recent[:] = [at for at in recent if now - at < window]
+        if len(recent) >= limit:
+            stub.state.rejected += 1
+            retry_after = window - (now - recent[0])
+            return JSONResponse({"code": "rate_limited"}, status_code=429, headers={"Retry-After": f"{retry_after:.3f}"})
+        recent.append(now)
+        return None
+
+    @stub.post("/v1/pages")
+    async def create_page(request: Request):
+        rejection = throttled()
+        if rejection:
+            return rejection
+        received.append(("create", await request.json()))
+        return {"id": f"page-{len(received)}"}
+
+    @stub.patch("/v1/pages/{page_id}")
+    async def update_page(page_id: str, request: Request):
+        rejection = throttled()
+        if rejection:
+            return rejection
+        received.append((page_id, await request.json()))
+        return {"id": page_id}
+
+    return stub
+
+@contextmanager
+def use_stub(stub: FastAPI):
+    """Point the Notion client at the stand-in for the duration of a test"""
+    original_client, original_url = http_clients.clients.get("notion"), notion.NOTION_API_URL
+    http_clients.clients["notion"] = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    notion.NOTION_API_URL = "http://notion.test/v1"
+    try:
+        yield
+    finally:
+        notion.NOTION_API_URL = original_url
+        if original_client is None:
+            http_clients.clients.pop("notion", None)
+        else:
+            http_clients.clients["notion"] = original_client
+
+def test_writer_paces_requests_under_the_limit():
+    async def run():
+        received = []
+        stub = make_notion_stub(received, limit=5, window=0.25)
+        with use_stub(stub):
+            writer = NotionWriter(rate_per_second=15)
+
+            results = await asyncio.gather(*(writer.create_page({"properties": {"n": i}}) for i in range(10)))
+            await writer.stop()
+
+            assert all(result["success"] for result in results)
+            assert len(received) == 10
+            assert stub.state.rejected == 0
+
+    asyncio.run(run())
+
+def test_rate_limited_writes_wait_for_retry_after():
+    async def run():
+        received = []
+        stub = make_notion_stub(received, limit=5, window=0.25)
+        with use_stub(stub):
+            # Far faster than the stand-in allows - every 429 must be waited out, not lost
+            writer = NotionWriter(rate_per_second=200, max_rate_limit_retries=10)
+
+            results = await asyncio.gather(*(writer.create_page({"properties": {"n": i}}) for i in range(12)))
+            await writer.stop()
+
+            assert all(result["success"] for result in results)
+            assert sorted(body["properties"]["n"] for _, body in received) == list(range(12))
+            assert stub.state.rejected > 0
+            assert writer.rate_limited == stub.state.rejected
+
+    asyncio.run(run())
+
+def test_pending_updates_to_a_page_are_merged():
+    async def run():
+        received = []
+        with use_stub(make_notion_stub(received, limit=100, window=1.0)):
+            writer = NotionWriter(rate_per_second=100)
+
+            results = await asyncio.gather(
+                writer.update_page("p1", {"status": {"select": {"name": "needs_callback"}}}),
+                writer.update_page("p1", {"Email": {"email": "ana@example.com"}}),
+                writer.update_page("p1", {"status": {"select": {"name": "booked"}}}),
+            )
+            await writer.update_page("p1", {"notes": {"rich_text": []}})
+            await writer.stop()
+
+            assert all(result["success"] for result in results)
+            assert received == [
+                ("p1", {"properties": {"status": {"select": {"name": "booked"}}, "Email": {"email": "ana@example.com"}}}),
+                ("p1", {"properties": {"notes": {"rich_text": []}}}),
+            ]
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_writer_paces_requests_under_the_limit()
+    test_rate_limited_writes_wait_for_retry_after()
+    test_pending_updates_to_a_page_are_merged()
+    print("✅ Notion writer tests passed")
@@ -0,0 +1,119 @@
+"""
+Test the reply cache for repeated opening turns (OpenAI is faked)
+"""
+import asyncio
+import sys
+import os
+from contextlib import contextmanager
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from models import ExtractedFields
+from services import conversation
+from services.reply_cache import ReplyCache, reply_cache, normalize_utterance, has_personal_data
+from services.metrics import CACHE_LOOKUPS
+
+@contextmanager
+def fake_openai(calls: list, fields: ExtractedFields = None):
+    """Replace the reply and extraction calls, recording each utterance that reached the model"""
+    async def complete_reply(messages, tier=None):
+        calls.append(messages[-1]["content"])
+        return "Hey! Thanks for calling Orbyn, what can I help with?"
+
+    async def extract_call_data(state):
+        return fields or ExtractedFields()
+
+    originals = conversation.complete_reply, conversation.extract_call_data
+    conversation.complete_reply, conversation.extract_call_data = complete_reply, extract_call_data
+    try:
+        yield
+    finally:
+        conversation.complete_reply, conversation.extract_call_data = originals
+
+def test_normalization_and_guards():
+    assert normalize_utterance("Um, hello... hello?") == "hello"
+    assert normalize_utterance("¡Hóla!") == "hola"
+    assert has_personal_data("my name is Ana")
+    assert has_personal_data("five five five, oh one")
+    assert has_personal_data("ana at gmail dot com")
+    assert not has_personal_data("what do you do")
+
+def test_repeated_opener_is_served_from_cache():
+    async def run():
+        reply_cache._entries.clear()
+        calls = []
+
+        with fake_openai(calls):
+            first, _ = await conversation.generate_response("CA_CACHE_1", "Hello?")
+            hits = CACHE_LOOKUPS.get("replies", "hit")
+            second, extracted = await conversation.generate_response("CA_CACHE_2", "um, hello")
+
+            assert calls == ["Hello?"]
+            assert second == first
+            assert CACHE_LOOKUPS.get("replies", "hit") == hits + 1
+            assert extracted["name"] is None
+
+            # The follow-up turn keys on the cached reply before it, so it is shared too
+            await conversation.generate_response("CA_CACHE_1", "what do you do")
+            await conversation.generate_response("CA_CACHE_2", "What do you do?")
+            assert calls == ["Hello?", "what do you do"]
+
+            # Different language, different entry
+            await conversation.generate_response("CA_CACHE_3", "hola", detected_language="es")
+            assert len(calls) == 3
+
+        for call_sid in ("CA_CACHE_1", "CA_CACHE_2", "CA_CACHE_3"):
+            await conversation.end_conversation(call_sid)
+
+    asyncio.run(run())
+
+def test_personal_data_never_cached():
+    async def run():
+        reply_cache._entries.clear()
+        calls = []
+
+        # Utterance looks like a phone number: not even looked up
+        with fake_openai(calls):
+            await conversation.generate_response("CA_CACHE_4", "five five five")
+        # Extraction found the caller's name: reply is not stored
+        with fake_openai(calls, ExtractedFields(name="Ana")):
+            await conversation.generate_response("CA_CACHE_5", "Ana")
+        assert len(reply_cache) == 0
+
+        # Once details are known the call is past the cacheable stages
+        with fake_openai(calls):
+            await conversation.generate_response("CA_CACHE_5", "yes")
+        state = await conversation.get_conversation("CA_CACHE_5")
+        assert state.stage == "collecting"
+        assert len(reply_cache) == 0
+
+        for call_sid in ("CA_CACHE_4", "CA_CACHE_5"):
+            await conversation.end_conversation(call_sid)
+
+    asyncio.run(run())
+
+def test_lru_and_ttl_eviction():
+    now = [0.0]
+    cache = ReplyCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    empty = ExtractedFields()
+    cache.put("a", "Hi!", empty)
+    cache.put("b", "Hello!", empty)
+    assert cache.get("a") == "Hi!"  # "a" is now most recently used
+    cache.put("c", "Hey!", empty)
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None and cache.get("c") is None
+    cache.put("d", "Call 555 0100", empty)
+    assert len(cache) == 0
+
+if __name__ == "__main__":
+    test_normalization_and_guards()
+    test_repeated_opener_is_served_from_cache()
+    test_personal_data_never_cached()
+    test_lru_and_ttl_eviction()
+    print("✅ Reply cache tests passed")
@@ -0,0 +1,224 @@
+"""
+Test circuit breakers, webhook deadlines and hedged reads (no real upstreams)
+"""
+import asyncio
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from models import ExtractedFields
+from services import calendar, conversation, llm
+from services.resilience import (
+    CircuitBreaker, CircuitOpen, DeadlineExceeded, call_upstream, deadline_after, get_breaker, breakers
+)
+from services.metrics import HEDGED_REQUESTS
+
+def test_breaker_opens_then_lets_one_trial_through():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=10, clock=lambda: now[0])
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()       # the trial call
+    assert not breaker.allow()   # everyone else waits for its answer
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+def test_open_circuit_fails_fast():
+    async def run():
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            raise ConnectionError("down")
+
+        breakers.pop("test-down", None)
+        for _ in range(get_breaker("test-down").failure_threshold):
+            try:
+                await call_upstream("test-down", failing, timeout=5)
+            except ConnectionError:
+                pass
+
+        try:
+            await call_upstream("test-down", failing, timeout=5)
+            assert False, "expected CircuitOpen"
+        except CircuitOpen:
+            pass
+        assert len(calls) == get_breaker("test-down").failure_threshold
+
+    asyncio.run(run())
+
+def test_webhook_deadline_caps_upstream_timeout():
+    async def run():
+        async def slow():
+            await asyncio.sleep(5)
+
+        start = time.monotonic()
+        with deadline_after(0.3):
+            try:
+                await call_upstream("test-slow", slow, timeout=30)
+                assert False, "expected DeadlineExceeded"
+            except DeadlineExceeded:
+                pass
+        assert time.monotonic() - start < 1
+
+        # With no time left the request isn't even started
+        with deadline_after(0.1):
+            try:
+                await call_upstream("test-slow", slow, timeout=30)
+                assert False, "expected DeadlineExceeded"
+            except DeadlineExceeded:
+                pass
+
+    asyncio.run(run())
+
+def test_slow_read_is_hedged():
+    async def run():
+        attempts = []
+
+        async def read():
+            attempts.append(1)
+            # The first copy stalls, the hedge answers right away
+            await asyncio.sleep(2 if len(attempts) == 1 else 0.01)
+            return len(attempts)
+
+        won = HEDGED_REQUESTS.get("test-hedge", "won")
+        start = time.monotonic()
+        result = await call_upstream("test-hedge", read, timeout=5, hedge_after=0.1)
+        assert result == 2
+        assert time.monotonic() - start < 0.5
+        assert HEDGED_REQUESTS.get("test-hedge", "won") == won + 1
+
+    asyncio.run(run())
+
+def test_calcom_outage_degrades_quickly():
+    async def run():
+        breaker = get_breaker("calcom")
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        calendar.invalidate_slot_cache()
+        try:
+            start = time.monotonic()
+            slots = await calendar.get_available_slots()
+            booking = await calendar.book_appointment("Ana", "ana@example.com", "5550100", slots[0]["datetime"])
+            assert time.monotonic() - start < 0.5
+        finally:
+            breaker.record_success()
+
+        assert [slot["time"] for slot in slots] == ["10:00 AM", "2:00 PM"]  # default slots
+        assert booking["success"] is False and booking["unavailable"] is True
+
+    asyncio.run(run())
+
+def test_unexpected_error_during_trial_does_not_wedge_breaker():
+    async def run():
+        class Completions:
+            async def create(self, **kwargs):
+                raise ValueError("response didn't parse")
+
+        class FakeClient:
+            class chat:
+                completions = Completions()
+
+        breaker = get_breaker("openai")
+        original = llm._client
+        llm._client = FakeClient()
+        try:
+            breaker.failures = breaker.failure_threshold
+            breaker.opened_at = time.monotonic() - breaker.reset_seconds - 1  # half-open
+            try:
+                await llm.create_completion(model="test", messages=[])
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+            assert breaker.state == "open" and not breaker.trial_in_flight
+
+            # Once the reset time passes again, the next trial is let through
+            breaker.opened_at = time.monotonic() - breaker.reset_seconds - 1
+            assert breaker.allow()
+        finally:
+            llm._client = original
+            breaker.record_success()
+
+    asyncio.run(run())
+
+def test_streams_are_judged_once_read():
+    async def run():
+        class Completions:
+            fail_after_first_sentence = True
+            rest_arrives = None
+
+            async def create(self, **kwargs):
+                async def stream():
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Sure thing! "))])
+                    if self.fail_after_first_sentence:
+                        raise ConnectionResetError("stream dropped")
+                    await self.rest_arrives.wait()
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Let me check."))])
+
+                return stream()
+
+        class FakeClient:
+            class chat:
+                completions = Completions()
+
+        async def extract_call_data(state):
+            return ExtractedFields()
+
+        breaker = get_breaker("openai")
+        originals = llm._client, conversation.extract_call_data
+        llm._client, conversation.extract_call_data = FakeClient(), extract_call_data
+        try:
+            # Half-open: the stream opening is not enough to close the circuit
+            breaker.failures = breaker.failure_threshold
+            breaker.opened_at = time.monotonic() - breaker.reset_seconds - 1
+            first, pending = await conversation.stream_response("CA_BREAKER_1", "can you check my order")
+            assert first == "Sure thing!"
+            try:
+                await pending
+                assert False, "expected the stream to break off"
+            except ConnectionResetError:
+                pass
+            assert breaker.state == "open" and not breaker.trial_in_flight
+
+            # A stream read to the end closes it
+            completions = FakeClient.chat.completions
+            completions.fail_after_first_sentence, completions.rest_arrives = False, asyncio.Event()
+            breaker.opened_at = time.monotonic() - breaker.reset_seconds - 1
+            first, pending = await conversation.stream_response("CA_BREAKER_2", "can you check my invoice")
+            assert breaker.state == "half_open" and breaker.trial_in_flight  # still mid-stream
+            completions.rest_arrives.set()
+            assert (await pending)[0] == "Let me check."
+            assert breaker.state == "closed"
+        finally:
+            llm._client, conversation.extract_call_data = originals
+            breaker.record_success()
+            for call_sid in ("CA_BREAKER_1", "CA_BREAKER_2"):
+                await conversation.end_conversation(call_sid)
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_breaker_opens_then_lets_one_trial_through()
+    test_open_circuit_fails_fast()
+    test_webhook_deadline_caps_upstream_timeout()
+    test_slow_read_is_hedged()
+    test_calcom_outage_degrades_quickly()
+    test_unexpected_error_during_trial_does_not_wedge_breaker()
+    test_streams_are_judged_once_read()
+    print("✅ Resilience tests passed")
@@ -0,0 +1,148 @@
+"""
+Test the Cal.com availability cache: hits, stale serving, single-flight fetches, invalidation and prefetching (no Cal.com needed)
+"""
+import asyncio
+import sys
+import os
+import time
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from config import SLOT_CACHE_TTL_SECONDS
+from services import calendar, conversation
+from services.metrics import CACHE_LOOKUPS
+from routes import webhooks
+
+BEFORE = [{"date": "2026-10-20", "time": "10:00 AM", "datetime": "2026-10-20T14:00:00.000Z"}]
+AFTER = [{"date": "2026-10-20", "time": "02:00 PM", "datetime": "2026-10-20T18:00:00.000Z"}]
+
+class FakeCalcom:
+    """Stands in for fetch_available_slots - returns `slots`, optionally waiting for `release`"""
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.fetches = 0
+        self.release = None
+
+    async def __call__(self, window):
+        self.fetches += 1
+        slots = self.slots
+        if self.release:
+            await self.release.wait()
+        return slots
+
+def with_calcom(fake: FakeCalcom, test):
+    async def run():
+        original = calendar.fetch_available_slots
+        calendar.fetch_available_slots = fake
+        calendar.invalidate_slot_cache()
+        try:
+            await test()
+        finally:
+            calendar.fetch_available_slots = original
+            calendar.invalidate_slot_cache()
+
+    asyncio.run(run())
+
+def test_second_lookup_is_a_hit():
+    fake = FakeCalcom(BEFORE)
+
+    async def test():
+        hits = CACHE_LOOKUPS.get("slots", "hit")
+        assert await calendar.get_available_slots() == BEFORE
+        assert await calendar.get_available_slots() == BEFORE
+        assert fake.fetches == 1
+        assert CACHE_LOOKUPS.get("slots", "hit") == hits + 1
+
+        # Already fresh - prefetching doesn't go back to Cal.com
+        calendar.prefetch_available_slots()
+        await asyncio.sleep(0)
+        assert fake.fetches == 1
+
+    with_calcom(fake, test)
+
+def test_concurrent_misses_share_one_fetch():
+    fake = FakeCalcom(BEFORE)
+    fake.release = asyncio.Event()
+
+    async def test():
+        waiting = [asyncio.create_task(calendar.get_available_slots()) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        fake.release.set()
+        assert await asyncio.gather(*waiting) == [BEFORE] * 5
+        assert fake.fetches == 1
+
+    with_calcom(fake, test)
+
+def test_stale_entry_is_served_while_refreshing():
+    fake = FakeCalcom(BEFORE)
+
+    async def test():
+        await calendar.get_available_slots()
+        window = calendar.slot_window(7)
+        calendar.slot_cache[window] = (time.monotonic() - SLOT_CACHE_TTL_SECONDS - 1, BEFORE)
+        fake.slots = AFTER
+
+        assert await calendar.get_available_slots() == BEFORE  # no wait on Cal.com
+        await asyncio.sleep(0.01)
+        assert fake.fetches == 2
+        assert await calendar.get_available_slots() == AFTER
+
+    with_calcom(fake, test)
+
+def test_refresh_started_before_a_booking_does_not_refill_the_cache():
+    fake = FakeCalcom(BEFORE)
+    fake.release = asyncio.Event()
+
+    async def test():
+        calendar.prefetch_available_slots()
+        await asyncio.sleep(0.01)
+        assert fake.fetches == 1
+
+        # A booking lands while that fetch is still out
+        calendar.invalidate_slot_cache()
+        fake.release.set()
+        await asyncio.sleep(0.01)
+        assert calendar.slot_cache == {}
+
+        fake.slots, fake.release = AFTER, None
+        assert await calendar.get_available_slots() == AFTER
+        assert fake.fetches == 2
+
+    with_calcom(fake, test)
+
+def test_prefetch_waits_for_signs_of_a_booking():
+    async def run():
+        prefetches = []
+        original = webhooks.prefetch_available_slots
+        webhooks.prefetch_available_slots = lambda: prefetches.append(True)
+        try:
+            # Caller ID alone fills in the phone on every call - not a reason to hit Cal.com
+            state = await conversation.get_conversation("CA_PREFETCH")
+            state.call_data.phone = state.caller_id = "+15555550100"
+            await conversation.save_conversation(state)
+            await webhooks.build_turn_response("CA_PREFETCH", "Hi! What can I help with?", {})
+            assert prefetches == []
+
+            state.call_data.service = "chatbot"
+            await conversation.save_conversation(state)
+            await webhooks.build_turn_response("CA_PREFETCH", "Nice, tell me more.", {})
+            assert prefetches == [True]
+        finally:
+            webhooks.prefetch_available_slots = original
+            await conversation.end_conversation("CA_PREFETCH")
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_second_lookup_is_a_hit()
+    test_concurrent_misses_share_one_fetch()
+    test_stale_entry_is_served_while_refreshing()
+    test_refresh_started_before_a_booking_does_not_refill_the_cache()
+    test_prefetch_waits_for_signs_of_a_booking()
+    print("✅ Slot cache tests passed")
@@ -0,0 +1,149 @@
+"""
+Test slot holds: concurrent callers get different slots, and a failed booking re-offers held ones
+"""
+import asyncio
+import sys
+import os
+from contextlib import contextmanager
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from services.holds import MemorySlotHolds, RedisSlotHolds, SlotHolds
+from services import holds as holds_module
+from services.conversation import get_conversation, save_conversation, end_conversation
+from routes import webhooks
+
+SLOTS = [
+    {"date": "2026-10-20", "time": "10:00 AM", "datetime": "2026-10-20T14:00:00.000Z"},
+    {"date": "2026-10-20", "time": "02:00 PM", "datetime": "2026-10-20T18:00:00.000Z"},
+    {"date": "2026-10-22", "time": "02:00 PM", "datetime": "2026-10-22T18:00:00.000Z"},
+    {"date": "2026-10-22", "time": "04:30 PM", "datetime": "2026-10-22T20:30:00.000Z"},
+]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@contextmanager
+def patched(module, **replacements):
+    """Swap module attributes for the duration of a test"""
+    originals = {name: getattr(module, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(module, name, value)
+
+@contextmanager
+def use_holds(clock: FakeClock):
+    table = MemorySlotHolds(ttl_seconds=120, clock=clock)
+    with patched(holds_module, holds=table), patched(webhooks, holds=table):
+        yield table
+
+def test_concurrent_callers_are_offered_different_slots():
+    async def run():
+        clock = FakeClock()
+        with use_holds(clock) as table:
+            first = await holds_module.hold_slots("CA_ONE", SLOTS, count=2)
+            second = await holds_module.hold_slots("CA_TWO", SLOTS, count=2)
+            assert first == SLOTS[:2]
+            assert second == SLOTS[2:]
+            assert await holds_module.unheld_slots("CA_TWO", SLOTS) == SLOTS[2:]
+
+            # Holds expire if the call goes quiet, and are released when it ends
+            clock.now = 121
+            assert await table.acquire(SLOTS[0]["datetime"], "CA_TWO")
+            await holds_module.release_slots("CA_TWO", SLOTS)
+            assert len(table) == 0
+
+    asyncio.run(run())
+
+def test_failed_booking_reoffers_held_slots():
+    async def run():
+        call_sid = "CA_HOLD_BOOK"
+
+        async def get_available_slots():
+            return list(SLOTS)
+
+        async def book_appointment(**kwargs):
+            return {"success": False, "error": "slot no longer available"}
+
+        with use_holds(FakeClock()), patched(
+            webhooks, get_available_slots=get_available_slots, book_appointment=book_appointment,
+            prefetch_available_slots=lambda: None
+        ):
+            conversation = await get_conversation(call_sid)
+            conversation.call_data.name = "Ana"
+            conversation.call_data.phone = "+15555550100"
+            conversation.offered_slots = await holds_module.hold_slots(call_sid, SLOTS)
+            await save_conversation(conversation)
+
+            response = await webhooks.book_slot(CallSid=call_sid, SpeechResult="the first one")
+            body = response.body.decode()
+            assert "that time just got taken" in body
+            assert 'action="/webhooks/voice/book"' in body
+
+            conversation = await get_conversation(call_sid)
+            assert conversation.offered_slots == SLOTS[1:3]
+            assert await holds_module.holds.holder(SLOTS[0]["datetime"]) is None
+            assert conversation.call_data.status == "new"
+
+            await end_conversation(call_sid)
+            assert await holds_module.holds.holder(SLOTS[1]["datetime"]) is None
+
+    asyncio.run(run())
+
+def test_backends_must_implement_the_whole_interface():
+    class AcquireOnlyHolds(SlotHolds):
+        async def acquire(self, slot_key, call_sid):
+            return True
+
+    try:
+        AcquireOnlyHolds()
+        assert False, "expected TypeError"
+    except TypeError as e:
+        assert "holder" in str(e) and "release" in str(e)
+
+def test_redis_holds_against_a_server():
+    """Runs against a real Redis when REDIS_TEST_URL is set (e.g. redis://localhost:6379/15)"""
+    url = os.getenv("REDIS_TEST_URL")
+    if not url:
+        print("REDIS_TEST_URL not set, skipping the live Redis check")
+        return
+
+    async def run():
+        import redis.asyncio as redis
+
+        client = redis.from_url(url)
+        table = RedisSlotHolds(client, ttl_seconds=30, prefix="nova:test:hold:")
+        slot = SLOTS[0]["datetime"]
+        try:
+            assert await table.acquire(slot, "CA_ONE")
+            assert not await table.acquire(slot, "CA_TWO")
+            assert await table.holder(slot) == "CA_ONE"
+            await table.release(slot, "CA_TWO")  # not theirs to release
+            assert await table.holder(slot) == "CA_ONE"
+            await table.release(slot, "CA_ONE")
+            assert await table.acquire(slot, "CA_TWO")
+        finally:
+            await client.delete(f"nova:test:hold:{slot}")
+            await client.aclose()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_concurrent_callers_are_offered_different_slots()
+    test_failed_booking_reoffers_held_slots()
+    test_backends_must_implement_the_whole_interface()
+    test_redis_holds_against_a_server()
+    print("✅ Slot hold tests passed")
@@ -0,0 +1,88 @@
+"""
+Test matching the caller's spoken slot choice against available slots (no Cal.com needed)
+"""
+import sys
+import os
+from datetime import date
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from services.slots import parse_slot_request, resolve_slot
+
+TODAY = date(2026, 10, 19)  # A Monday
+
+SLOTS = [
+    {"date": "2026-10-20", "time": "10:00 AM", "datetime": "2026-10-20T14:00:00.000Z"},
+    {"date": "2026-10-20", "time": "02:00 PM", "datetime": "2026-10-20T18:00:00.000Z"},
+    {"date": "2026-10-22", "time": "02:00 PM", "datetime": "2026-10-22T18:00:00.000Z"},
+    {"date": "2026-10-22", "time": "04:30 PM", "datetime": "2026-10-22T20:30:00.000Z"},
+    {"date": "2026-10-23", "time": "09:00 AM", "datetime": "2026-10-23T13:00:00.000Z"},
+]
+OFFERED = SLOTS[:3]
+
+def picked(text: str) -> dict | None:
+    return resolve_slot(text, SLOTS, OFFERED, today=TODAY).slot
+
+def test_parses_english_and_spanish_phrases():
+    request = parse_slot_request("Thursday at two", TODAY)
+    assert (request.weekday, request.hour, request.minute) == (3, 14, 0)
+
+    request = parse_slot_request("el martes por la tarde", TODAY)
+    assert (request.weekday, request.bucket, request.hour) == (1, "afternoon", None)
+
+    request = parse_slot_request("mañana a las diez de la mañana", TODAY)
+    assert (request.day, request.hour, request.bucket) == (date(2026, 10, 20), 10, "morning")
+
+    # Ordinals and phone numbers aren't times
+    assert parse_slot_request("the 2nd one", TODAY).hour is None
+    assert parse_slot_request("call me at 555 010 1234", TODAY).hour is None
+
+def test_resolves_the_slot_the_caller_chose():
+    assert picked("Thursday at two") == SLOTS[2]
+    assert picked("el martes por la tarde") == SLOTS[1]
+    assert picked("a las cuatro y media") == SLOTS[3]
+    assert picked("Friday morning") == SLOTS[4]  # Not read out, but open
+    assert picked("the second one") == SLOTS[1]
+    assert picked("la última") == SLOTS[2]
+    assert picked("Yes, that works") == SLOTS[0]
+
+def test_offers_nearest_alternatives():
+    match = resolve_slot("Friday at 3pm", SLOTS, OFFERED, today=TODAY)
+    assert match.slot is None and not match.unclear
+    assert match.alternatives[-1] == SLOTS[4]  # Same day comes first in closeness, listed in time order
+    assert len(match.alternatives) == 3
+
+    match = resolve_slot("hmm, let me think", SLOTS, OFFERED, today=TODAY)
+    assert match.slot is None and match.unclear
+    assert match.alternatives == OFFERED
+
+def test_turned_down_slots_are_never_booked():
+    for text in ("None of those times are good for me", "No good, sorry", "Sorry, none of them are fine",
+                 "No, the first one does not work for me", "No me sirve ninguno", "I can't do any of those"):
+        match = resolve_slot(text, SLOTS, OFFERED, today=TODAY)
+        assert match.slot is None, text
+        assert match.unclear and match.alternatives == SLOTS[3:], text
+
+    request = parse_slot_request("No, the first one does not work for me", TODAY)
+    assert request.negated and not request.affirmative and request.ordinal is None
+
+    # The negated day is dropped and the one they asked for instead is used
+    assert picked("Not Thursday, how about Friday") == SLOTS[4]
+    assert picked("el martes no, mejor el jueves a las dos") == SLOTS[2]
+    assert picked("I can't do Tuesday but Thursday at two works") == SLOTS[2]
+    assert picked("not the first one, the second") == SLOTS[1]
+
+    # Phrases that only sound negative still count
+    assert picked("Yes, no problem") == SLOTS[0]
+    assert picked("Thursday at two, no worries") == SLOTS[2]
+
+if __name__ == "__main__":
+    test_parses_english_and_spanish_phrases()
+    test_resolves_the_slot_the_caller_chose()
+    test_offers_nearest_alternatives()
+    test_turned_down_slots_are_never_booked()
+    print("✅ Slot matching tests passed")
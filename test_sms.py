@@ -0,0 +1,147 @@
+"""
+Test the async SMS sender against a local Twilio stub (no real texts are sent)
+"""
+import asyncio
+import sys
+import os
+import time
+from contextlib import contextmanager
+from email.utils import formatdate
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from services import http_clients
+from services.metrics import UPSTREAM_ERRORS
+from services.sms import SmsSender
+from services.rate_limit import parse_retry_after
+
+def make_twilio_stub(received: list, fail_numbers: set = frozenset(), retry_after: str = None) -> FastAPI:
+    """Stand-in for POST /2010-04-01/Accounts/{sid}/Messages.json (answers 429 when given retry_after)"""
+    stub = FastAPI()
+
+    @stub.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def create_message(account_sid: str, request: Request):
+        form = await request.form()
+        if retry_after:
+            return JSONResponse({"code": 20429, "message": "Too Many Requests"}, status_code=429,
+                                headers={"Retry-After": retry_after})
+        if form["To"] in fail_numbers:
+            return JSONResponse({"code": 21211, "message": "Invalid 'To' Phone Number"}, status_code=400)
+        received.append((time.monotonic(), dict(form)))
+        return {"sid": f"SM{len(received):032d}", "status": "queued"}
+
+    return stub
+
+@contextmanager
+def use_stub(stub: FastAPI):
+    """Point the Twilio client at the stand-in for the duration of a test"""
+    original = http_clients.clients.get("twilio")
+    http_clients.clients["twilio"] = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    try:
+        yield
+    finally:
+        if original is None:
+            http_clients.clients.pop("twilio", None)
+        else:
+            http_clients.clients["twilio"] = original
+
+def test_bulk_send_respects_rate_limit():
+    async def run():
+        received = []
+        with use_stub(make_twilio_stub(received)):
+            sender = SmsSender(rate_per_second=20, from_number="+15555550000")
+
+            start = time.monotonic()
+            results = await sender.send_bulk([(f"+1555555010{i}", f"Reminder {i}") for i in range(6)])
+            await sender.stop()
+
+            assert all(result["success"] for result in results)
+            assert [form["Body"] for _, form in received] == [f"Reminder {i}" for i in range(6)]
+            # First message goes out immediately, the other five wait for tokens at 20/s
+            assert time.monotonic() - start >= 5 / 20 * 0.9
+
+    asyncio.run(run())
+
+def test_rejected_messages_report_failure():
+    async def run():
+        received = []
+        with use_stub(make_twilio_stub(received, fail_numbers={"+10000000000"})):
+            sender = SmsSender(rate_per_second=100, from_number="+15555550000")
+
+            ok, bad = await sender.send_bulk([("+15555550100", "hi"), ("+10000000000", "hi")])
+            await sender.stop()
+
+            assert ok["success"] and not bad["success"]
+            assert "Invalid" in bad["error"]
+
+    asyncio.run(run())
+
+def test_delivery_status_is_tracked():
+    async def run():
+        with use_stub(make_twilio_stub([])):
+            sender = SmsSender(rate_per_second=100, from_number="+15555550000")
+
+            result = await sender.send("+15555550100", "hi")
+            await sender.stop()
+            assert sender.delivery[result["sid"]]["status"] == "queued"
+
+            sender.track(result["sid"], "delivered")
+            assert sender.delivery[result["sid"]]["status"] == "delivered"
+            assert sender.delivery[result["sid"]]["to"] == "+15555550100"
+
+    asyncio.run(run())
+
+def test_retry_after_as_seconds_or_date():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after(None) == 1.0 and parse_retry_after("soon") == 1.0
+    in_a_minute = formatdate(time.time() + 60, usegmt=True)
+    assert 55 < parse_retry_after(in_a_minute) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+def test_throttled_send_pauses_the_sender():
+    async def run():
+        with use_stub(make_twilio_stub([], retry_after=formatdate(time.time() + 30, usegmt=True))):
+            sender = SmsSender(rate_per_second=100, from_number="+15555550000")
+
+            result = await sender.send("+15555550100", "hi")
+            await sender.stop()
+            assert not result["success"] and "Too Many Requests" in result["error"]
+            assert sender.bucket.blocked_until - time.monotonic() > 25
+
+    asyncio.run(run())
+
+def test_sender_that_stopped_waiting_is_not_an_error():
+    async def run():
+        received = []
+        with use_stub(make_twilio_stub(received)):
+            sender = SmsSender(rate_per_second=100, from_number="+15555550000")
+            errors = UPSTREAM_ERRORS.get("twilio", "send_sms")
+
+            # The webhook's deadline passes while Twilio is still answering
+            waiting = asyncio.create_task(sender.send("+15555550100", "hi"))
+            while not sender._in_flight:
+                await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.sleep(0.05)
+            await sender.stop()
+            assert len(received) == 1
+            assert UPSTREAM_ERRORS.get("twilio", "send_sms") == errors
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_bulk_send_respects_rate_limit()
+    test_rejected_messages_report_failure()
+    test_delivery_status_is_tracked()
+    test_retry_after_as_seconds_or_date()
+    test_throttled_send_pauses_the_sender()
+    test_sender_that_stopped_waiting_is_not_an_error()
+    print("✅ SMS sender tests passed")
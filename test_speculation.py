@@ -0,0 +1,84 @@
+"""
+Test speculative replies drafted from Twilio's partial transcripts (OpenAI is faked)
+"""
+import asyncio
+import sys
+import os
+from contextlib import contextmanager
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from models import ExtractedFields
+from services import conversation
+
+@contextmanager
+def fake_openai(calls: list):
+    """Replace the reply and extraction calls with ones that record the transcript they saw"""
+    async def complete_reply(messages, tier=None):
+        calls.append(messages[-1]["content"])
+        await asyncio.sleep(0.01)
+        return f"Reply to: {messages[-1]['content']}"
+
+    async def extract_call_data(state):
+        return ExtractedFields(service="AI automation")
+
+    originals = conversation.complete_reply, conversation.extract_call_data
+    conversation.complete_reply, conversation.extract_call_data = complete_reply, extract_call_data
+    try:
+        yield
+    finally:
+        conversation.complete_reply, conversation.extract_call_data = originals
+
+def test_transcripts_match():
+    assert conversation.transcripts_match("I need help with automation", "I need help with automation.")
+    assert conversation.transcripts_match("I need some help with my automations", "I need some help with my automation")
+    # A number still being read out never matches
+    assert not conversation.transcripts_match("my number is 555 010", "my number is 555 010 1234")
+    assert not conversation.transcripts_match("I need help", "I need help booking a consultation for Tuesday")
+
+def test_matching_final_transcript_reuses_draft():
+    async def run():
+        calls = []
+        with fake_openai(calls):
+            await conversation.speculate("CA_SPEC_1", "I need help with")  # superseded
+            await conversation.speculate("CA_SPEC_1", "I need help with automation")
+            await conversation.speculate("CA_SPEC_1", "I need help with automation")  # same draft kept
+            speculation = conversation.take_speculation("CA_SPEC_1", "I need help with automation.")
+            assert speculation is not None
+
+            reply, extracted = await conversation.generate_response("CA_SPEC_1", "I need help with automation.", speculation=speculation)
+            assert reply == "Reply to: I need help with automation"
+            assert extracted["service"] == "AI automation"
+
+            # Nothing was stored by the draft itself; the committed turn has the final transcript
+            state = await conversation.get_conversation("CA_SPEC_1")
+            assert [m.content for m in state.messages] == ["I need help with automation.", reply]
+            await conversation.end_conversation("CA_SPEC_1")
+
+    asyncio.run(run())
+
+def test_mismatched_final_transcript_discards_draft():
+    async def run():
+        calls = []
+        with fake_openai(calls):
+            await conversation.speculate("CA_SPEC_2", "my number is 555 010")
+            speculation = conversation.take_speculation("CA_SPEC_2", "my number is 555 010 1234")
+            assert speculation is None
+            assert "CA_SPEC_2" not in conversation.speculations
+
+            state = await conversation.get_conversation("CA_SPEC_2")
+            assert state.messages == []
+            await conversation.end_conversation("CA_SPEC_2")
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_transcripts_match()
+    test_matching_final_transcript_reuses_draft()
+    test_mismatched_final_transcript_discards_draft()
+    print("✅ Speculation tests passed")
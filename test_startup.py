@@ -0,0 +1,83 @@
+"""
+Test that the app imports fast and safely: heavy clients load lazily, missing keys don't crash the import
+"""
+import subprocess
+import sys
+import os
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+def test_import_defers_heavy_modules_and_needs_no_keys():
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    check = (
+        "import sys, main\n"
+        "eager = [name for name in ('openai', 'uvicorn') if name in sys.modules]\n"
+        "assert not eager, eager\n"
+        "from services import llm\n"
+        "assert llm._client is None\n"
+    )
+    result = subprocess.run([sys.executable, "-c", check], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_settings_are_typed_and_loaded_once():
+    check = (
+        "import config\n"
+        "settings = config.get_settings()\n"
+        "assert settings is config.get_settings()\n"
+        "assert settings.SMS_RATE_PER_SECOND == 2.5 and settings.STREAM_RESPONSES is True\n"
+        "assert settings.EXTRACTION_MODEL == 'gpt-4o-mini'\n"
+        "from config import JOB_WORKERS\n"
+        "assert JOB_WORKERS == 4\n"
+    )
+    env = dict(os.environ, SMS_RATE_PER_SECOND="2.5", STREAM_RESPONSES="true", OPENAI_MODEL="gpt-4o-mini")
+    env.pop("EXTRACTION_MODEL", None)
+    env.pop("JOB_WORKERS", None)
+    result = subprocess.run([sys.executable, "-c", check], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_setting_values_are_validated():
+    check = (
+        "import config\n"
+        "for raw in ('1', 'yes', 'True ', 'ON'):\n"
+        "    assert config.parse_value('CALL_LOG_ENABLED', raw, bool) is True, raw\n"
+        "for raw in ('0', 'no', ' false', 'Off'):\n"
+        "    assert config.parse_value('CALL_LOG_ENABLED', raw, bool) is False, raw\n"
+        "assert config.parse_value('JOB_WORKERS', ' 8', int) == 8\n"
+        "for name, raw, kind in (('CALL_LOG_ENABLED', 'enabled', bool), ('JOB_WORKERS', 'four', int)):\n"
+        "    try:\n"
+        "        config.parse_value(name, raw, kind)\n"
+        "        assert False, raw\n"
+        "    except config.ConfigError as e:\n"
+        "        assert name in str(e)\n"
+        "try:\n"
+        "    config.get_settings()\n"
+        "    assert False, 'expected a ConfigError'\n"
+        "except config.ConfigError as e:\n"
+        "    assert 'STREAM_RESPONSES' in str(e)\n"
+    )
+    env = dict(os.environ, STREAM_RESPONSES="sometimes")
+    result = subprocess.run([sys.executable, "-c", check], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_multiple_workers_adjust_per_worker_settings():
+    check = (
+        "import os, main\n"
+        "options = main.server_options(production=True, workers=3)\n"
+        "assert options['workers'] == 3\n"
+        "assert float(os.environ['NOTION_RATE_PER_SECOND']) == 1.0\n"
+        "assert os.environ['STREAM_RESPONSES'] == os.environ['SPECULATIVE_REPLIES'] == 'false'\n"
+    )
+    env = dict(os.environ, NOTION_RATE_PER_SECOND="3", STREAM_RESPONSES="true", SPECULATIVE_REPLIES="true")
+    result = subprocess.run([sys.executable, "-c", check], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+if __name__ == "__main__":
+    test_import_defers_heavy_modules_and_needs_no_keys()
+    test_settings_are_typed_and_loaded_once()
+    test_setting_values_are_validated()
+    test_multiple_workers_adjust_per_worker_settings()
+    print("✅ Startup tests passed")
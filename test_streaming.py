@@ -0,0 +1,156 @@
+"""
+Test streamed replies: the first sentence is spoken early and /voice/continue speaks the rest (OpenAI is faked)
+"""
+import asyncio
+import sys
+import os
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from models import ExtractedFields
+from services import conversation
+from services.llm import LLMTimeout
+from services.resilience import deadline_after
+from routes import webhooks
+
+def chunk(text: str):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+class FakeStream:
+    """Stands in for llm.CompletionStream, remembering how the reader settled it"""
+
+    def __init__(self, pieces: list, stall: float):
+        self.pieces = pieces
+        self.stall = stall
+        self.outcomes = []
+
+    async def __aiter__(self):
+        for i, piece in enumerate(self.pieces):
+            if self.stall and i == len(self.pieces) - 1:
+                await asyncio.sleep(self.stall)
+            yield chunk(piece)
+
+    def finish(self, error: BaseException = None):
+        self.outcomes.append(error)
+
+@contextmanager
+def fake_stream(pieces: list, stall: float = 0, fields: ExtractedFields = None):
+    """Stream `pieces` as completion chunks, waiting `stall` seconds before the last one"""
+    streams = []
+
+    async def create_completion(**kwargs):
+        assert kwargs["stream"] is True
+        streams.append(FakeStream(pieces, stall))
+        return streams[-1]
+
+    async def extract_call_data(state):
+        return fields or ExtractedFields()
+
+    originals = conversation.create_completion, conversation.extract_call_data
+    conversation.create_completion, conversation.extract_call_data = create_completion, extract_call_data
+    try:
+        yield streams
+    finally:
+        conversation.create_completion, conversation.extract_call_data = originals
+
+def test_find_sentence_end():
+    assert conversation.find_sentence_end("Great question! We build") == len("Great question!")
+    assert conversation.find_sentence_end("Sure… let me check") == len("Sure…")
+    assert conversation.find_sentence_end("Great question!") == -1  # might still be "!!" or "?!"
+    assert conversation.find_sentence_end("It costs $1.50 per") == -1
+
+def test_split_reply():
+    async def run():
+        pieces = ["Great ques", "tion! We build chat", "bots and voice agents. ", "Want to book a call?"]
+        with fake_stream(pieces, stall=0.2, fields=ExtractedFields(service="chatbot")) as streams:
+            first, pending = await conversation.stream_response("CA_STREAM_1", "what do you build for dentists")
+            assert first == "Great question!"
+            assert not pending.done()  # spoken before the stream finished
+            assert streams[0].outcomes == []  # not judged until it has been read
+
+            rest, extracted_data = await pending
+            assert rest == "We build chatbots and voice agents. Want to book a call?"
+            assert streams[0].outcomes == [None]
+            assert extracted_data["service"] == "chatbot"
+
+        state = await conversation.get_conversation("CA_STREAM_1")
+        assert state.messages[-1].content == "Great question! We build chatbots and voice agents. Want to book a call?"
+        assert state.call_data.service == "chatbot"
+        await conversation.end_conversation("CA_STREAM_1")
+
+    asyncio.run(run())
+
+def test_first_sentence_running_into_json_tail():
+    async def run():
+        with fake_stream(['Got it {"note": "wants a demo. soon"}']):
+            first, pending = await conversation.stream_response("CA_STREAM_2", "I want a demo for my clinic")
+            rest, _ = await pending
+            assert rest == ""
+        await conversation.end_conversation("CA_STREAM_2")
+
+    asyncio.run(run())
+
+def test_stream_that_times_out():
+    async def run():
+        with fake_stream(["Let me think about", " that one."], stall=1) as streams:
+            with deadline_after(0.1):
+                first, pending = await conversation.stream_response("CA_STREAM_3", "how much is a voice agent for a gym")
+            assert first == conversation.TIMEOUT_REPLIES["en"]
+            rest, _ = await pending
+            assert rest == ""
+            # The stall counts against OpenAI, not as a success or a hang-up
+            [outcome] = streams[0].outcomes
+            assert isinstance(outcome, LLMTimeout)
+
+        state = await conversation.get_conversation("CA_STREAM_3")
+        assert state.messages[-1].content == first
+        await conversation.end_conversation("CA_STREAM_3")
+
+    asyncio.run(run())
+
+def test_continue_speaks_the_rest():
+    async def run():
+        streaming = webhooks.STREAM_RESPONSES
+        webhooks.STREAM_RESPONSES = True
+        try:
+            with fake_stream(["Happy to help! ", "What's the name of your business?"]):
+                response = await webhooks.process_speech(CallSid="CA_STREAM_4", SpeechResult="I run a bakery in town", From="+15555550100")
+                body = response.body.decode()
+                assert "Happy to help!" in body and "/webhooks/voice/continue" in body
+                assert "CA_STREAM_4" in conversation.pending_turns
+
+                response = await webhooks.continue_speech(CallSid="CA_STREAM_4")
+                body = response.body.decode()
+                assert "What's the name of your business?" in body and "/webhooks/voice/process" in body
+                assert "CA_STREAM_4" not in conversation.pending_turns
+        finally:
+            webhooks.STREAM_RESPONSES = streaming
+            await conversation.end_conversation("CA_STREAM_4")
+
+    asyncio.run(run())
+
+def test_continue_without_a_pending_turn_keeps_listening():
+    async def run():
+        # Streamed on another worker, or Twilio retried /voice/continue
+        response = await webhooks.continue_speech(CallSid="CA_STREAM_5")
+        body = response.body.decode()
+        assert "<Gather" in body and "/webhooks/voice/process" in body
+        await conversation.end_conversation("CA_STREAM_5")
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_find_sentence_end()
+    test_split_reply()
+    test_first_sentence_running_into_json_tail()
+    test_stream_that_times_out()
+    test_continue_speaks_the_rest()
+    test_continue_without_a_pending_turn_keeps_listening()
+    print("✅ Streaming tests passed")
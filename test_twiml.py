@@ -0,0 +1,78 @@
+"""
+Test that the TwiML templates render exactly what twilio's VoiceResponse would
+"""
+import sys
+import os
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from twilio.twiml.voice_response import VoiceResponse, Gather
+
+from services import twiml
+
+def reference_listen(reply: str, lang_code: str, voice: str, still_there: str) -> str:
+    """How webhooks.py used to build a conversation turn"""
+    response = VoiceResponse()
+    gather = Gather(
+        input='speech',
+        action='/webhooks/voice/process',
+        speechTimeout='auto',
+        language=lang_code,
+        speech_model='experimental_conversations'
+    )
+    if reply:
+        gather.say(reply, voice=voice)
+    response.append(gather)
+    response.say(still_there, voice=voice)
+    response.redirect('/webhooks/voice/process')
+    return str(response)
+
+def test_templates_match_voice_response():
+    for reply in ["Great, what's your name?", 'Tom & Jerry <"quoted"> ¿Sí?', ""]:
+        for language, profile in twiml.PROFILES.items():
+            expected = reference_listen(reply, profile.lang_code, profile.voice, profile.still_there)
+            assert twiml.listen(reply, profile) == expected, (language, reply)
+
+    response = VoiceResponse()
+    gather = Gather(
+        input='speech',
+        action='/webhooks/voice/book',
+        speechTimeout='auto',
+        language='es-MX',
+        speech_model='experimental_conversations'
+    )
+    gather.say("Tengo martes a las 10 & jueves a las 2", voice='Google.es-US-Neural2-A')
+    response.append(gather)
+    assert twiml.offer_slots("Tengo martes a las 10 & jueves a las 2", twiml.get_profile("es")) == str(response)
+
+    response = VoiceResponse()
+    response.say("First sentence.", voice='Google.en-US-Neural2-F')
+    response.redirect('/webhooks/voice/continue')
+    assert twiml.speak_then_redirect("First sentence.", twiml.get_profile("en"), '/webhooks/voice/continue') == str(response)
+
+def test_greeting_is_prerendered():
+    response = VoiceResponse()
+    gather = Gather(
+        input='speech',
+        action='/webhooks/voice/process',
+        speechTimeout='auto',
+        language='en-US',
+        hints='hola, hello, buenos días, ayuda, help, español, spanish',
+        speech_model='experimental_conversations'
+    )
+    gather.say("Hey there! This is Nova from Orbyn AI. How can I help you today?", voice='Google.en-US-Neural2-F')
+    response.append(gather)
+    response.say("I didn't hear anything. Please call back when you're ready. Goodbye!", voice='Google.en-US-Neural2-F')
+    assert twiml.GREETING == str(response)
+
+    # Unknown languages fall back to English
+    assert twiml.get_profile("fr") is twiml.PROFILES["en"]
+
+if __name__ == "__main__":
+    test_templates_match_voice_response()
+    test_greeting_is_prerendered()
+    print("✅ TwiML template tests passed")